@@ -0,0 +1,34 @@
+"""Add dashboard summary
+
+Revision ID: 170bd9f37a6b
+Revises: d502c4ae1bdc
+Create Date: 2026-10-18 12:27:52.640318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '170bd9f37a6b'
+down_revision: Union[str, None] = 'd502c4ae1bdc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('dashboard_summary',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dashboard_summary')
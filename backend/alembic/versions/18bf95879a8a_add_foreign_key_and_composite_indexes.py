@@ -0,0 +1,50 @@
+"""Add foreign key and composite indexes
+
+Revision ID: 18bf95879a8a
+Revises: 75cb91c63d7c
+Create Date: 2026-10-18 16:20:47.553190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '18bf95879a8a'
+down_revision: Union[str, None] = '75cb91c63d7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # La restricción única falla si hay servicios repetidos: se informan en
+    # lugar de borrarlos, porque pueden tener uso y facturación asociados.
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT project_id, service_type, COUNT(*) FROM project_services "
+        "GROUP BY project_id, service_type HAVING COUNT(*) > 1 LIMIT 20"
+    )).all()
+    if duplicates:
+        listed = ", ".join(f"proyecto {row[0]} / {row[1]} ({row[2]})" for row in duplicates)
+        raise RuntimeError(f"Hay servicios duplicados por proyecto; consolidarlos antes de migrar: {listed}")
+
+    op.create_index('uq_project_services_project_type', 'project_services', ['project_id', 'service_type'], unique=True)
+    op.create_index('ix_projects_client_status', 'projects', ['client_id', 'status'], unique=False)
+    op.create_index('ix_service_usage_service_date', 'service_usage', ['service_id', 'usage_date'], unique=False)
+    op.create_index('ix_audit_logs_entity', 'audit_logs', ['entity_type', 'entity_id'], unique=False)
+    op.create_index(op.f('ix_audit_logs_user_id'), 'audit_logs', ['user_id'], unique=False)
+    op.create_index(op.f('ix_client_users_project_id'), 'client_users', ['project_id'], unique=False)
+    op.create_index(op.f('ix_outbox_deliveries_event_id'), 'outbox_deliveries', ['event_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_outbox_deliveries_event_id'), table_name='outbox_deliveries')
+    op.drop_index(op.f('ix_client_users_project_id'), table_name='client_users')
+    op.drop_index(op.f('ix_audit_logs_user_id'), table_name='audit_logs')
+    op.drop_index('ix_audit_logs_entity', table_name='audit_logs')
+    op.drop_index('ix_service_usage_service_date', table_name='service_usage')
+    op.drop_index('ix_projects_client_status', table_name='projects')
+    op.drop_index('uq_project_services_project_type', table_name='project_services')
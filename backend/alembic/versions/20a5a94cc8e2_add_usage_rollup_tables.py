@@ -0,0 +1,47 @@
+"""Add usage rollup tables
+
+Revision ID: 20a5a94cc8e2
+Revises: e6472e9f8f7c
+Create Date: 2026-10-18 10:03:17.204551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20a5a94cc8e2'
+down_revision: Union[str, None] = 'e6472e9f8f7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('usage_daily_rollups',
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('usage_type', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('quantity', sa.BigInteger(), nullable=False),
+    sa.Column('cost', sa.DECIMAL(precision=14, scale=2), nullable=False),
+    sa.Column('event_count', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['service_id'], ['project_services.id'], ),
+    sa.PrimaryKeyConstraint('service_id', 'usage_type', 'day')
+    )
+    op.create_table('usage_monthly_rollups',
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('quantity', sa.BigInteger(), nullable=False),
+    sa.Column('cost', sa.DECIMAL(precision=14, scale=2), nullable=False),
+    sa.Column('event_count', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['service_id'], ['project_services.id'], ),
+    sa.PrimaryKeyConstraint('service_id', 'month')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('usage_monthly_rollups')
+    op.drop_table('usage_daily_rollups')
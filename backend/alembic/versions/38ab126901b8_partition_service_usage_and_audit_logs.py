@@ -0,0 +1,134 @@
+"""Partition service_usage and audit_logs by month
+
+Revision ID: 38ab126901b8
+Revises: 18bf95879a8a
+Create Date: 2026-10-18 17:02:11.460932
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '38ab126901b8'
+down_revision: Union[str, None] = '18bf95879a8a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _usage_columns(partitioned):
+    return [
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False) if partitioned
+        else sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('usage_date', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=not partitioned),
+        sa.Column('usage_type', sa.String(), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('cost', sa.DECIMAL(precision=10, scale=2), nullable=True),
+        sa.Column('usage_metadata', sa.JSON(), nullable=True),
+        sa.Column('idempotency_key', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['service_id'], ['project_services.id'], ),
+    ]
+
+
+def _audit_columns(partitioned):
+    return [
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False) if partitioned
+        else sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('entity_type', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('old_values', sa.JSON(), nullable=True),
+        sa.Column('new_values', sa.JSON(), nullable=True),
+        sa.Column('ip_address', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=not partitioned),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    ]
+
+
+def _usage_indexes(partitioned):
+    idempotency = ['service_id', 'idempotency_key', 'usage_date'] if partitioned else ['service_id', 'idempotency_key']
+    op.create_index(op.f('ix_service_usage_id'), 'service_usage', ['id'], unique=False)
+    op.create_index('uq_service_usage_idempotency', 'service_usage', idempotency, unique=True)
+    op.create_index('ix_service_usage_service_date', 'service_usage', ['service_id', 'usage_date'], unique=False)
+
+
+def _audit_indexes(partitioned):
+    op.create_index(op.f('ix_audit_logs_id'), 'audit_logs', ['id'], unique=False)
+    op.create_index(op.f('ix_audit_logs_user_id'), 'audit_logs', ['user_id'], unique=False)
+    op.create_index('ix_audit_logs_entity', 'audit_logs', ['entity_type', 'entity_id'], unique=False)
+
+
+# tabla -> (columna de partición, columnas, índices)
+TABLES = {
+    'service_usage': ('usage_date', _usage_columns, _usage_indexes,
+                      ['ix_service_usage_id', 'uq_service_usage_idempotency', 'ix_service_usage_service_date']),
+    'audit_logs': ('created_at', _audit_columns, _audit_indexes,
+                   ['ix_audit_logs_id', 'ix_audit_logs_user_id', 'ix_audit_logs_entity']),
+}
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _replace_table(table, partitioned):
+    """Recrear `table` (particionada o no) copiando las filas de la actual"""
+    column, columns, indexes, index_names = TABLES[table]
+    old = f'{table}_old'
+    op.rename_table(table, old)
+    for index in index_names:
+        op.drop_index(index, table_name=old)
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+
+    if partitioned:
+        op.create_table(table, *columns(True), sa.PrimaryKeyConstraint('id', column),
+                        postgresql_partition_by=f'RANGE ({column})')
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+        # Un mes por partición desde el evento más antiguo hasta MONTHS_AHEAD adelante
+        oldest = op.get_bind().execute(sa.text(
+            f"SELECT min(date_trunc('month', {column} AT TIME ZONE 'UTC')) FROM {old}"
+        )).scalar()
+        current = datetime.now(timezone.utc).date().replace(day=1)
+        month = oldest.date() if oldest else current
+        while month <= _add_months(current, MONTHS_AHEAD):
+            following = _add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{following:%Y-%m-%d} 00:00:00+00')"
+            )
+            month = following
+    else:
+        op.create_table(table, *columns(False), sa.PrimaryKeyConstraint('id'))
+
+    names = [c.name for c in columns(partitioned) if isinstance(c, sa.Column)]
+    selected = [f'coalesce({name}, now())' if name == column else name for name in names]
+    op.execute(f"INSERT INTO {table} ({', '.join(names)}) SELECT {', '.join(selected)} FROM {old}")
+    op.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 0) + 1, false) FROM {table}")
+    # Con la tabla particionada se borran también sus particiones (no las separadas)
+    op.drop_table(old)
+    indexes(partitioned)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        # Sin particiones: service_usage y su índice de idempotencia no cambian
+        return
+    for table in TABLES:
+        _replace_table(table, partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in reversed(list(TABLES)):
+        _replace_table(table, partitioned=False)
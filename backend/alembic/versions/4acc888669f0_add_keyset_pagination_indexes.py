@@ -0,0 +1,34 @@
+"""Add keyset pagination indexes
+
+Revision ID: 4acc888669f0
+Revises: f0a6e852aaf7
+Create Date: 2026-10-18 15:12:03.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4acc888669f0'
+down_revision: Union[str, None] = 'f0a6e852aaf7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_clients_created_at_id', 'clients', ['created_at', 'id'], unique=False)
+    op.create_index('ix_clients_name_id', 'clients', ['name', 'id'], unique=False)
+    op.create_index('ix_projects_created_at_id', 'projects', ['created_at', 'id'], unique=False)
+    op.create_index('ix_projects_name_id', 'projects', ['name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_projects_name_id', table_name='projects')
+    op.drop_index('ix_projects_created_at_id', table_name='projects')
+    op.drop_index('ix_clients_name_id', table_name='clients')
+    op.drop_index('ix_clients_created_at_id', table_name='clients')
@@ -0,0 +1,28 @@
+"""Add project services version
+
+Revision ID: 52b388dc76bf
+Revises: 170bd9f37a6b
+Create Date: 2026-10-18 13:05:26.911407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '52b388dc76bf'
+down_revision: Union[str, None] = '170bd9f37a6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('projects', sa.Column('services_version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('projects', 'services_version')
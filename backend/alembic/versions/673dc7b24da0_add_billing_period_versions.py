@@ -0,0 +1,32 @@
+"""Add billing period versions
+
+Revision ID: 673dc7b24da0
+Revises: 38ab126901b8
+Create Date: 2026-10-18 17:45:36.918274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '673dc7b24da0'
+down_revision: Union[str, None] = '38ab126901b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('billing_period_versions',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('month')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('billing_period_versions')
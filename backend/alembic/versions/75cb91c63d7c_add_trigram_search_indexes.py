@@ -0,0 +1,41 @@
+"""Add trigram search indexes
+
+Revision ID: 75cb91c63d7c
+Revises: 4acc888669f0
+Create Date: 2026-10-18 15:48:31.207114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '75cb91c63d7c'
+down_revision: Union[str, None] = '4acc888669f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CLIENT_COLUMNS = ('name', 'email', 'legal_representative', 'contact_person')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in CLIENT_COLUMNS:
+        op.create_index(f'ix_clients_{column}_trgm', 'clients', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+    op.create_index('ix_projects_name_trgm', 'projects', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_projects_name_trgm', table_name='projects')
+    for column in reversed(CLIENT_COLUMNS):
+        op.drop_index(f'ix_clients_{column}_trgm', table_name='clients')
@@ -0,0 +1,28 @@
+"""Unique billing record per period
+
+Revision ID: d502c4ae1bdc
+Revises: 20a5a94cc8e2
+Create Date: 2026-10-18 11:41:05.873120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd502c4ae1bdc'
+down_revision: Union[str, None] = '20a5a94cc8e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('uq_billing_records_project_period', 'billing_records', ['project_id', 'billing_period_start'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_billing_records_project_period', table_name='billing_records')
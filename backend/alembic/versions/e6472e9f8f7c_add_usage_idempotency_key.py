@@ -0,0 +1,30 @@
+"""Add usage idempotency key
+
+Revision ID: e6472e9f8f7c
+Revises: 272e9770d5b0
+Create Date: 2026-10-18 09:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6472e9f8f7c'
+down_revision: Union[str, None] = '272e9770d5b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('service_usage', sa.Column('idempotency_key', sa.String(), nullable=True))
+    op.create_index('uq_service_usage_idempotency', 'service_usage', ['service_id', 'idempotency_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_service_usage_idempotency', table_name='service_usage')
+    op.drop_column('service_usage', 'idempotency_key')
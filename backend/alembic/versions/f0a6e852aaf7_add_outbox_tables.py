@@ -0,0 +1,56 @@
+"""Add outbox tables
+
+Revision ID: f0a6e852aaf7
+Revises: 52b388dc76bf
+Create Date: 2026-10-18 13:48:10.377925
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0a6e852aaf7'
+down_revision: Union[str, None] = '52b388dc76bf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_events_id'), 'outbox_events', ['id'], unique=False)
+    op.create_index(op.f('ix_outbox_events_project_id'), 'outbox_events', ['project_id'], unique=False)
+    op.create_table('outbox_deliveries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('destination', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['outbox_events.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_deliveries_id'), 'outbox_deliveries', ['id'], unique=False)
+    op.create_index('ix_outbox_deliveries_due', 'outbox_deliveries', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_deliveries_due', table_name='outbox_deliveries')
+    op.drop_index(op.f('ix_outbox_deliveries_id'), table_name='outbox_deliveries')
+    op.drop_table('outbox_deliveries')
+    op.drop_index(op.f('ix_outbox_events_project_id'), table_name='outbox_events')
+    op.drop_index(op.f('ix_outbox_events_id'), table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,205 @@
+"""Auditoría de cambios en clientes, proyectos y servicios (SR-04).
+
+Los cambios se capturan con los eventos de la sesión (valores anteriores y
+nuevos de los atributos modificados) y se escriben en `audit_logs` con un solo
+INSERT multi-fila por flush, dentro de la misma transacción: si el cambio se
+confirma, su auditoría también, sin un round trip extra por entidad.
+
+Con `AUDIT_MODE=buffered` las entradas se encolan al hacer commit y un writer
+en segundo plano las inserta en lotes (`AUDIT_BATCH_SIZE`, cada
+`AUDIT_FLUSH_SECONDS`): el request no paga el INSERT, pero las entradas aún
+no escritas se pierden si el proceso muere sin apagarse (al apagar se vacía la
+cola, y ante errores de la base se reintenta). Sin el writer corriendo (scripts)
+se escribe en la transacción.
+
+El usuario y la IP del request llegan por `contextvars`: la IP la fija
+`AuditContextMiddleware` y el usuario `auth.get_current_user`. Las escrituras
+masivas fuera del ORM deben llamar a `record`.
+"""
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+import asyncio
+import logging
+import os
+
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session
+
+from database import AsyncSessionLocal
+from models import AuditLog, Client, Project, ProjectService
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() in ("1", "true", "yes")
+AUDIT_MODE = os.getenv("AUDIT_MODE", "transaction")  # transaction | buffered
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "0.5"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+# Usar X-Forwarded-For solo detrás de un proxy de confianza
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() in ("1", "true", "yes")
+
+_ENTITY_TYPES = {Client: "client", Project: "project", ProjectService: "project_service"}
+# Atributos que no aportan al historial o que pueden contener credenciales
+_IGNORED_ATTRIBUTES = {"created_at", "updated_at", "services_version"}
+_REDACTED_ATTRIBUTES = {"service_config"}
+REDACTED = "[redacted]"
+
+current_user_id: ContextVar = ContextVar("audit_user_id", default=None)
+current_ip: ContextVar = ContextVar("audit_ip", default=None)
+
+# Entradas confirmadas pendientes de escribir (modo buffered)
+_pending = []
+_wakeup = asyncio.Event()
+_writer_running = False
+
+class AuditContextMiddleware:
+    """Guardar la IP del request para las entradas de auditoría"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        ip = scope["client"][0] if scope.get("client") else None
+        if TRUST_PROXY_HEADERS:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    ip = value.decode("latin-1").split(",")[0].strip()
+                    break
+        ip_token = current_ip.set(ip)
+        user_token = current_user_id.set(None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_ip.reset(ip_token)
+            current_user_id.reset(user_token)
+
+def set_user(user_id):
+    current_user_id.set(user_id)
+
+def _jsonable(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _value(key, value):
+    return REDACTED if key in _REDACTED_ATTRIBUTES and value is not None else _jsonable(value)
+
+def _snapshot(obj):
+    # Solo valores ya cargados: no dispara consultas dentro del flush
+    loaded = inspect(obj).dict
+    return {
+        attr.key: _value(attr.key, loaded[attr.key])
+        for attr in inspect(obj).mapper.column_attrs
+        if attr.key not in _IGNORED_ATTRIBUTES and loaded.get(attr.key) is not None
+    }
+
+def _changes(obj):
+    state = inspect(obj)
+    old_values, new_values = {}, {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in _IGNORED_ATTRIBUTES:
+            continue
+        history = state.attrs[attr.key].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old == new:
+            continue
+        old_values[attr.key] = _value(attr.key, old)
+        new_values[attr.key] = _value(attr.key, new)
+    return old_values, new_values
+
+def _action(entity_type: str, operation: str, new_values=None) -> str:
+    if entity_type == "project_service" and operation == "updated" and "is_active" in (new_values or {}):
+        return "service_activated" if new_values["is_active"] else "service_deactivated"
+    prefix = "service" if entity_type == "project_service" else entity_type
+    return f"{prefix}_{operation}"
+
+def entry(action: str, entity_type: str, entity_id: int, old_values=None, new_values=None) -> dict:
+    return {
+        "user_id": current_user_id.get(),
+        "ip_address": current_ip.get(),
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "old_values": old_values or None,
+        "new_values": new_values or None,
+    }
+
+def record(session, entries):
+    """Registrar entradas de auditoría de la transacción actual de `session`"""
+    if not AUDIT_ENABLED or not entries:
+        return
+    if AUDIT_MODE == "buffered" and _writer_running:
+        session.info.setdefault("audit_entries", []).extend(entries)
+    else:
+        session.connection().execute(insert(AuditLog), entries)
+
+@event.listens_for(Session, "after_flush")
+def _audit_changes(session, flush_context):
+    if not AUDIT_ENABLED:
+        return
+    entries = []
+    for obj in session.new:
+        entity_type = _ENTITY_TYPES.get(type(obj))
+        if entity_type:
+            entries.append(entry(_action(entity_type, "created"), entity_type, obj.id, new_values=_snapshot(obj)))
+    for obj in session.dirty:
+        entity_type = _ENTITY_TYPES.get(type(obj))
+        if entity_type and session.is_modified(obj, include_collections=False):
+            old_values, new_values = _changes(obj)
+            if new_values:
+                entries.append(entry(_action(entity_type, "updated", new_values), entity_type, obj.id,
+                                     old_values, new_values))
+    for obj in session.deleted:
+        entity_type = _ENTITY_TYPES.get(type(obj))
+        if entity_type:
+            entries.append(entry(_action(entity_type, "deleted"), entity_type, obj.id, old_values=_snapshot(obj)))
+
+    record(session, entries)
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_on_commit(session):
+    entries = session.info.pop("audit_entries", None)
+    if entries:
+        _pending.extend(entries)
+        if len(_pending) >= AUDIT_BATCH_SIZE:
+            _wakeup.set()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("audit_entries", None)
+
+async def flush():
+    """Escribir las entradas pendientes en lotes; si falla quedan para el próximo intento"""
+    while _pending:
+        batch = _pending[:AUDIT_BATCH_SIZE]
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(AuditLog), batch)
+            await db.commit()
+        del _pending[:len(batch)]
+
+async def write_periodically():
+    global _writer_running
+    _writer_running = True
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=AUDIT_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            try:
+                await flush()
+            except Exception:
+                logger.exception("Error escribiendo auditoría (%d entradas pendientes)", len(_pending))
+    finally:
+        _writer_running = False
@@ -1,13 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from cache import TTLCache
 from database import get_db
 from models import User
+from schemas import User as UserSchema
+import audit
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,14 +21,17 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer()
+# Cache de usuarios autenticados (evita un SELECT por request)
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Incluir los datos del usuario en el token para no consultar la DB
+EMBED_USER_CLAIMS = os.getenv("AUTH_EMBED_CLAIMS", "false").lower() in ("1", "true", "yes")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+security = HTTPBearer()
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+principal_cache = TTLCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_ENTRIES)
+# username -> momento del último cambio; invalida tokens con claims emitidos antes
+revoked_users = TTLCache(ACCESS_TOKEN_EXPIRE_MINUTES * 60, PRINCIPAL_CACHE_MAX_ENTRIES)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -31,11 +39,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": int(time.time())})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def user_claims(user) -> dict:
+    """Claims del token para un usuario; incluye sus datos si AUTH_EMBED_CLAIMS está activo"""
+    claims = {"sub": user.username}
+    if EMBED_USER_CLAIMS and user.is_active:
+        claims["usr"] = {
+            "id": user.id,
+            "email": user.email,
+            "created_at": user.created_at.isoformat() if user.created_at else None,
+            "updated_at": user.updated_at.isoformat() if user.updated_at else None,
+        }
+    return claims
+
+def decode_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -45,7 +65,7 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return username
+        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,11 +73,68 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(username: str = Depends(verify_token), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
+def verify_token(payload: dict = Depends(decode_token)):
+    return payload["sub"]
+
+def _principal_from_claims(payload: dict) -> Optional[UserSchema]:
+    claims = payload.get("usr")
+    if not claims:
+        return None
+    revoked_at = revoked_users.get(payload["sub"])
+    if revoked_at is not None and payload.get("iat", 0) <= revoked_at:
+        return None
+    return UserSchema(
+        id=claims["id"],
+        username=payload["sub"],
+        email=claims["email"],
+        is_active=True,
+        created_at=claims["created_at"],
+        updated_at=claims["updated_at"],
+    )
+
+async def get_current_user(payload: dict = Depends(decode_token), db: AsyncSession = Depends(get_db)):
+    username = payload["sub"]
+
+    # 1) Claims embebidos en el token, 2) cache en memoria, 3) base de datos
+    user = _principal_from_claims(payload) or principal_cache.get(username)
     if user is None:
+        result = await db.execute(select(User).where(User.username == username))
+        db_user = result.scalars().first()
+        if db_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        user = UserSchema.model_validate(db_user)
+        principal_cache.put(username, user)
+
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="Inactive user",
         )
-    return user
\ No newline at end of file
+    audit.set_user(user.id)
+    return user
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    usernames = set()
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            history = inspect(obj).attrs.username.history
+            usernames.update(name for name in (obj.username, *history.deleted) if name)
+    if usernames:
+        session.info.setdefault("auth_invalidations", set()).update(usernames)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users(session):
+    usernames = session.info.pop("auth_invalidations", ())
+    if usernames:
+        principal_cache.invalidate(usernames)
+        now = int(time.time())
+        for username in usernames:
+            revoked_users.put(username, now)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_invalidations(session):
+    session.info.pop("auth_invalidations", None)
@@ -0,0 +1,111 @@
+"""Comparar latencia p99 con sesión síncrona vs async bajo carga concurrente.
+
+Monta dos apps mínimas en proceso que ejecutan la misma consulta lenta
+(`pg_sleep` + los conteos del dashboard): una con `SessionLocal` dentro de un
+handler `async def` (comportamiento anterior) y otra con `AsyncSessionLocal`.
+Mientras corren las consultas lentas se mide la latencia de `/health`, que es
+el síntoma visible cuando el event loop queda bloqueado.
+
+Uso (desde backend/, con Postgres local en DATABASE_URL):
+    python -m benchmarks.async_db_latency --concurrency 50 --requests 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from database import SessionLocal, AsyncSessionLocal, async_engine
+
+SLOW_QUERY = text("""
+    SELECT pg_sleep(:delay),
+           (SELECT COUNT(*) FROM clients),
+           (SELECT COUNT(*) FROM projects),
+           (SELECT COUNT(*) FROM project_services WHERE is_active = true)
+""")
+
+def build_sync_app(delay: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/slow")
+    async def slow():
+        db = SessionLocal()
+        try:
+            db.execute(SLOW_QUERY, {"delay": delay}).all()
+        finally:
+            db.close()
+        return {"ok": True}
+
+    return app
+
+def build_async_app(delay: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/slow")
+    async def slow():
+        async with AsyncSessionLocal() as db:
+            (await db.execute(SLOW_QUERY, {"delay": delay})).all()
+        return {"ok": True}
+
+    return app
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_load(app: FastAPI, concurrency: int, total: int):
+    """Lanzar `total` peticiones (mitad /slow, mitad /health) con `concurrency` en vuelo"""
+    latencies = {"/slow": [], "/health": []}
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(path):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies[path].append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one("/slow" if i % 2 == 0 else "/health") for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, elapsed
+
+def report(label, latencies, elapsed, total):
+    print(f"\n📊 {label}: {total / elapsed:.1f} req/s")
+    for path, samples in latencies.items():
+        print(
+            f"   {path:<8} p50={statistics.median(samples):8.1f}ms "
+            f"p95={percentile(samples, 95):8.1f}ms p99={percentile(samples, 99):8.1f}ms"
+        )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.05, help="Segundos de pg_sleep por consulta")
+    args = parser.parse_args()
+
+    print(f"🚀 {args.requests} peticiones, concurrencia {args.concurrency}, delay {args.delay}s")
+    for label, builder in (("sync Session", build_sync_app), ("AsyncSession", build_async_app)):
+        latencies, elapsed = await run_load(builder(args.delay), args.concurrency, args.requests)
+        report(label, latencies, elapsed, args.requests)
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
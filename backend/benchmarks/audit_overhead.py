@@ -0,0 +1,91 @@
+"""Medir el costo de la auditoría en los endpoints de escritura.
+
+Alterna toggles de servicio y actualizaciones de cliente sin auditoría, con
+auditoría en la transacción y en modo buffered (misma app en proceso,
+autenticación sustituida) y compara las latencias. Crea un cliente "bench-audit" y lo borra al terminar.
+
+Uso (desde backend/):
+    python -m benchmarks.audit_overhead --requests 300
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import delete, select
+
+import audit
+from auth import get_current_user
+from database import AsyncSessionLocal, async_engine
+from main import app
+from models import AuditLog, ProjectService
+
+async def measure(client, project_id: int, client_id: int, requests: int):
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        if i % 2:
+            response = await client.put(f"/clients/{client_id}", json={"contact_person": f"Contacto {i}"})
+        else:
+            response = await client.post(f"/projects/{project_id}/services/reporting/toggle")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    app.dependency_overrides[get_current_user] = lambda: None
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/clients/", json={"name": "bench-audit", "email": "bench-audit@example.com"})
+        response.raise_for_status()
+        client_id = response.json()["id"]
+        response = await client.post("/projects/", json={
+            "name": "bench-audit", "client_id": client_id, "start_date": "2025-01-01T00:00:00",
+        })
+        response.raise_for_status()
+        project_id = response.json()["id"]
+
+        modes = ("off", "transaction", "buffered")
+        results = {mode: [] for mode in modes}
+        writer = asyncio.create_task(audit.write_periodically())
+        try:
+            # Rondas alternadas para que el calentamiento no favorezca a ninguno
+            for _ in range(args.rounds):
+                for mode in modes:
+                    audit.AUDIT_ENABLED = mode != "off"
+                    audit.AUDIT_MODE = mode
+                    results[mode].extend(await measure(client, project_id, client_id, args.requests))
+        finally:
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            await audit.flush()
+            audit.AUDIT_ENABLED = False
+            async with AsyncSessionLocal() as db:
+                service_ids = (await db.execute(
+                    select(ProjectService.id).where(ProjectService.project_id == project_id)
+                )).scalars().all()
+            await client.put(f"/projects/{project_id}", json={"status": "completed"})
+            await client.delete(f"/clients/{client_id}")
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(AuditLog).where(
+                    ((AuditLog.entity_type == "client") & (AuditLog.entity_id == client_id))
+                    | ((AuditLog.entity_type == "project") & (AuditLog.entity_id == project_id))
+                    | ((AuditLog.entity_type == "project_service") & AuditLog.entity_id.in_(service_ids))
+                ))
+                await db.commit()
+
+    baseline = statistics.median(results["off"])
+    for mode in modes:
+        latency = statistics.median(results[mode])
+        print(f"📊 {mode:<12} p50 {latency * 1000:.2f}ms ({(latency / baseline - 1) * 100:+.1f}%)")
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
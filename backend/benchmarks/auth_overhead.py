@@ -0,0 +1,71 @@
+"""Comparar requests/s de un endpoint autenticado según cómo se resuelve el usuario.
+
+Modos: `db` (un SELECT por request, comportamiento anterior), `cache` (cache
+en memoria con TTL) y `claims` (datos del usuario embebidos en el token).
+Usa la app real en proceso contra DATABASE_URL y el primer usuario activo.
+
+Uso (desde backend/):
+    python -m benchmarks.auth_overhead --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+import httpx
+from sqlalchemy import select
+
+import auth
+from database import AsyncSessionLocal, async_engine
+from main import app
+from models import User
+
+async def measure(client, token, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def one():
+        async with semaphore:
+            response = await client.get("/auth/me", headers=headers)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.is_active == True).limit(1))).scalars().first()
+    if user is None:
+        print("❌ No hay usuarios activos; ejecuta seed_data.py primero")
+        return
+
+    expires = timedelta(minutes=5)
+    plain_token = auth.create_access_token({"sub": user.username}, expires)
+    auth.EMBED_USER_CLAIMS = True
+    claims_token = auth.create_access_token(auth.user_claims(user), expires)
+
+    modes = (
+        ("db", plain_token, 0),
+        ("cache", plain_token, auth.PRINCIPAL_CACHE_TTL_SECONDS or 60),
+        ("claims", claims_token, 0),
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        baseline = None
+        for label, token, ttl in modes:
+            auth.principal_cache.clear()
+            auth.principal_cache.ttl = ttl
+            rps = await measure(client, token, args.requests, args.concurrency)
+            baseline = baseline or rps
+            print(f"📊 {label:<7} {rps:8.0f} req/s  (x{rps / baseline:.2f})")
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Medir el motor de facturación con 500 proyectos × 6 servicios × 12 meses.
+
+Crea datos sintéticos (clientes "bench-billing-*", servicios activos con cargo
+fijo o por uso y acumulados mensuales), factura los 12 meses con 1 y con
+--workers procesos, comprueba que la re-ejecución es idempotente y limpia al
+terminar. Factura todos los proyectos de la base: usar en una base de pruebas.
+
+Uso (desde backend/):
+    python -m benchmarks.billing_run --projects 500 --months 12 --workers 4
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import delete, insert, select, func
+
+import billing
+from database import SessionLocal
+from models import (
+    BillingRecord, BillingType, Client, Project, ProjectService, ServiceType,
+    UsageDailyRollup, UsageMonthlyRollup
+)
+
+CLIENT_PREFIX = "bench-billing-"
+
+def month_add(value: date, months: int) -> date:
+    index = value.month - 1 + months
+    return date(value.year + index // 12, index % 12 + 1, 1)
+
+def seed(db, projects: int, months: int, first_month: date):
+    random.seed(42)
+    client_ids = db.execute(
+        insert(Client).returning(Client.id),
+        [{"name": f"{CLIENT_PREFIX}{i}", "email": f"{CLIENT_PREFIX}{i}@example.com"}
+         for i in range(max(1, projects // 10))],
+    ).scalars().all()
+
+    started = datetime.combine(first_month, datetime.min.time(), timezone.utc)
+    project_ids = db.execute(
+        insert(Project).returning(Project.id),
+        [{
+            "client_id": client_ids[i % len(client_ids)],
+            "name": f"bench project {i}",
+            "start_date": started,
+            "billing_type": BillingType.USAGE if i % 2 else BillingType.MONTHLY,
+            "billing_rate": Decimal("0.25") if i % 2 else Decimal("2500"),
+        } for i in range(projects)],
+    ).scalars().all()
+
+    service_rows = []
+    for project_id in project_ids:
+        for service_type in ServiceType:
+            usage_based = random.random() < 0.5
+            service_rows.append({
+                "project_id": project_id,
+                "service_type": service_type,
+                "is_active": True,
+                "activated_at": started,
+                "monthly_cost": None if usage_based else Decimal(random.choice([200, 300, 800])),
+                "cost_per_unit": Decimal("0.05") if usage_based else None,
+            })
+    service_ids = db.execute(insert(ProjectService).returning(ProjectService.id), service_rows).scalars().all()
+
+    rollup_rows = [
+        {"service_id": service_id, "month": month_add(first_month, m),
+         "quantity": random.randint(100, 50000), "cost": Decimal("0"), "event_count": 1}
+        for service_id in service_ids for m in range(months)
+    ]
+    db.execute(insert(UsageMonthlyRollup), rollup_rows)
+    db.commit()
+    return client_ids, project_ids, service_ids
+
+def cleanup(db):
+    client_ids = select(Client.id).where(Client.name.like(f"{CLIENT_PREFIX}%"))
+    project_ids = select(Project.id).where(Project.client_id.in_(client_ids))
+    service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids))
+    db.execute(delete(BillingRecord).where(BillingRecord.project_id.in_(project_ids)))
+    db.execute(delete(UsageMonthlyRollup).where(UsageMonthlyRollup.service_id.in_(service_ids)))
+    db.execute(delete(UsageDailyRollup).where(UsageDailyRollup.service_id.in_(service_ids)))
+    db.execute(delete(ProjectService).where(ProjectService.project_id.in_(project_ids)))
+    db.execute(delete(Project).where(Project.client_id.in_(client_ids)))
+    db.execute(delete(Client).where(Client.name.like(f"{CLIENT_PREFIX}%")))
+    db.commit()
+
+def bill_all(first_month: date, months: int, workers: int) -> float:
+    started = time.perf_counter()
+    for m in range(months):
+        billing.run_period(month_add(first_month, m), month_add(first_month, m + 1), workers)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--first-month", default="2024-01")
+    args = parser.parse_args()
+    first_month = datetime.strptime(args.first_month, "%Y-%m").date()
+
+    db = SessionLocal()
+    try:
+        cleanup(db)
+        t0 = time.perf_counter()
+        _, project_ids, service_ids = seed(db, args.projects, args.months, first_month)
+        print(f"🌱 {len(project_ids)} proyectos, {len(service_ids)} servicios, "
+              f"{len(service_ids) * args.months} acumulados ({time.perf_counter() - t0:.2f}s)")
+
+        for label, workers in (("1 proceso", 1), (f"{args.workers} procesos", args.workers), ("re-ejecución", args.workers)):
+            elapsed = bill_all(first_month, args.months, workers)
+            print(f"📊 {label:<12} {args.months} meses en {elapsed:.2f}s "
+                  f"({elapsed / args.months * 1000:.0f} ms/mes)")
+
+        records = db.scalar(select(func.count(BillingRecord.id)).where(BillingRecord.project_id.in_(project_ids)))
+        expected = len(project_ids) * args.months
+        print(f"{'✅' if records == expected else '❌'} {records} registros (esperados {expected})")
+    finally:
+        cleanup(db)
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Medir memoria y throughput de GET /exports/usage.
+
+Crea un cliente sintético (email "@bench-export.example") con dos servicios:
+`mdm` con N/10 eventos y `reporting` con N. Descarga la exportación de cada
+uno (CSV, CSV con gzip y NDJSON) llamando a la app ASGI directamente (el
+transporte de httpx acumula el body completo) y reporta filas/s y el pico de
+memoria de Python durante la descarga (tracemalloc): con streaming el pico no
+crece con el tamaño. Limpia al terminar.
+
+Uso (desde backend/):
+    python -m benchmarks.export_memory --events 1000000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from auth import get_current_user
+from database import SessionLocal, async_engine
+from main import app
+from models import Client, Project, ProjectService, ServiceType, ServiceUsage
+
+EMAIL = "export@bench-export.example"
+
+def seed(db, events: int):
+    client = Client(name="Bench export", email=EMAIL)
+    db.add(client)
+    db.flush()
+    project = Project(client_id=client.id, name="Bench export", start_date=datetime.now(timezone.utc))
+    db.add(project)
+    db.flush()
+
+    started = datetime.now(timezone.utc) - timedelta(days=60)
+    for service_type, count in ((ServiceType.MDM, events // 10), (ServiceType.REPORTING, events)):
+        service = ProjectService(project_id=project.id, service_type=service_type, is_active=True)
+        db.add(service)
+        db.flush()
+        for offset in range(0, count, 10_000):
+            db.execute(insert(ServiceUsage), [
+                {
+                    "service_id": service.id,
+                    "usage_date": started + timedelta(seconds=i * 5),
+                    "usage_type": "email_sent",
+                    "quantity": 1 + i % 5,
+                    "usage_metadata": {"campaign": i % 100},
+                }
+                for i in range(offset, min(offset + 10_000, count))
+            ])
+    db.commit()
+    return client.id
+
+def cleanup(db):
+    client_ids = select(Client.id).where(Client.email == EMAIL).scalar_subquery()
+    project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+    service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids)).scalar_subquery()
+    db.execute(delete(ServiceUsage).where(ServiceUsage.service_id.in_(service_ids)))
+    db.execute(delete(ProjectService).where(ProjectService.id.in_(service_ids)))
+    db.execute(delete(Project).where(Project.id.in_(project_ids)))
+    db.execute(delete(Client).where(Client.id.in_(client_ids)))
+    db.commit()
+
+async def download(url: str, encoding: str):
+    """Recorrer la respuesta chunk a chunk; devuelve (líneas, bytes, segundos, pico MB)"""
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [(b"host", b"bench"), (b"accept-encoding", encoding.encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+    totals = {"rows": 0, "bytes": 0}
+
+    requested = asyncio.Event()
+
+    async def receive():
+        # Después del request, esperar (StreamingResponse escucha un disconnect)
+        if requested.is_set():
+            await asyncio.Event().wait()
+        requested.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{url}: HTTP {message['status']}")
+        if message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            totals["bytes"] += len(body)
+            totals["rows"] += (decompressor.decompress(body) if decompressor else body).count(b"\n")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return totals["rows"], totals["bytes"], elapsed, peak / 1024 / 1024
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        cleanup(db)
+        started = time.perf_counter()
+        client_id = seed(db, args.events)
+        print(f"📦 {args.events + args.events // 10} eventos insertados en {time.perf_counter() - started:.1f}s")
+
+        app.dependency_overrides[get_current_user] = lambda: None
+        for label, fmt, encoding in (("csv", "csv", "identity"), ("csv+gzip", "csv", "gzip"),
+                                     ("ndjson", "ndjson", "identity")):
+            for service_type in ("mdm", "reporting"):
+                url = f"/exports/usage?client_id={client_id}&service_type={service_type}&format={fmt}"
+                lines, size, elapsed, peak = await download(url, encoding)
+                rows = lines - 1 if fmt == "csv" else lines
+                print(f"📊 {label:<8} {rows:>9} filas  {size / 1024 / 1024:7.1f} MB  "
+                      f"{rows / elapsed:>8.0f} filas/s  pico {peak:6.1f} MB")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        cleanup(db)
+        db.close()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""Ráfaga de logins concurrentes mientras se mide la latencia de /health.
+
+Si el hashing bloqueara el event loop, /health tardaría lo mismo que un
+bcrypt; con el pool de hashing debe seguir respondiendo en milisegundos.
+Usa la app real en proceso contra DATABASE_URL.
+
+Uso (desde backend/):
+    python -m benchmarks.login_burst --logins 50 --username admin --password admin123
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import passwords
+from database import async_engine
+from main import app
+
+async def ping(client, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+        latencies = []
+        pinger = asyncio.create_task(ping(client, stop, latencies))
+
+        credentials = {"username": args.username, "password": args.password}
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/auth/login", data=credentials) for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await pinger
+
+    codes = {}
+    for response in responses:
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+    latencies.sort()
+    print(f"📊 {args.logins} logins en {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), códigos: {codes}")
+    if latencies:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"📊 /health durante la ráfaga: p50 {statistics.median(latencies) * 1000:.1f}ms, "
+              f"p99 {p99 * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms ({len(latencies)} muestras)")
+    print(f"📊 Pool de hashing: {passwords.pool_stats()}")
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
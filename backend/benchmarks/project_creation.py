@@ -0,0 +1,127 @@
+"""Medir creaciones de proyectos por segundo (POST /projects/).
+
+Compara tres formas de dejar un proyecto listo con dos servicios activos:
+
+- default: crear el proyecto sin `services` (todos los servicios desactivados).
+- initial: crear el proyecto con `services` (dos activos, con costos) en el mismo request.
+- toggles: crear sin `services` y activar los dos con `/services/{tipo}/toggle`
+  (el flujo anterior, un request por servicio).
+
+Por modo informa creaciones/s, p50/p95 por proyecto listo y sentencias SQL por
+proyecto. Usa la app en proceso con la autenticación sustituida. Crea un
+cliente "@bench-projects.example" y lo borra al terminar.
+
+Uso (desde backend/):
+    python -m benchmarks.project_creation --projects 300 --concurrency 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import delete, event, select
+
+from auth import get_current_user
+from database import AsyncSessionLocal, async_engine
+from main import app
+from models import AuditLog, Client, OutboxDelivery, OutboxEvent, Project, ProjectService
+import dashboard
+
+DOMAIN = "bench-projects.example"
+SERVICES = [
+    {"service_type": "mdm", "is_active": True, "monthly_cost": "150.00"},
+    {"service_type": "reporting", "is_active": True, "cost_per_unit": "0.05"},
+]
+
+statements = 0
+
+def _count_statement(*args):
+    global statements
+    statements += 1
+
+async def create(client, client_id: int, mode: str, index: int):
+    body = {"name": f"Bench {mode} {index}", "client_id": client_id, "start_date": "2025-01-01T00:00:00"}
+    if mode == "initial":
+        body["services"] = SERVICES
+    response = await client.post("/projects/", json=body)
+    response.raise_for_status()
+    if mode == "toggles":
+        project_id = response.json()["id"]
+        for service in SERVICES:
+            (await client.post(f"/projects/{project_id}/services/{service['service_type']}/toggle")).raise_for_status()
+
+async def run_mode(client, client_id: int, mode: str, projects: int, concurrency: int):
+    global statements
+    latencies = []
+    queue = iter(range(projects))
+
+    async def worker():
+        for index in queue:
+            started = time.perf_counter()
+            await create(client, client_id, mode, index)
+            latencies.append(time.perf_counter() - started)
+
+    statements = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "per_second": projects / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "statements": statements / projects,
+    }
+
+async def cleanup():
+    async with AsyncSessionLocal() as db:
+        client_ids = select(Client.id).where(Client.email.like(f"%@{DOMAIN}")).scalar_subquery()
+        project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+        service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids)).scalar_subquery()
+        await db.execute(delete(AuditLog).where(
+            ((AuditLog.entity_type == "project") & AuditLog.entity_id.in_(project_ids))
+            | ((AuditLog.entity_type == "project_service") & AuditLog.entity_id.in_(service_ids))
+            | ((AuditLog.entity_type == "client") & AuditLog.entity_id.in_(client_ids))
+        ))
+        event_ids = select(OutboxEvent.id).where(OutboxEvent.project_id.in_(project_ids)).scalar_subquery()
+        await db.execute(delete(OutboxDelivery).where(OutboxDelivery.event_id.in_(event_ids)))
+        await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
+        await db.execute(delete(ProjectService).where(ProjectService.project_id.in_(project_ids)))
+        await db.execute(delete(Project).where(Project.id.in_(project_ids)))
+        await db.execute(delete(Client).where(Client.id.in_(client_ids)))
+        await db.commit()
+    await dashboard.reconcile()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=300, help="Proyectos por modo")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _count_statement)
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        await cleanup()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/clients/", json={"name": "Bench proyectos", "email": f"owner@{DOMAIN}"})
+            response.raise_for_status()
+            client_id = response.json()["id"]
+
+            # Calentamiento
+            await run_mode(client, client_id, "initial", 10, 1)
+
+            print(f"{'modo':<10}{'proyectos/s':>13}{'p50':>10}{'p95':>10}{'SQL/proyecto':>14}")
+            for mode in ("default", "initial", "toggles"):
+                result = await run_mode(client, client_id, mode, args.projects, args.concurrency)
+                print(f"{mode:<10}{result['per_second']:>13.1f}{result['p50']:>8.1f}ms{result['p95']:>8.1f}ms"
+                      f"{result['statements']:>14.1f}")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        event.remove(async_engine.sync_engine, "before_cursor_execute", _count_statement)
+        await cleanup()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""Medir la latencia de búsqueda de clientes con 100k filas.
+
+Inserta clientes sintéticos (email "@bench-search.example"), mide
+`GET /clients/?search=` (substring) y `GET /search/?fuzzy=true` (con errores
+de tipeo) con la app real en proceso y la autenticación sustituida, y limpia
+al terminar (salvo --keep). En PostgreSQL, con la migración de índices
+trigram aplicada, muestra además el plan de la consulta.
+
+Uso (desde backend/):
+    python -m benchmarks.search_latency --clients 100000 --queries 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+from sqlalchemy import delete, func, insert, select, text
+
+import search
+from auth import get_current_user
+from database import SessionLocal, async_engine
+from main import app
+from models import Client
+
+EMAIL_DOMAIN = "@bench-search.example"
+PREFIXES = ["Distribuidora", "Comercial", "Inversiones", "Grupo", "Servicios", "Industrias", "Tecnologías", "Agencia"]
+WORDS = ["Andina", "Pacífico", "Caribe", "Tucán", "Cóndor", "Horizonte", "Cordillera", "Amazonia",
+         "Nevado", "Sabana", "Llanos", "Orquídea", "Guadua", "Ceiba", "Palmera", "Volcán"]
+PEOPLE = ["María Gómez", "Juan Pérez", "Ana Rodríguez", "Carlos López", "Laura Martínez", "Andrés Díaz"]
+
+def seed(db, count: int):
+    random.seed(7)
+    existing = db.scalar(select(func.count(Client.id)).where(Client.email.like(f"%{EMAIL_DOMAIN}")))
+    rows = []
+    for i in range(existing, count):
+        name = f"{random.choice(PREFIXES)} {random.choice(WORDS)} {random.choice(WORDS)} {i}"
+        rows.append({
+            "name": name,
+            "email": f"contacto{i}{EMAIL_DOMAIN}",
+            "legal_representative": random.choice(PEOPLE),
+            "contact_person": random.choice(PEOPLE),
+        })
+    for start in range(0, len(rows), 5000):
+        db.execute(insert(Client), rows[start:start + 5000])
+    db.commit()
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("ANALYZE clients"))
+        db.commit()
+    return len(rows)
+
+def typo(word: str) -> str:
+    i = random.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return f"p50 {statistics.median(latencies) * 1000:6.1f}ms  p95 {p95 * 1000:6.1f}ms  max {latencies[-1] * 1000:6.1f}ms"
+
+async def measure(client, urls):
+    latencies = []
+    for url in urls:
+        started = time.perf_counter()
+        response = await client.get(url)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def explain(db, term: str):
+    query = select(Client.id).where(search.match(search.CLIENT_FIELDS, term, False, True)).limit(10)
+    sql = query.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    return "\n".join(row[0] for row in db.execute(text(f"EXPLAIN {sql}")))
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="No borrar los clientes sintéticos")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        inserted = seed(db, args.clients)
+        print(f"📦 {inserted} clientes insertados en {time.perf_counter() - started:.1f}s")
+        if db.get_bind().dialect.name == "postgresql":
+            print(f"🔎 Plan:\n{explain(db, 'cordill')}")
+
+        random.seed(11)
+        terms = [random.choice(WORDS)[:random.randint(4, 7)] for _ in range(args.queries)]
+        typos = [typo(random.choice(WORDS)) for _ in range(args.queries)]
+
+        app.dependency_overrides[get_current_user] = lambda: None
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for label, urls in (
+                ("substring + total", [f"/clients/?search={term}&per_page=10" for term in terms]),
+                ("substring, cursor", [f"/clients/?search={term}&per_page=10&paginate=cursor" for term in terms]),
+                ("fuzzy (/search)  ", [f"/search/?q={term}&fuzzy=true" for term in typos]),
+            ):
+                print(f"📊 {label}: {summary(await measure(client, urls))}")
+    finally:
+        if not args.keep:
+            db.execute(delete(Client).where(Client.email.like(f"%{EMAIL_DOMAIN}")))
+            db.commit()
+        db.close()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""Comparar la serialización de listados y detalle: Pydantic + json vs orjson directo.
+
+Crea clientes sintéticos (email "@bench-serialization.example") con
+`--projects` proyectos cada uno. Por endpoint (listado de clientes y de
+proyectos con per_page=100, detalle de cliente y de proyecto) carga los
+objetos ORM una vez con las mismas opciones que el router y mide:
+
+- pydantic: validar con `from_attributes` + `model_dump(mode="json")` +
+  `json.dumps` (lo que hace FastAPI con `response_model`).
+- orjson: `serialization.orm_response` (sin validar, bytes directos).
+
+Además mide el request completo por ASGI (camino actual). Limpia al terminar.
+
+Uso (desde backend/):
+    python -m benchmarks.serialization --clients 200 --projects 5 --rounds 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import httpx
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from auth import get_current_user
+from database import AsyncSessionLocal, SessionLocal, async_engine
+from main import app
+from models import Client, Project, ProjectService, ServiceType
+from schemas import ClientListResponse, ClientWithProjects, ProjectListResponse, ProjectWithServices
+from serialization import orm_response
+
+DOMAIN = "bench-serialization.example"
+
+def seed(db, clients: int, projects: int):
+    now = datetime.now(timezone.utc)
+    client_ids = db.execute(insert(Client).returning(Client.id), [
+        {"name": f"Bench serialización {i}", "email": f"c{i}@{DOMAIN}", "contact_person": "Contacto",
+         "legal_representative": "Representante", "phone": "+54 11 5555 0000"}
+        for i in range(clients)
+    ]).scalars().all()
+    project_ids = db.execute(insert(Project).returning(Project.id), [
+        {"client_id": client_id, "name": f"Proyecto {j}", "description": "Descripción del proyecto",
+         "start_date": now, "billing_rate": Decimal("1500.00"), "brand_colors": {"accent": "#3b82f6"}}
+        for client_id in client_ids for j in range(projects)
+    ]).scalars().all()
+    db.execute(insert(ProjectService), [
+        {"project_id": project_id, "service_type": service_type, "is_active": True, "monthly_cost": Decimal("100.00")}
+        for project_id in project_ids for service_type in ServiceType
+    ])
+    db.commit()
+    return client_ids[0], project_ids[0]
+
+def cleanup(db):
+    client_ids = select(Client.id).where(Client.email.like(f"%@{DOMAIN}")).scalar_subquery()
+    project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+    db.execute(delete(ProjectService).where(ProjectService.project_id.in_(project_ids)))
+    db.execute(delete(Project).where(Project.id.in_(project_ids)))
+    db.execute(delete(Client).where(Client.id.in_(client_ids)))
+    db.commit()
+
+async def load(client_id: int, project_id: int):
+    """Objetos ORM de cada endpoint, cargados como en los routers"""
+    async with AsyncSessionLocal() as db:
+        clients = (await db.execute(
+            select(Client).where(Client.email.like(f"%@{DOMAIN}"))
+            .options(selectinload(Client.projects)).order_by(Client.id).limit(100)
+        )).scalars().all()
+        projects = (await db.execute(
+            select(Project).where(Project.client_id.in_([client.id for client in clients]))
+            .options(joinedload(Project.client)).order_by(Project.id).limit(100)
+        )).scalars().all()
+        client = (await db.execute(
+            select(Client).options(joinedload(Client.projects)).where(Client.id == client_id)
+        )).unique().scalars().first()
+        project = (await db.execute(
+            select(Project).options(joinedload(Project.client), joinedload(Project.services))
+            .where(Project.id == project_id)
+        )).unique().scalars().first()
+    page = {"total": 1000, "total_is_estimate": False, "page": 1, "per_page": 100, "total_pages": 10}
+    return {
+        "clients_list": (ClientListResponse, {"clients": clients, **page}, "/clients/?per_page=100"),
+        "projects_list": (ProjectListResponse, {"projects": projects, **page}, "/projects/?per_page=100"),
+        "client_detail": (ClientWithProjects, client, f"/clients/{client_id}"),
+        "project_detail": (ProjectWithServices, project, f"/projects/{project_id}"),
+    }
+
+def pydantic_path(schema, value) -> bytes:
+    model = schema.model_validate(value, from_attributes=True)
+    return json.dumps(model.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+def orjson_path(schema, value) -> bytes:
+    return orm_response(schema, value).body
+
+def timed(fn, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=5, help="Proyectos por cliente")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        cleanup(db)
+        client_id, project_id = seed(db, args.clients, args.projects)
+        cases = await load(client_id, project_id)
+
+        app.dependency_overrides[get_current_user] = lambda: None
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{'endpoint':<16}{'bytes':>9}{'pydantic':>12}{'orjson':>10}{'x':>7}{'request':>11}")
+            for name, (schema, value, url) in cases.items():
+                slow = pydantic_path(schema, value)
+                fast = orjson_path(schema, value)
+                if json.loads(slow) != json.loads(fast):
+                    raise RuntimeError(f"{name}: las dos serializaciones difieren")
+                before = timed(lambda: pydantic_path(schema, value), args.rounds)
+                after = timed(lambda: orjson_path(schema, value), args.rounds)
+
+                latencies = []
+                for _ in range(max(1, args.rounds // 4)):
+                    started = time.perf_counter()
+                    (await client.get(url)).raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                print(f"{name:<16}{len(fast):>9}{before:>10.2f}ms{after:>8.2f}ms{before / after:>6.1f}x"
+                      f"{statistics.median(latencies) * 1000:>9.2f}ms")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        cleanup(db)
+        db.close()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
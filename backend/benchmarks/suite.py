@@ -0,0 +1,399 @@
+"""Suite de carga de la API: throughput y p50/p95/p99 por endpoint.
+
+Carga un conjunto de datos sintético (clientes "@bench-suite.example" con
+`--projects` proyectos cada uno, servicios activos, eventos de uso y
+facturación de los últimos meses), registra un usuario y obtiene un token real,
+y ejecuta cada escenario (un endpoint de cada router: login, dashboard,
+listados, detalle, toggles, ingesta, reportes...) con `--concurrency`
+clientes async en vuelo. Por defecto llama a la app en proceso (ASGI, sin red);
+con `--uvicorn` levanta `uvicorn main:app` en un puerto local y mide por HTTP.
+
+Guarda el resultado como JSON (commit, parámetros y métricas por escenario) en
+`benchmarks/results/` y con `--compare` muestra la variación contra una
+corrida anterior (p. ej. la del commit base). Limpia los datos al terminar.
+
+Uso (desde backend/):
+    python -m benchmarks.suite --clients 500 --requests 300 --concurrency 20
+    python -m benchmarks.suite --uvicorn --workers 2 --only clients_list,client_detail
+    python -m benchmarks.suite --compare benchmarks/results/suite-<commit>-<fecha>.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import httpx
+from sqlalchemy import delete, insert, or_, select
+
+import dashboard
+import reports
+import rollups
+from database import SessionLocal, async_engine
+from main import app
+from models import (
+    AuditLog, BillingRecord, Client, OutboxDelivery, OutboxEvent, Project, ProjectService,
+    ServiceType, ServiceUsage, UsageDailyRollup, UsageMonthlyRollup, User,
+)
+
+DOMAIN = "bench-suite.example"
+USERNAME = "bench-suite"
+PASSWORD = "bench-suite-password"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Servicios activos de cada proyecto sintético (los demás quedan desactivados)
+ACTIVE_SERVICES = (ServiceType.MDM, ServiceType.REPORTING, ServiceType.COMMUNICATION_CAMPAIGNS)
+BILLED_MONTHS = 3
+
+def seed(db, clients: int, projects: int, events: int) -> dict:
+    """Insertar el conjunto sintético con INSERT por lote; devuelve los ids creados"""
+    now = datetime.now(timezone.utc)
+    current_month = reports.month_start(now.date())
+    first_month = reports.add_months(current_month, -BILLED_MONTHS)
+
+    client_ids = db.execute(insert(Client).returning(Client.id), [
+        {"name": f"Bench Suite {i:06d}", "email": f"client{i}@{DOMAIN}",
+         "contact_person": f"Contacto {i % 97}", "phone": f"+54 11 {i:08d}"}
+        for i in range(clients)
+    ]).scalars().all()
+    project_rows = db.execute(insert(Project).returning(Project.id, Project.client_id), [
+        {"client_id": client_id, "name": f"Bench Suite {client_id} proyecto {j}",
+         "start_date": now - timedelta(days=400), "billing_rate": Decimal("100.00")}
+        for client_id in client_ids for j in range(projects)
+    ]).all()
+    project_ids = [row.id for row in project_rows]
+    service_rows = db.execute(
+        insert(ProjectService).returning(ProjectService.id, ProjectService.project_id, ProjectService.service_type),
+        [
+            {"project_id": project_id, "service_type": service_type,
+             "is_active": service_type in ACTIVE_SERVICES,
+             "activated_at": now - timedelta(days=120) if service_type in ACTIVE_SERVICES else None,
+             "monthly_cost": Decimal("50.00"), "cost_per_unit": Decimal("0.10")}
+            for project_id in project_ids for service_type in ServiceType
+        ],
+    ).all()
+    active = [row for row in service_rows if row.service_type in ACTIVE_SERVICES]
+
+    # Eventos repartidos en los meses facturados (por lotes para acotar memoria)
+    span = (now - datetime.combine(first_month, datetime.min.time(), timezone.utc)).total_seconds()
+    batch = []
+    for service in active:
+        for i in range(events):
+            batch.append({
+                "service_id": service.id,
+                "usage_date": now - timedelta(seconds=random.uniform(0, span)),
+                "usage_type": "email_sent" if i % 3 else "sms_sent",
+                "quantity": 1 + i % 5,
+                "cost": Decimal("0.10") * (1 + i % 5),
+            })
+            if len(batch) >= 10_000:
+                db.execute(insert(ServiceUsage), batch)
+                batch = []
+    if batch:
+        db.execute(insert(ServiceUsage), batch)
+
+    months = [reports.add_months(first_month, offset) for offset in range(BILLED_MONTHS)]
+    breakdown = {service_type.value: {"monthly": 50.0, "usage": 12.5, "quantity": 125}
+                 for service_type in ACTIVE_SERVICES}
+    db.execute(insert(BillingRecord), [
+        {"project_id": project_id,
+         "billing_period_start": datetime.combine(month, datetime.min.time(), timezone.utc),
+         "billing_period_end": datetime.combine(reports.add_months(month, 1), datetime.min.time(), timezone.utc),
+         "monthly_costs": Decimal("150.00"), "usage_costs": Decimal("37.50"),
+         "total_cost": Decimal("187.50"), "manual_adjustments": Decimal("0"), "cost_breakdown": breakdown}
+        for project_id in project_ids for month in months
+    ])
+    reports.bump_versions(db.connection(), months)
+    db.commit()
+
+    # Los INSERT directos no pasan por la ingesta ni por los listeners del ORM
+    rollups.rebuild(db, first_month)
+    dashboard.reconcile_sync(db)
+    return {
+        "clients": client_ids,
+        "projects": project_ids,
+        "services": {(row.project_id, row.service_type.value): row.id for row in service_rows},
+        "months": (first_month, current_month),
+    }
+
+def cleanup(db):
+    client_ids = select(Client.id).where(Client.email.like(f"%@{DOMAIN}")).scalar_subquery()
+    project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+    service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids)).scalar_subquery()
+    user_ids = select(User.id).where(User.email.like(f"%@{DOMAIN}")).scalar_subquery()
+    event_ids = select(OutboxEvent.id).where(OutboxEvent.project_id.in_(project_ids)).scalar_subquery()
+
+    db.execute(delete(OutboxDelivery).where(OutboxDelivery.event_id.in_(event_ids)))
+    db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
+    db.execute(delete(AuditLog).where(AuditLog.user_id.in_(user_ids)))
+    db.execute(delete(BillingRecord).where(BillingRecord.project_id.in_(project_ids)))
+    for model in (ServiceUsage, UsageDailyRollup, UsageMonthlyRollup):
+        db.execute(delete(model).where(model.service_id.in_(service_ids)))
+    db.execute(delete(ProjectService).where(ProjectService.id.in_(service_ids)))
+    db.execute(delete(Project).where(Project.id.in_(project_ids)))
+    db.execute(delete(Client).where(Client.id.in_(client_ids)))
+    db.execute(delete(User).where(or_(User.email.like(f"%@{DOMAIN}"), User.username == USERNAME)))
+    db.commit()
+    dashboard.reconcile_sync(db)
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class Scenario:
+    """Un endpoint: `build(i)` devuelve (método, url, kwargs de httpx) de la petición i"""
+
+    def __init__(self, name: str, build, share: float = 1.0):
+        self.name = name
+        self.build = build
+        # Fracción de --requests (los que hashean contraseñas son mucho más lentos)
+        self.share = share
+
+def scenarios(data: dict, run_id: str):
+    rng = random.Random(42)
+    clients, projects = data["clients"], data["projects"]
+    first_month, current_month = data["months"]
+    created_clients, created_projects = [], []
+    usage_date = datetime.now(timezone.utc).isoformat()
+
+    def client_id(_):
+        return rng.choice(clients)
+
+    def project_id(_):
+        return rng.choice(projects)
+
+    def usage_batch(i):
+        services = [data["services"][(project_id(i), service_type.value)] for service_type in ACTIVE_SERVICES]
+        events = [
+            {"service_id": services[j % len(services)], "usage_type": "email_sent", "quantity": 1,
+             "usage_date": usage_date, "idempotency_key": f"{run_id}-{i}-{j}"}
+            for j in range(50)
+        ]
+        return "POST", "/usage/batch", {"json": events}
+
+    def client_create(i):
+        return "POST", "/clients/", {"json": {"name": f"Bench Suite nuevo {run_id} {i}",
+                                              "email": f"new-{run_id}-{i}@{DOMAIN}"}}
+
+    def project_create(i):
+        return "POST", "/projects/", {"json": {"name": f"Bench Suite nuevo {i}", "client_id": client_id(i),
+                                               "start_date": f"{date.today():%Y-%m-%d}T00:00:00"}}
+
+    def register(i):
+        return "POST", "/auth/register", {"json": {"email": f"user-{run_id}-{i}@{DOMAIN}",
+                                                   "username": f"{USERNAME}-{run_id}-{i}",
+                                                   "password": PASSWORD}}
+
+    services = [service_type.value for service_type in ServiceType]
+    report_range = f"start={first_month}&end={current_month}"
+    return [
+        Scenario("health", lambda i: ("GET", "/health", {})),
+        Scenario("register", register, share=0.1),
+        Scenario("login", lambda i: ("POST", "/auth/login", {"data": {"username": USERNAME, "password": PASSWORD}}),
+                 share=0.1),
+        Scenario("me", lambda i: ("GET", "/auth/me", {})),
+        Scenario("service_types", lambda i: ("GET", "/services/types", {})),
+        Scenario("dashboard_stats", lambda i: ("GET", "/dashboard/stats", {})),
+        Scenario("clients_list", lambda i: ("GET", f"/clients/?page={1 + i % 20}&per_page=20", {})),
+        Scenario("clients_cursor", lambda i: ("GET", "/clients/?paginate=cursor&per_page=20", {})),
+        Scenario("clients_search", lambda i: ("GET", f"/clients/?search=Suite%20{i % len(clients):06d}", {})),
+        Scenario("client_detail", lambda i: ("GET", f"/clients/{client_id(i)}", {})),
+        Scenario("client_dashboard", lambda i: ("GET", f"/clients/{client_id(i)}/dashboard", {})),
+        Scenario("client_update", lambda i: ("PUT", f"/clients/{client_id(i)}",
+                                             {"json": {"contact_person": f"Contacto {i}"}})),
+        Scenario("projects_list", lambda i: ("GET", f"/projects/?client_id={client_id(i)}", {})),
+        Scenario("project_detail", lambda i: ("GET", f"/projects/{project_id(i)}", {})),
+        Scenario("project_services", lambda i: ("GET", f"/projects/{project_id(i)}/services", {})),
+        Scenario("project_update", lambda i: ("PUT", f"/projects/{project_id(i)}",
+                                              {"json": {"description": f"Descripción {i}"}})),
+        Scenario("service_toggle", lambda i: ("POST", f"/projects/{project_id(i)}/services/"
+                                              f"{services[i % len(services)]}/toggle", {})),
+        Scenario("services_active", lambda i: ("GET", f"/services/active/{project_id(i)}", {})),
+        Scenario("search", lambda i: ("GET", f"/search/?q=Suite%20{i % len(clients):06d}", {})),
+        Scenario("usage_batch", usage_batch),
+        Scenario("usage_summary", lambda i: ("GET", f"/usage/summary?client_id={client_id(i)}", {})),
+        Scenario("reports_costs", lambda i: ("GET", f"/reports/costs?group_by=client,month&{report_range}", {})),
+        Scenario("export_usage", lambda i: ("GET", f"/exports/usage?project_id={project_id(i)}", {})),
+        Scenario("export_billing", lambda i: ("GET", f"/exports/billing?client_id={client_id(i)}", {})),
+        # Las altas se guardan para que los DELETE borren solo lo creado por la suite
+        Scenario("client_create", client_create, share=0.5),
+        Scenario("project_create", project_create, share=0.5),
+        Scenario("project_delete", lambda i: ("DELETE", f"/projects/{created_projects.pop()}", {}), share=0.5),
+        Scenario("client_delete", lambda i: ("DELETE", f"/clients/{created_clients.pop()}", {}), share=0.5),
+    ], {"client_create": created_clients, "project_create": created_projects}
+
+async def run_scenario(client, scenario: Scenario, total: int, concurrency: int, created: dict):
+    latencies, errors = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+    # Las peticiones se arman de antemano: las de DELETE consumen ids creados
+    requests = [scenario.build(i) for i in range(total)]
+
+    async def one(method, url, kwargs):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+        elif scenario.name in created:
+            created[scenario.name].append(response.json()["id"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def start_uvicorn(workers: int):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=Path(__file__).parent.parent,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {process.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return process, base_url
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn no respondió /health en 20s")
+
+def git_commit() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain"))}
+
+def compare(current: dict, baseline_path: str, threshold: float) -> list:
+    """Imprimir la variación contra `baseline_path`; devuelve los escenarios que empeoraron"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\n📈 Contra {baseline.get('commit')} ({baseline.get('timestamp')}), umbral {threshold:.0f}%")
+    regressions = []
+    for name, result in current["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            print(f"   {name:<18} (nuevo)")
+            continue
+        p95 = (result["p95_ms"] / previous["p95_ms"] - 1) * 100 if previous["p95_ms"] else 0.0
+        rps = (result["rps"] / previous["rps"] - 1) * 100 if previous["rps"] else 0.0
+        marker = "⚠️" if p95 > threshold else "  "
+        if p95 > threshold:
+            regressions.append(name)
+        print(f"{marker} {name:<18} p95 {previous['p95_ms']:>8.1f} → {result['p95_ms']:>8.1f}ms ({p95:+6.1f}%)  "
+              f"rps {previous['rps']:>8.1f} → {result['rps']:>8.1f} ({rps:+6.1f}%)")
+    return regressions
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=3, help="Proyectos por cliente")
+    parser.add_argument("--events", type=int, default=50, help="Eventos de uso por servicio activo")
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por escenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--only", help="Escenarios separados por coma")
+    parser.add_argument("--uvicorn", action="store_true", help="Medir por HTTP contra uvicorn local")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON de una corrida anterior")
+    parser.add_argument("--threshold", type=float, default=10.0, help="%% de aumento del p95 que cuenta como regresión")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    server = None
+    try:
+        cleanup(db)
+        started = time.perf_counter()
+        data = seed(db, args.clients, args.projects, args.events)
+        print(f"📦 {len(data['clients'])} clientes, {len(data['projects'])} proyectos, "
+              f"{len(data['projects']) * len(ACTIVE_SERVICES) * args.events} eventos en "
+              f"{time.perf_counter() - started:.1f}s")
+
+        if args.uvicorn:
+            server, base_url = await start_uvicorn(args.workers)
+            client = httpx.AsyncClient(base_url=base_url, timeout=None)
+        else:
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+
+        run_id = f"{int(time.time())}"
+        results = {}
+        async with client:
+            response = await client.post("/auth/register", json={
+                "email": f"{USERNAME}@{DOMAIN}", "username": USERNAME, "password": PASSWORD,
+            })
+            response.raise_for_status()
+            response = await client.post("/auth/login", data={"username": USERNAME, "password": PASSWORD})
+            response.raise_for_status()
+            client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+            selected, created = scenarios(data, run_id)
+            if args.only:
+                names = set(args.only.split(","))
+                selected = [scenario for scenario in selected if scenario.name in names]
+            for scenario in selected:
+                total = max(1, int(args.requests * scenario.share))
+                if scenario.name in ("client_delete", "project_delete"):
+                    # Solo hay tantos como se crearon (0 si se omitió el alta)
+                    total = len(created[scenario.name.replace("delete", "create")])
+                    if not total:
+                        continue
+                result = await run_scenario(client, scenario, total, args.concurrency, created)
+                results[scenario.name] = result
+                errors = f"  errores {result['errors']}" if result["errors"] else ""
+                print(f"📊 {scenario.name:<18} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>7.1f}ms  "
+                      f"p95 {result['p95_ms']:>7.1f}ms  p99 {result['p99_ms']:>7.1f}ms{errors}")
+
+        report = {
+            **git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "mode": f"uvicorn ({args.workers} workers)" if args.uvicorn else "inprocess",
+            "database": async_engine.dialect.name,
+            "params": {key: getattr(args, key) for key in ("clients", "projects", "events", "requests", "concurrency")},
+            "scenarios": results,
+        }
+        output = Path(args.output) if args.output else RESULTS_DIR / (
+            f"suite-{report['commit'] or 'local'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        print(f"💾 Resultados en {output}")
+
+        regressions = compare(report, args.compare, args.threshold) if args.compare else []
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        cleanup(db)
+        db.close()
+        await async_engine.dispose()
+    if regressions:
+        print(f"❌ Regresiones de p95: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
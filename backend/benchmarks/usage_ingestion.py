@@ -0,0 +1,96 @@
+"""Medir el throughput (eventos/s) de POST /usage/batch.
+
+Usa la app real en proceso (sin red) con la autenticación sustituida, sobre
+los `project_services` existentes en DATABASE_URL. Cada corrida usa claves de
+idempotencia nuevas; con --replay se reenvía el mismo lote para medir el
+camino de duplicados.
+
+Uso (desde backend/):
+    python -m benchmarks.usage_ingestion --events 200000 --batch-size 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import select
+
+from auth import get_current_user
+from database import AsyncSessionLocal, async_engine
+from main import app
+from models import ProjectService
+
+USAGE_TYPES = ["email_sent", "sms_sent", "form_submission", "push_sent"]
+
+def build_events(service_ids, count, run_id):
+    usage_date = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "service_id": random.choice(service_ids),
+            "usage_type": random.choice(USAGE_TYPES),
+            "quantity": random.randint(1, 5),
+            "usage_date": usage_date,
+            "idempotency_key": f"{run_id}-{i}",
+        }
+        for i in range(count)
+    ]
+
+async def post_batches(client, events, batch_size, ndjson, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    totals = {"inserted": 0, "duplicates": 0, "rejected": 0}
+
+    async def send(batch):
+        async with semaphore:
+            if ndjson:
+                response = await client.post(
+                    "/usage/batch",
+                    content="\n".join(json.dumps(event) for event in batch),
+                    headers={"content-type": "application/x-ndjson"},
+                )
+            else:
+                response = await client.post("/usage/batch", json=batch)
+            response.raise_for_status()
+            data = response.json()
+            for key in totals:
+                totals[key] += data[key]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        send(events[i:i + batch_size]) for i in range(0, len(events), batch_size)
+    ))
+    return time.perf_counter() - started, totals
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--replay", action="store_true", help="Reenviar el mismo lote (todo duplicado)")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        service_ids = (await db.execute(select(ProjectService.id).limit(500))).scalars().all()
+    if not service_ids:
+        print("❌ No hay project_services; ejecuta seed_data.py primero")
+        return
+
+    app.dependency_overrides[get_current_user] = lambda: None
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, ndjson in (("JSON array", False), ("NDJSON", True)):
+            events = build_events(service_ids, args.events, uuid.uuid4().hex)
+            elapsed, totals = await post_batches(client, events, args.batch_size, ndjson, args.concurrency)
+            print(f"📊 {label:<10} {args.events / elapsed:10.0f} eventos/s  ({elapsed:.2f}s) {totals}")
+
+            if args.replay:
+                elapsed, totals = await post_batches(client, events, args.batch_size, ndjson, args.concurrency)
+                print(f"   replay     {args.events / elapsed:10.0f} eventos/s  ({elapsed:.2f}s) {totals}")
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+"""Motor de facturación: genera `BillingRecord` para todos los proyectos de un período.
+
+Cada partición se calcula con una sola sentencia INSERT ... SELECT sobre los
+acumulados de uso, sin iterar proyectos en Python. Reglas:
+
+- Cargo fijo: `monthly_cost` de cada servicio activo en algún momento del período.
+- Cargo por uso: solo en proyectos con `billing_type = usage`, cantidad del
+  período × `cost_per_unit` (o `Project.billing_rate` si el servicio no tiene
+  tarifa propia). Los proyectos mensuales no pagan el uso.
+- Re-ejecutar un período reemplaza los valores calculados y conserva
+  `manual_adjustments` (que se suma al total).
+
+Uso:
+    python billing.py --period 2025-06
+    python billing.py --from 2025-01 --to 2025-12 --workers 4
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timezone
+import argparse
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine
+import reports
+
+_USAGE_FROM_MONTHLY = """
+    SELECT service_id, SUM(quantity) AS quantity
+    FROM usage_monthly_rollups
+    WHERE month >= :start_day AND month < :end_day
+    GROUP BY service_id
+"""
+
+_USAGE_FROM_DAILY = """
+    SELECT service_id, SUM(quantity) AS quantity
+    FROM usage_daily_rollups
+    WHERE day >= :start_day AND day < :end_day
+    GROUP BY service_id
+"""
+
+_JSON_FUNCTIONS = {
+    "postgresql": ("json_object_agg", "json_build_object", "'{}'::json"),
+    "sqlite": ("json_group_object", "json_object", "json('{}')"),
+}
+
+_BILLING_SQL = """
+WITH period_usage AS ({usage_source}),
+lines AS (
+    SELECT
+        p.id AS project_id,
+        LOWER(CAST(ps.service_type AS TEXT)) AS service_type,
+        COALESCE(u.quantity, 0) AS quantity,
+        CASE
+            WHEN ps.activated_at < :period_end
+             AND (ps.is_active OR ps.deactivated_at >= :period_start)
+            THEN COALESCE(ps.monthly_cost, 0)
+            ELSE 0
+        END AS monthly,
+        CASE
+            WHEN p.billing_type = 'USAGE'
+            THEN COALESCE(u.quantity, 0) * COALESCE(ps.cost_per_unit, p.billing_rate, 0)
+            ELSE 0
+        END AS usage
+    FROM projects p
+    JOIN project_services ps ON ps.project_id = p.id
+    LEFT JOIN period_usage u ON u.service_id = ps.id
+    WHERE p.start_date < :period_end
+      AND (p.end_date IS NULL OR p.end_date >= :period_start)
+      AND p.id % :partitions = :partition
+)
+INSERT INTO billing_records (
+    project_id, billing_period_start, billing_period_end,
+    total_cost, monthly_costs, usage_costs, cost_breakdown, manual_adjustments
+)
+SELECT
+    project_id, :period_start, :period_end,
+    SUM(monthly) + SUM(usage), SUM(monthly), SUM(usage),
+    COALESCE(
+        {object_agg}(
+            service_type,
+            {build_object}('monthly', monthly, 'usage', usage, 'quantity', quantity)
+        ) FILTER (WHERE monthly > 0 OR usage > 0),
+        {empty_object}
+    ),
+    0
+FROM lines
+GROUP BY project_id
+ON CONFLICT (project_id, billing_period_start) DO UPDATE SET
+    billing_period_end = excluded.billing_period_end,
+    monthly_costs = excluded.monthly_costs,
+    usage_costs = excluded.usage_costs,
+    cost_breakdown = excluded.cost_breakdown,
+    total_cost = excluded.monthly_costs + excluded.usage_costs
+                 + COALESCE(billing_records.manual_adjustments, 0),
+    updated_at = CURRENT_TIMESTAMP
+RETURNING id
+"""
+
+def _is_month_aligned(start: date, end: date) -> bool:
+    return start.day == 1 and end.day == 1
+
+def billing_statement(dialect: str, start: date, end: date):
+    usage_source = _USAGE_FROM_MONTHLY if _is_month_aligned(start, end) else _USAGE_FROM_DAILY
+    object_agg, build_object, empty_object = _JSON_FUNCTIONS[dialect]
+    return text(_BILLING_SQL.format(
+        usage_source=usage_source,
+        object_agg=object_agg,
+        build_object=build_object,
+        empty_object=empty_object,
+    ))
+
+def run_partition(db: Session, start: date, end: date, partition: int = 0, partitions: int = 1) -> int:
+    """Facturar los proyectos con `id % partitions == partition` para [start, end).
+
+    Devuelve la cantidad de proyectos facturados (registros creados o actualizados).
+    """
+    stmt = billing_statement(db.get_bind().dialect.name, start, end)
+    billed = len(db.execute(stmt, {
+        "start_day": start,
+        "end_day": end,
+        "period_start": datetime.combine(start, time.min, timezone.utc),
+        "period_end": datetime.combine(end, time.min, timezone.utc),
+        "partition": partition,
+        "partitions": partitions,
+    }).all())
+    # Invalida los reportes cacheados de estos meses (en cualquier proceso)
+    reports.bump_versions(db.connection(), reports.months_between(start, end))
+    db.commit()
+    return billed
+
+def _worker(start: date, end: date, partition: int, partitions: int) -> int:
+    # Cada proceso abre sus propias conexiones (no se comparten sockets tras fork)
+    engine.dispose(close=False)
+    db = SessionLocal()
+    try:
+        return run_partition(db, start, end, partition, partitions)
+    finally:
+        db.close()
+
+def run_period(start: date, end: date, workers: int = 1) -> int:
+    """Facturar un período completo, repartiendo proyectos entre `workers` procesos"""
+    if workers <= 1:
+        return _worker(start, end, 0, 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_worker, start, end, partition, workers) for partition in range(workers)]
+        return sum(future.result() for future in futures)
+
+def _parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generar registros de facturación por período")
+    parser.add_argument("--period", type=_parse_month, help="Mes a facturar (YYYY-MM)")
+    parser.add_argument("--from", dest="start", type=_parse_month, help="Mes inicial (YYYY-MM)")
+    parser.add_argument("--to", dest="end", type=_parse_month, help="Mes final inclusive (YYYY-MM)")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos en paralelo")
+    args = parser.parse_args()
+
+    first = args.period or args.start
+    last = args.period or args.end or first
+    if first is None:
+        parser.error("Indica --period o --from/--to")
+
+    month = first
+    while month <= last:
+        started = datetime.now()
+        count = run_period(month, _next_month(month), args.workers)
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"✅ {month:%Y-%m}: {count} registros de facturación ({elapsed:.2f}s)")
+        month = _next_month(month)
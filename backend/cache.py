@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+import time
+
+_MISSING = object()
+
+class TTLCache:
+    """LRU en memoria acotado, con expiración por entrada e invalidación por clave"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING):
+        """Guardar un valor; `ttl=None` lo mantiene hasta que se invalide o se desaloje"""
+        if ttl is _MISSING:
+            ttl = self.ttl
+        if ttl is not None and ttl <= 0:
+            return
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        for key in [key for key in self._entries if predicate(key)]:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
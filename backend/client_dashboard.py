@@ -0,0 +1,135 @@
+"""Dashboard por cliente: una sola consulta agregada, con cache en memoria.
+
+La consulta trae el cliente, los conteos de proyectos por estado (`FILTER`),
+los servicios activos por tipo (agregados a un objeto JSON) y los últimos
+proyectos ordenados por fecha, en un solo round trip: una fila por proyecto
+reciente, con los agregados repetidos.
+
+El resultado se guarda por cliente y se invalida al hacer commit de cambios
+en el cliente, sus proyectos o sus servicios. Las escrituras masivas fuera
+del ORM deben llamar a `mark_projects` / `mark_clients`.
+"""
+import os
+
+from sqlalchemy import JSON, event, func, inspect, select, true
+from sqlalchemy.orm import Session, aliased
+
+from cache import TTLCache
+from models import Client, Project, ProjectService, ProjectStatus, ServiceType
+from schemas import Client as ClientSchema, Project as ProjectSchema
+
+DASHBOARD_TTL_SECONDS = float(os.getenv("CLIENT_DASHBOARD_TTL_SECONDS", "30"))
+DASHBOARD_MAX_CLIENTS = int(os.getenv("CLIENT_DASHBOARD_MAX_CLIENTS", "5000"))
+RECENT_LIMIT = 5
+
+_OBJECT_AGG = {"postgresql": func.json_object_agg, "sqlite": func.json_group_object}
+
+dashboard_cache = TTLCache(DASHBOARD_TTL_SECONDS, DASHBOARD_MAX_CLIENTS)
+
+def dashboard_statement(dialect: str, client_id: int):
+    counts = select(
+        func.count().label("total_projects"),
+        func.count().filter(Project.status == ProjectStatus.ACTIVE).label("active_projects"),
+        func.count().filter(Project.status == ProjectStatus.COMPLETED).label("completed_projects"),
+    ).where(Project.client_id == client_id).subquery("counts")
+
+    service_counts = (
+        select(ProjectService.service_type, func.count().label("active"))
+        .join(Project, Project.id == ProjectService.project_id)
+        .where(Project.client_id == client_id, ProjectService.is_active == True)
+        .group_by(ProjectService.service_type)
+        .subquery("service_counts")
+    )
+    active_services = select(
+        _OBJECT_AGG[dialect](service_counts.c.service_type, service_counts.c.active, type_=JSON)
+    ).scalar_subquery()
+
+    recent = aliased(Project, (
+        select(Project)
+        .where(Project.client_id == client_id)
+        .order_by(Project.created_at.desc(), Project.id.desc())
+        .limit(RECENT_LIMIT)
+        .subquery("recent")
+    ))
+
+    return (
+        select(
+            Client,
+            counts.c.total_projects,
+            counts.c.active_projects,
+            counts.c.completed_projects,
+            active_services.label("active_services"),
+            recent,
+        )
+        .select_from(Client)
+        .join(counts, true())
+        .outerjoin(recent, true())
+        .where(Client.id == client_id)
+        .order_by(recent.created_at.desc(), recent.id.desc())
+    )
+
+def _service_key(value) -> str:
+    # El objeto JSON trae el nombre del enum tal como está guardado (p.ej. "MDM")
+    return ServiceType[value].value if value in ServiceType.__members__ else value
+
+async def get_dashboard(db, client_id: int):
+    """Dashboard del cliente desde la cache o la base; None si no existe"""
+    cached = dashboard_cache.get(client_id)
+    if cached is not None:
+        return cached
+
+    rows = (await db.execute(dashboard_statement(db.get_bind().dialect.name, client_id))).all()
+    if not rows:
+        return None
+
+    first = rows[0]
+    dashboard = {
+        "client": ClientSchema.model_validate(first[0]),
+        "metrics": {
+            "total_projects": first.total_projects,
+            "active_projects": first.active_projects,
+            "completed_projects": first.completed_projects,
+            "active_services": {
+                _service_key(service_type): count
+                for service_type, count in sorted((first.active_services or {}).items())
+            },
+        },
+        "recent_projects": [ProjectSchema.model_validate(row[-1]) for row in rows if row[-1] is not None],
+    }
+    dashboard_cache.put(client_id, dashboard)
+    return dashboard
+
+def mark_clients(session, client_ids):
+    session.info.setdefault("client_dashboard_invalidations", set()).update(client_ids)
+
+def mark_projects(session, project_ids):
+    """Invalidar los dashboards de los clientes dueños de `project_ids`"""
+    if project_ids:
+        client_ids = session.connection().execute(
+            select(Project.client_id).where(Project.id.in_(sorted(project_ids)))
+        ).scalars()
+        mark_clients(session, client_ids)
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session, flush_context):
+    client_ids, project_ids = set(), set()
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, Client) and obj.id is not None:
+            client_ids.add(obj.id)
+        elif isinstance(obj, Project):
+            history = inspect(obj).attrs.client_id.history
+            client_ids.update(value for value in (obj.client_id, *history.deleted) if value is not None)
+        elif isinstance(obj, ProjectService) and obj.project_id is not None:
+            project_ids.add(obj.project_id)
+
+    if client_ids:
+        mark_clients(session, client_ids)
+    mark_projects(session, project_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    dashboard_cache.invalidate(session.info.pop("client_dashboard_invalidations", ()))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("client_dashboard_invalidations", None)
@@ -0,0 +1,250 @@
+"""Resumen materializado del dashboard.
+
+`/dashboard/stats` lee una sola tabla pequeña (`dashboard_summary`). Los
+contadores se actualizan con deltas dentro de la misma transacción que crea,
+borra o modifica clientes, proyectos y servicios (listener `after_flush`), y
+los "recientes" se recalculan cuando cambian. Las escrituras masivas que no
+pasan por el ORM deben llamar a `apply_deltas` / `refresh_recent`.
+
+Un job periódico (`reconcile`) recalcula todo desde las tablas base para
+corregir cualquier desvío:
+
+    python dashboard.py --reconcile
+"""
+from collections import Counter
+from datetime import datetime
+import argparse
+import asyncio
+import logging
+import os
+
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from database import AsyncSessionLocal, SessionLocal, dialect_insert
+from models import Client, DashboardSummary, Project, ProjectService, ProjectStatus
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("DASHBOARD_RECONCILE_SECONDS", "300"))
+RECENT_LIMIT = 5
+
+TOTAL_CLIENTS = "totals:clients"
+TOTAL_PROJECTS = "totals:projects"
+STATUS_PREFIX = "projects_by_status:"
+SERVICE_PREFIX = "services_by_type:"
+RECENT_CLIENTS = "recent:clients"
+RECENT_PROJECTS = "recent:projects"
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+def status_key(status) -> str:
+    return STATUS_PREFIX + _enum_value(status or ProjectStatus.ACTIVE)
+
+def service_key(service_type) -> str:
+    return SERVICE_PREFIX + _enum_value(service_type)
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _recent_clients(connection):
+    rows = connection.execute(
+        select(Client.id, Client.name, Client.email, Client.created_at)
+        .order_by(Client.created_at.desc(), Client.id.desc())
+        .limit(RECENT_LIMIT)
+    )
+    return [
+        {"id": row.id, "name": row.name, "email": row.email, "created_at": _iso(row.created_at)}
+        for row in rows
+    ]
+
+def _recent_projects(connection):
+    rows = connection.execute(
+        select(Project.id, Project.name, Client.name.label("client_name"), Project.status, Project.created_at)
+        .join(Client, Client.id == Project.client_id)
+        .order_by(Project.created_at.desc(), Project.id.desc())
+        .limit(RECENT_LIMIT)
+    )
+    return [
+        {"id": row.id, "name": row.name, "client_name": row.client_name,
+         "status": _enum_value(row.status), "created_at": _iso(row.created_at)}
+        for row in rows
+    ]
+
+def apply_deltas(connection, deltas: Counter):
+    """Sumar deltas a los contadores (UPSERT atómico, en orden de clave)"""
+    values = [{"key": key, "value": delta} for key, delta in sorted(deltas.items()) if delta]
+    if not values:
+        return
+    stmt = dialect_insert(connection, DashboardSummary).values(values)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"value": DashboardSummary.value + stmt.excluded.value, "updated_at": func.now()},
+    ))
+
+def refresh_recent(connection, clients: bool = True, projects: bool = True):
+    values = []
+    if clients:
+        values.append({"key": RECENT_CLIENTS, "payload": _recent_clients(connection)})
+    if projects:
+        values.append({"key": RECENT_PROJECTS, "payload": _recent_projects(connection)})
+    if not values:
+        return
+    stmt = dialect_insert(connection, DashboardSummary).values(values)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"payload": stmt.excluded.payload, "updated_at": func.now()},
+    ))
+
+def _changed(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+    if not history.has_changes():
+        return None
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session, flush_context):
+    deltas = Counter()
+    recent_clients = recent_projects = False
+
+    for obj, sign in [(o, 1) for o in session.new] + [(o, -1) for o in session.deleted]:
+        if isinstance(obj, Client):
+            deltas[TOTAL_CLIENTS] += sign
+            recent_clients = True
+        elif isinstance(obj, Project):
+            deltas[TOTAL_PROJECTS] += sign
+            deltas[status_key(obj.status)] += sign
+            recent_projects = True
+        elif isinstance(obj, ProjectService) and obj.is_active:
+            deltas[service_key(obj.service_type)] += sign
+
+    for obj in session.dirty:
+        if isinstance(obj, Client):
+            if _changed(obj, "name") or _changed(obj, "email"):
+                recent_clients = recent_projects = True
+        elif isinstance(obj, Project):
+            status_change = _changed(obj, "status")
+            if status_change:
+                old, new = status_change
+                if old is not None:
+                    deltas[status_key(old)] -= 1
+                deltas[status_key(new)] += 1
+            if status_change or _changed(obj, "name"):
+                recent_projects = True
+        elif isinstance(obj, ProjectService):
+            active_change = _changed(obj, "is_active")
+            if active_change and bool(active_change[0]) != bool(active_change[1]):
+                deltas[service_key(obj.service_type)] += 1 if active_change[1] else -1
+
+    if not deltas and not recent_clients and not recent_projects:
+        return
+
+    connection = session.connection()
+    apply_deltas(connection, deltas)
+    refresh_recent(connection, recent_clients, recent_projects)
+
+def _lock_summary(connection):
+    """Bloquear `dashboard_summary` hasta el commit: frena otros reconcile y los deltas"""
+    if connection.dialect.name == "postgresql":
+        # EXCLUSIVE permite lecturas (/dashboard/stats) pero no INSERT/UPDATE
+        connection.exec_driver_sql("LOCK TABLE dashboard_summary IN EXCLUSIVE MODE")
+    else:
+        # SQLite: la primera escritura toma el lock de escritura de la base
+        connection.execute(update(DashboardSummary).where(False).values(value=DashboardSummary.value))
+
+def reconcile_sync(db: Session):
+    """Recalcular el resumen completo desde las tablas base.
+
+    Toma el lock antes de contar: los deltas ya aplicados están confirmados
+    (y se cuentan) y los siguientes esperan al commit y se suman después.
+    """
+    connection = db.connection()
+    _lock_summary(connection)
+
+    counters = {
+        TOTAL_CLIENTS: db.scalar(select(func.count(Client.id))),
+        TOTAL_PROJECTS: db.scalar(select(func.count(Project.id))),
+    }
+    for status, count in db.execute(select(Project.status, func.count(Project.id)).group_by(Project.status)):
+        counters[status_key(status)] = count
+    for service_type, count in db.execute(
+        select(ProjectService.service_type, func.count(ProjectService.id))
+        .where(ProjectService.is_active == True)
+        .group_by(ProjectService.service_type)
+    ):
+        counters[service_key(service_type)] = count
+
+    stmt = dialect_insert(connection, DashboardSummary).values(
+        [{"key": key, "value": value} for key, value in sorted(counters.items())]
+    )
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"value": stmt.excluded.value, "updated_at": func.now()},
+    ))
+    # Contadores que ya no aparecen (un estado o servicio sin filas)
+    connection.execute(delete(DashboardSummary).where(
+        DashboardSummary.key.not_in([RECENT_CLIENTS, RECENT_PROJECTS, *counters])
+    ))
+    refresh_recent(connection)
+    db.commit()
+
+async def reconcile():
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(reconcile_sync)
+
+async def reconcile_periodically():
+    while True:
+        try:
+            await reconcile()
+        except Exception:
+            logger.exception("Error reconciliando el resumen del dashboard")
+        await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+
+def build_stats(rows) -> dict:
+    """Armar la respuesta de /dashboard/stats desde las filas del resumen"""
+    values = {row.key: row for row in rows}
+
+    def counter(key):
+        row = values.get(key)
+        return row.value if row is not None and row.value else 0
+
+    def prefixed(prefix):
+        return {
+            key[len(prefix):]: row.value
+            for key, row in sorted(values.items())
+            if key.startswith(prefix) and row.value
+        }
+
+    def payload(key):
+        row = values.get(key)
+        return row.payload if row is not None and row.payload else []
+
+    return {
+        "totals": {
+            "clients": counter(TOTAL_CLIENTS),
+            "projects": counter(TOTAL_PROJECTS),
+            "active_projects": counter(status_key(ProjectStatus.ACTIVE)),
+        },
+        "services_by_type": prefixed(SERVICE_PREFIX),
+        "projects_by_status": prefixed(STATUS_PREFIX),
+        "recent_clients": payload(RECENT_CLIENTS),
+        "recent_projects": payload(RECENT_PROJECTS),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento del resumen del dashboard")
+    parser.add_argument("--reconcile", action="store_true", help="Recalcular desde las tablas base")
+    args = parser.parse_args()
+
+    if not args.reconcile:
+        parser.print_help()
+    else:
+        db = SessionLocal()
+        try:
+            reconcile_sync(db)
+            print("✅ Resumen del dashboard reconciliado")
+        finally:
+            db.close()
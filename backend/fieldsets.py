@@ -0,0 +1,35 @@
+"""Campos e inclusiones pedidos por los listados (`fields`, `include`).
+
+`fields=id,name,projects.name` limita las columnas: las del recurso sin
+prefijo y las de una relación incluida con `<relación>.`. `id` siempre se
+devuelve. Las columnas no pedidas no se leen de la base (`load_only`) y no
+aparecen en la respuesta.
+"""
+from typing import Optional
+
+from sqlalchemy.orm import load_only
+
+class InvalidFields(ValueError):
+    """Campo pedido que no existe en el schema del recurso o de la relación"""
+
+def parse_fields(raw: Optional[str], schemas: dict) -> dict:
+    """"id,name,projects.name" -> {"": {"id", "name"}, "projects": {"id", "name"}}
+
+    `schemas` indica el schema de respuesta de cada prefijo ("" = el recurso).
+    """
+    selected = {}
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        prefix, _, name = item.rpartition(".")
+        schema = schemas.get(prefix)
+        if schema is None or name not in schema.model_fields:
+            raise InvalidFields(item)
+        selected.setdefault(prefix, {"id"}).add(name)
+    return selected
+
+def load_columns(model, names):
+    """`load_only` de las columnas de `model` entre `names`"""
+    columns = model.__table__.columns
+    return load_only(*(getattr(model, name) for name in sorted(names) if name in columns))
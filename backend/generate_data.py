@@ -0,0 +1,294 @@
+"""Generador de datos sintéticos a escala.
+
+Reemplaza el contenido de la base por un conjunto parametrizado: clientes,
+proyectos por cliente (con sus seis servicios, parte activos), eventos de uso
+por servicio activo y por día, y meses de historia. Con la misma `--seed` y
+`--until` produce exactamente los mismos datos (ids incluidos).
+
+- Clientes, proyectos, servicios y usuarios: INSERT por lotes con ids fijos.
+- Eventos: en PostgreSQL `COPY ... FROM STDIN` en paralelo (`--workers`
+  procesos, cada uno con sus servicios); en otras bases INSERT por lotes.
+  Las filas se arman desde un patrón precalculado por servicio, sin llamar al
+  generador aleatorio por evento.
+- Al final: acumulados de uso, facturación de los meses completos, resumen del
+  dashboard y ANALYZE.
+
+Volumen de eventos ≈ clientes × proyectos × servicios activos (~3) × días ×
+eventos por día. Por ejemplo 1000 × 5 × 3 × 365 × 20 ≈ 110M filas.
+
+Uso:
+    python generate_data.py --clients 100 --projects 5            # ~PRD, segundos
+    python generate_data.py --clients 1000 --projects 5 --events-per-day 20 --months 12 --workers 8
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+import argparse
+import io
+import random
+
+from sqlalchemy import insert, text
+
+from database import SessionLocal, engine, truncate_all
+from models import (
+    BillingType, Client, ClientUser, Project, ProjectService, ProjectStatus,
+    ServiceType, ServiceUsage, User,
+)
+from passwords import pwd_context
+import billing
+import dashboard
+import partitions
+import rollups
+
+BATCH_ROWS = 10_000
+# Eventos distintos por servicio; cada día empieza en una posición del patrón
+PATTERN_SIZE = 4096
+COPY_NULL = "\\N"
+
+USAGE_TYPES = {
+    ServiceType.MDM: ("record_sync", "record_update"),
+    ServiceType.DYNAMIC_FORMS: ("form_submission",),
+    ServiceType.REPORTING: ("report_generated", "report_export"),
+    ServiceType.ELEARNING: ("course_completion", "lesson_view"),
+    ServiceType.OMNICHANNEL: ("message_in", "message_out"),
+    ServiceType.COMMUNICATION_CAMPAIGNS: ("email_sent", "sms_sent"),
+}
+PROJECT_STATUSES = (
+    [ProjectStatus.ACTIVE] * 7 + [ProjectStatus.INACTIVE, ProjectStatus.SUSPENDED, ProjectStatus.COMPLETED]
+)
+COMPANY_WORDS = ("Acme", "Andes", "Austral", "Delta", "Norte", "Pampa", "Puerto", "Sierra", "Tucan", "Vertice")
+COMPANY_KINDS = ("Corporation", "Solutions", "Enterprises", "Labs", "Group", "Logística", "Salud", "Retail")
+FIRST_NAMES = ("Ana", "Carlos", "Lucía", "Martín", "Sofía", "Diego", "Valentina", "Jorge", "Paula", "Tomás")
+LAST_NAMES = ("García", "Rodríguez", "López", "Martínez", "Pérez", "Gómez", "Díaz", "Romero", "Suárez", "Torres")
+PROJECT_KINDS = ("Portal", "Campaña", "Plataforma", "Capacitación", "Encuestas", "CRM", "App", "Reportes")
+
+def _insert(db, model, rows):
+    for offset in range(0, len(rows), BATCH_ROWS):
+        db.execute(insert(model), rows[offset:offset + BATCH_ROWS])
+
+def _person(rng) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def _utc(day: date) -> datetime:
+    return datetime.combine(day, time.min, timezone.utc)
+
+def build_entities(rng, clients: int, projects: int, first_day: date, until: date) -> dict:
+    """Filas de usuarios, clientes, proyectos, servicios y usuarios cliente"""
+    history_days = (until - first_day).days
+    users = [
+        {"id": 1, "email": "admin@tucanmanager.com", "username": "admin",
+         "hashed_password": pwd_context.hash("admin123"), "is_active": True},
+        {"id": 2, "email": "developer@tucanmanager.com", "username": "developer",
+         "hashed_password": pwd_context.hash("dev123"), "is_active": True},
+    ]
+    client_rows, project_rows, service_rows, client_user_rows = [], [], [], []
+    for client_id in range(1, clients + 1):
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_KINDS)} {client_id}"
+        domain = company.lower().replace(" ", "-").replace("í", "i")
+        # Los clientes más viejos aparecen antes de la historia generada
+        created = _utc(first_day) - timedelta(days=rng.randrange(365), seconds=rng.randrange(86400))
+        client_rows.append({
+            "id": client_id, "name": company, "email": f"contacto@{domain}.example",
+            "legal_representative": _person(rng), "contact_person": _person(rng),
+            "phone": f"+54 11 {rng.randrange(10**7, 10**8)}", "created_at": created,
+        })
+        for _ in range(projects):
+            project_id = len(project_rows) + 1
+            start = first_day + timedelta(days=rng.randrange(max(1, history_days // 2)))
+            billing_type = rng.choice((BillingType.MONTHLY, BillingType.USAGE))
+            project_rows.append({
+                "id": project_id, "client_id": client_id,
+                "name": f"{rng.choice(PROJECT_KINDS)} {company.split()[0]} {project_id}",
+                "description": f"Proyecto sintético {project_id}",
+                "status": rng.choice(PROJECT_STATUSES), "start_date": _utc(start),
+                "primary_color": f"#{rng.randrange(0x1000000):06x}",
+                "secondary_color": f"#{rng.randrange(0x1000000):06x}",
+                "billing_type": billing_type,
+                "billing_rate": Decimal(rng.choice(("0.05", "0.10", "0.25"))) if billing_type == BillingType.USAGE
+                else Decimal(rng.randrange(500, 5000)),
+                "created_at": _utc(start) - timedelta(days=rng.randrange(1, 30)),
+            })
+            # Los seis servicios, como al crear un proyecto por la API; ~la mitad activos
+            for service_type in ServiceType:
+                active = rng.random() < 0.5
+                usage_based = rng.random() < 0.5
+                service_rows.append({
+                    "id": len(service_rows) + 1, "project_id": project_id, "service_type": service_type,
+                    "is_active": active,
+                    "cost_per_unit": Decimal(rng.choice(("0.01", "0.03", "0.05", "0.10"))) if usage_based else None,
+                    "monthly_cost": None if usage_based else Decimal(rng.randrange(100, 1500)),
+                    "activated_at": _utc(start) if active else None,
+                    "created_at": _utc(start),
+                })
+            client_user_rows.append({
+                "id": project_id, "project_id": project_id, "email": f"owner{project_id}@{domain}.example",
+                "username": f"owner_{project_id}", "full_name": _person(rng), "role": "owner",
+            })
+    return {
+        User: users, Client: client_rows, Project: project_rows,
+        ProjectService: service_rows, ClientUser: client_user_rows,
+    }
+
+def _pattern(service: tuple, seed: int):
+    """Eventos de un día tipo del servicio: (segundo del día, tipo, cantidad, costo)"""
+    service_id, service_type, cost_per_unit, _ = service
+    rng = random.Random(seed * 1_000_003 + service_id)
+    usage_types = USAGE_TYPES[ServiceType(service_type)]
+    events = []
+    for _ in range(PATTERN_SIZE):
+        quantity = rng.choice((1, 1, 1, 1, 2, 3, 5, 10))
+        cost = Decimal(cost_per_unit) * quantity if cost_per_unit else None
+        events.append((rng.randrange(86400), rng.choice(usage_types), quantity, cost))
+    return rng, events
+
+def _service_days(service: tuple, until: date, seed: int):
+    """(día, eventos del día) de un servicio; mismo resultado en cualquier proceso"""
+    rng, events = _pattern(service, seed)
+    day = service[3]
+    while day < until:
+        yield day, rng.randrange(PATTERN_SIZE), events
+        day += timedelta(days=1)
+
+def _copy_events(services, until: date, per_day: int, seed: int) -> int:
+    """COPY de los eventos de `services` en bloques de ~BATCH_ROWS × 10 filas"""
+    engine.dispose(close=False)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        # Carga reproducible: perder la última transacción ante un corte no importa
+        cursor.execute("SET synchronous_commit TO off")
+        copy_sql = "COPY service_usage (service_id, usage_date, usage_type, quantity, cost) FROM STDIN"
+        buffer, pending, total = io.StringIO(), 0, 0
+        for service in services:
+            tails = None
+            for day, start, events in _service_days(service, until, seed):
+                if tails is None:
+                    # Todo menos el servicio y la fecha, ya en formato de COPY
+                    tails = [
+                        f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}+00\t"
+                        f"{usage_type}\t{quantity}\t{COPY_NULL if cost is None else cost}\n"
+                        for second, usage_type, quantity, cost in events
+                    ]
+                prefix = f"{service[0]}\t{day.isoformat()} "
+                buffer.write("".join(
+                    prefix + tails[(start + n) % PATTERN_SIZE] for n in range(per_day)
+                ))
+                pending += per_day
+                if pending >= BATCH_ROWS * 10:
+                    buffer.seek(0)
+                    cursor.copy_expert(copy_sql, buffer)
+                    total += pending
+                    buffer, pending = io.StringIO(), 0
+        if pending:
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            total += pending
+        connection.commit()
+        return total
+    finally:
+        connection.close()
+
+def _insert_events(db, services, until: date, per_day: int, seed: int) -> int:
+    total, batch = 0, []
+    for service in services:
+        for day, start, events in _service_days(service, until, seed):
+            base = _utc(day)
+            for n in range(per_day):
+                second, usage_type, quantity, cost = events[(start + n) % PATTERN_SIZE]
+                batch.append({
+                    "service_id": service[0], "usage_date": base + timedelta(seconds=second),
+                    "usage_type": usage_type, "quantity": quantity, "cost": cost,
+                })
+            if len(batch) >= BATCH_ROWS:
+                db.execute(insert(ServiceUsage), batch)
+                total += len(batch)
+                batch = []
+    if batch:
+        db.execute(insert(ServiceUsage), batch)
+        total += len(batch)
+    db.commit()
+    return total
+
+def load_events(db, services, until: date, per_day: int, seed: int, workers: int) -> int:
+    if db.get_bind().dialect.name != "postgresql":
+        return _insert_events(db, services, until, per_day, seed)
+    if workers <= 1:
+        return _copy_events(services, until, per_day, seed)
+    # Cada proceso recibe servicios intercalados para repartir el volumen
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_copy_events, services[worker::workers], until, per_day, seed)
+            for worker in range(workers)
+        ]
+        return sum(future.result() for future in futures)
+
+def _reset_sequences(db, models):
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 0) + 1, false) FROM {table}"
+        ))
+
+def generate(clients: int, projects: int, per_day: int, months: int, seed: int,
+             until: date, workers: int = 1):
+    rng = random.Random(seed)
+    first_day = partitions.add_months(partitions.month_start(until), -months)
+    db = SessionLocal()
+    try:
+        started = datetime.now()
+        truncate_all(db)
+        entities = build_entities(rng, clients, projects, first_day, until)
+        for model, rows in entities.items():
+            _insert(db, model, rows)
+        _reset_sequences(db, entities)
+        db.commit()
+        print(f"✅ {clients} clientes, {len(entities[Project])} proyectos, "
+              f"{len(entities[ProjectService])} servicios")
+
+        # Eventos desde el inicio del proyecto (o de la historia) hasta `until`
+        starts = {row["id"]: row["start_date"].date() for row in entities[Project]}
+        services = [
+            (row["id"], row["service_type"].value,
+             str(row["cost_per_unit"]) if row["cost_per_unit"] else None,
+             max(first_day, starts[row["project_id"]]))
+            for row in entities[ProjectService] if row["is_active"]
+        ]
+        partitions.maintain(db, since=first_day, retention=False)
+        loading = datetime.now()
+        events = load_events(db, services, until, per_day, seed, workers)
+        elapsed = (datetime.now() - loading).total_seconds()
+        print(f"✅ {events} eventos de uso ({elapsed:.1f}s, {events / max(elapsed, 1e-9):,.0f} filas/s)")
+
+        rollups.rebuild(db)
+        print("✅ Acumulados de uso reconstruidos")
+        month, billed = first_day, 0
+        while partitions.add_months(month, 1) <= until:
+            billed += billing.run_period(month, partitions.add_months(month, 1), workers)
+            month = partitions.add_months(month, 1)
+        print(f"✅ {billed} registros de facturación")
+        dashboard.reconcile_sync(db)
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("ANALYZE"))
+            db.commit()
+        print(f"\n🎉 Datos generados en {(datetime.now() - started).total_seconds():.1f}s")
+    finally:
+        db.close()
+
+def _parse_day(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos (reemplaza el contenido de la base)")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--projects", type=int, default=5, help="Proyectos por cliente")
+    parser.add_argument("--events-per-day", type=int, default=10, help="Eventos por servicio activo y por día")
+    parser.add_argument("--months", type=int, default=6, help="Meses de historia antes del mes de --until")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--until", type=_parse_day, default=datetime.now(timezone.utc).date(),
+                        help="Último día (exclusivo) de eventos, YYYY-MM-DD; fijarlo hace la salida reproducible")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de carga de eventos (PostgreSQL)")
+    args = parser.parse_args()
+
+    generate(args.clients, args.projects, args.events_per_day, args.months, args.seed, args.until, args.workers)
@@ -0,0 +1,317 @@
+"""Importación de onboarding desde CSV: clientes, proyectos y sus dueños.
+
+Cada fila describe un proyecto con los datos de su cliente y, opcionalmente,
+de su dueño (`ClientUser` con rol owner); una fila sin `project_name` solo
+crea el cliente. El archivo se lee como stream y se procesa en bloques de
+`IMPORT_CHUNK_SIZE` filas: por bloque, una consulta resuelve los clientes que
+ya existen por email y otra los proyectos que ya existen por (cliente, nombre);
+el resto se inserta con un INSERT multi-fila por tabla y se hace commit. La
+memoria no depende del tamaño del archivo.
+
+- Un cliente cuyo email ya existe (en la base o antes en el archivo) se reutiliza.
+- Un proyecto con el mismo nombre en el mismo cliente es un duplicado y no se
+  crea: reimportar el mismo archivo no duplica nada.
+- Las filas inválidas se informan con su número de fila (la cabecera es la 1).
+
+Como los INSERT no pasan por el ORM, el bloque actualiza a mano lo que harían
+los listeners de `after_flush`: contadores y recientes del dashboard,
+auditoría e invalidación de los dashboards por cliente.
+
+Uso:
+    python importer.py onboarding.csv
+    curl -X POST --data-binary @onboarding.csv -H "Content-Type: text/csv" \\
+        -H "Authorization: Bearer ..." http://localhost:8000/imports/onboarding
+"""
+from collections import Counter
+import argparse
+import codecs
+import csv
+import os
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Client, ClientUser, Project, ProjectService, ServiceType
+from schemas import ClientCreate, ClientUserBase, ImportResponse, ImportRowError, ProjectBase
+import audit
+import client_dashboard
+import dashboard
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "100000"))
+MAX_REPORTED_ERRORS = 100
+# Un registro más largo casi siempre es una comilla sin cerrar
+MAX_RECORD_CHARS = 1_000_000
+
+# Columna del CSV -> campo del schema
+CLIENT_COLUMNS = {
+    "client_name": "name", "client_email": "email", "legal_representative": "legal_representative",
+    "contact_person": "contact_person", "phone": "phone",
+}
+PROJECT_COLUMNS = {
+    "project_name": "name", "description": "description", "status": "status", "start_date": "start_date",
+    "end_date": "end_date", "billing_type": "billing_type", "billing_rate": "billing_rate",
+    "primary_color": "primary_color", "secondary_color": "secondary_color",
+}
+OWNER_COLUMNS = {"owner_email": "email", "owner_username": "username", "owner_full_name": "full_name"}
+REQUIRED_COLUMNS = ("client_name", "client_email")
+
+class InvalidFile(ValueError):
+    """El archivo no se puede leer como CSV de importación (cabecera, codificación, comillas)"""
+
+class _RowError(Exception):
+    pass
+
+class _RecordParser:
+    """Agrupa líneas en registros CSV completos (un campo entre comillas puede tener saltos de línea)"""
+
+    def __init__(self):
+        self.parts = []
+        self.quotes = 0
+        self.size = 0
+        self.row = 0
+
+    def feed(self, line: str):
+        """Devuelve (número de fila, valores) al completar un registro no vacío"""
+        self.parts.append(line)
+        self.quotes += line.count('"')
+        self.size += len(line)
+        if self.quotes % 2:
+            if self.size > MAX_RECORD_CHARS:
+                raise InvalidFile(f"Comillas sin cerrar en la fila {self.row + 1}")
+            return None
+
+        record = "".join(self.parts)
+        self.parts, self.quotes, self.size = [], 0, 0
+        self.row += 1
+        if not record.strip():
+            return None
+        return self.row, next(csv.reader([record]))
+
+    def close(self):
+        if self.parts:
+            raise InvalidFile(f"Comillas sin cerrar en la fila {self.row + 1}")
+
+def iter_records(lines):
+    """Registros de un archivo abierto en modo texto (`newline=""`)"""
+    parser = _RecordParser()
+    for line in lines:
+        record = parser.feed(line)
+        if record:
+            yield record
+    parser.close()
+
+async def aiter_records(stream):
+    """Registros de un stream de bytes (body del request) sin cargarlo completo"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    parser = _RecordParser()
+    buffer = ""
+    try:
+        async for chunk in stream:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                record = parser.feed(line + "\n")
+                if record:
+                    yield record
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise InvalidFile("El archivo no está en UTF-8")
+    record = parser.feed(buffer) if buffer else None
+    if record:
+        yield record
+    parser.close()
+
+def _validate(schema, values: dict, columns: dict, optional: bool = True):
+    """Instanciar `schema` con las columnas no vacías; None si son opcionales y están todas vacías"""
+    data = {field: values[column].strip() for column, field in columns.items() if values.get(column, "").strip()}
+    if not data and optional:
+        return None
+    try:
+        return schema(**data)
+    except ValidationError as exc:
+        column_of = {field: column for column, field in columns.items()}
+        raise _RowError("; ".join(
+            f"{column_of.get(err['loc'][0], err['loc'][0]) if err['loc'] else 'fila'}: {err['msg']}"
+            for err in exc.errors()
+        ))
+
+class Importer:
+    """Valida filas y las inserta por bloque"""
+
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.header = None
+        self.pending = []
+        # Clientes ya validados en el bloque: las filas suelen repetir el mismo cliente
+        self.clients = {}
+        self.result = ImportResponse(received=0, clients_created=0, projects_created=0,
+                                     owners_created=0, duplicates=0, rejected=0)
+
+    def _set_header(self, values):
+        header = [value.strip().lower() for value in values]
+        known = set(CLIENT_COLUMNS) | set(PROJECT_COLUMNS) | set(OWNER_COLUMNS)
+        unknown = [column for column in header if column not in known]
+        if unknown:
+            raise InvalidFile(f"Columnas desconocidas: {', '.join(unknown)}")
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            raise InvalidFile(f"Faltan columnas: {', '.join(missing)}")
+        self.header = header
+
+    def reject(self, row: int, error: str):
+        self.result.rejected += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append(ImportRowError(row=row, error=error))
+
+    def add(self, row: int, values) -> bool:
+        """Validar una fila; devuelve True cuando el bloque está lleno (llamar a `flush`)"""
+        if self.header is None:
+            self._set_header(values)
+            return False
+
+        self.result.received += 1
+        if self.result.received > IMPORT_MAX_ROWS:
+            raise InvalidFile(f"El archivo supera el máximo de {IMPORT_MAX_ROWS} filas")
+        if len(values) != len(self.header):
+            self.reject(row, f"Se esperaban {len(self.header)} columnas y hay {len(values)}")
+            return False
+
+        values = dict(zip(self.header, values))
+        try:
+            client_key = tuple(values.get(column, "") for column in CLIENT_COLUMNS)
+            client = self.clients.get(client_key)
+            if client is None:
+                client = self.clients[client_key] = _validate(ClientCreate, values, CLIENT_COLUMNS, optional=False)
+            project = _validate(ProjectBase, values, PROJECT_COLUMNS)
+            owner = _validate(ClientUserBase, values, OWNER_COLUMNS)
+            if owner is not None and project is None:
+                raise _RowError("owner_email requiere project_name")
+        except _RowError as exc:
+            self.reject(row, str(exc))
+            return False
+
+        self.pending.append((client, project, owner))
+        return len(self.pending) >= self.chunk_size
+
+    def flush(self, session: Session):
+        """Insertar el bloque pendiente en la transacción de `session` (sin commit)"""
+        rows, self.pending = self.pending, []
+        self.clients = {}
+        if not rows:
+            return
+
+        # Una consulta para los clientes existentes del bloque
+        client_ids = {}
+        for client_id, email in session.execute(
+            select(Client.id, Client.email)
+            .where(Client.email.in_({client.email for client, _, _ in rows}))
+            .order_by(Client.id)
+        ):
+            client_ids.setdefault(email, client_id)
+
+        # Y otra para los proyectos existentes de esos clientes
+        pairs = {(client_ids[client.email], project.name)
+                 for client, project, _ in rows if project and client.email in client_ids}
+        existing = set()
+        if pairs:
+            existing = set(session.execute(
+                select(Project.client_id, Project.name).where(tuple_(Project.client_id, Project.name).in_(pairs))
+            ).tuples())
+
+        new_clients, projects, seen = {}, [], set()
+        for client, project, owner in rows:
+            if client.email not in client_ids and client.email not in new_clients:
+                new_clients[client.email] = client
+            if project is None:
+                continue
+
+            key = (client.email, project.name)
+            if key in seen or (client_ids.get(client.email), project.name) in existing:
+                self.result.duplicates += 1
+                continue
+            seen.add(key)
+            projects.append((client.email, project, owner))
+
+        connection = session.connection()
+        project_ids, services, owners = [], [], []
+        if new_clients:
+            created = connection.execute(
+                insert(Client).returning(Client.id, Client.email, sort_by_parameter_order=True),
+                [client.model_dump() for client in new_clients.values()],
+            ).all()
+            client_ids.update((email, client_id) for client_id, email in created)
+        if projects:
+            project_ids = connection.execute(
+                insert(Project).returning(Project.id, sort_by_parameter_order=True),
+                [{**project.model_dump(), "client_id": client_ids[email]} for email, project, _ in projects],
+            ).scalars().all()
+            services = connection.execute(
+                insert(ProjectService).returning(ProjectService.id, ProjectService.project_id,
+                                                 ProjectService.service_type),
+                [{"project_id": project_id, "service_type": service_type, "is_active": False}
+                 for project_id in project_ids for service_type in ServiceType],
+            ).all()
+            owners = [{**owner.model_dump(), "project_id": project_id, "is_active": True}
+                      for project_id, (_, _, owner) in zip(project_ids, projects) if owner]
+            if owners:
+                connection.execute(insert(ClientUser), owners)
+
+        # Lo que harían los listeners de after_flush si las filas pasaran por el ORM
+        deltas = Counter({dashboard.TOTAL_CLIENTS: len(new_clients), dashboard.TOTAL_PROJECTS: len(projects)})
+        entries = [
+            audit.entry("client_created", "client", client_ids[email], new_values=client.model_dump(mode="json"))
+            for email, client in new_clients.items()
+        ]
+        for project_id, (email, project, _) in zip(project_ids, projects):
+            deltas[dashboard.status_key(project.status)] += 1
+            entries.append(audit.entry("project_created", "project", project_id, new_values={
+                **project.model_dump(mode="json", exclude_none=True), "client_id": client_ids[email]}))
+        entries.extend(
+            audit.entry("service_created", "project_service", service_id, new_values={
+                "project_id": project_id, "service_type": service_type.value, "is_active": False})
+            for service_id, project_id, service_type in services
+        )
+        dashboard.apply_deltas(connection, deltas)
+        dashboard.refresh_recent(connection, clients=bool(new_clients), projects=bool(projects))
+        client_dashboard.mark_clients(session, {client_ids[email] for email, _, _ in projects})
+        audit.record(session, entries)
+
+        self.result.clients_created += len(new_clients)
+        self.result.projects_created += len(projects)
+        self.result.owners_created += len(owners)
+
+    def finish(self) -> ImportResponse:
+        self.result.errors.sort(key=lambda error: error.row)
+        return self.result
+
+def import_file(path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportResponse:
+    importer = Importer(chunk_size)
+    with open(path, newline="", encoding="utf-8-sig") as handle, SessionLocal() as session:
+        try:
+            for row, values in iter_records(handle):
+                if importer.add(row, values):
+                    importer.flush(session)
+                    session.commit()
+        except UnicodeDecodeError:
+            raise InvalidFile("El archivo no está en UTF-8")
+        importer.flush(session)
+        session.commit()
+    return importer.finish()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importar clientes, proyectos y dueños desde un CSV")
+    parser.add_argument("path", help="Archivo CSV (UTF-8, con cabecera)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Filas por bloque")
+    args = parser.parse_args()
+
+    try:
+        result = import_file(args.path, args.chunk_size)
+    except InvalidFile as exc:
+        parser.error(str(exc))
+    print(f"✅ {result.received} filas: {result.clients_created} clientes, {result.projects_created} proyectos, "
+          f"{result.owners_created} dueños, {result.duplicates} duplicados, {result.rejected} rechazadas")
+    for error in result.errors:
+        print(f"   fila {error.row}: {error.error}")
@@ -1,11 +1,40 @@
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session, joinedload
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
-from routers import auth, clients, projects
+from models import DashboardSummary
+from serialization import FastJSONResponse
+from routers import auth, clients, projects, usage, service_lookup, search, exports, reports, imports
+import asyncio
+import audit
+import dashboard
+import metrics
+import outbox
+import passwords
 
-app = FastAPI(title="Tucan Manager API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tareas de fondo: reconciliación del dashboard y outbox de webhooks
+    tasks = [asyncio.create_task(dashboard.reconcile_periodically())]
+    # Despachador de webhooks (solo si hay destinos configurados)
+    if outbox.WEBHOOK_URLS:
+        tasks.append(asyncio.create_task(outbox.dispatch_forever()))
+    # Writer de auditoría en lotes (AUDIT_MODE=buffered)
+    if audit.AUDIT_MODE == "buffered":
+        tasks.append(asyncio.create_task(audit.write_periodically()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Vaciar la cola de auditoría antes de salir
+    await audit.flush()
 
+app = FastAPI(title="Tucan Manager API", version="1.0.0", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+app.add_middleware(audit.AuditContextMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -13,19 +42,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Último agregado = más externo: mide también el resto de los middlewares
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(clients.router)
 app.include_router(projects.router)
+app.include_router(usage.router)
+app.include_router(service_lookup.router)
+app.include_router(search.router)
+app.include_router(exports.router)
+app.include_router(reports.router)
+app.include_router(imports.router)
 
 @app.get("/")
 async def root():
     return {"message": "Tucan Manager API is running"}
 
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+async def health_check(response: Response):
+    database = await metrics.database_health()
+    if not database["ok"]:
+        response.status_code = 503
+    return {
+        "status": "healthy" if database["ok"] else "unhealthy",
+        "database": database,
+        "password_hashing": passwords.pool_stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Métricas por ruta en formato de texto de Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/services/types")
 async def get_service_types():
@@ -39,59 +88,7 @@ async def get_service_types():
     }
 
 @app.get("/dashboard/stats")
-async def get_dashboard_stats(db: Session = Depends(get_db)):
-    """Obtener estadísticas generales del dashboard"""
-    from models import Client, Project, ProjectService, ProjectStatus
-    from sqlalchemy import func, text
-    
-    # Estadísticas básicas
-    total_clients = db.query(Client).count()
-    total_projects = db.query(Project).count()
-    active_projects = db.query(Project).filter(Project.status == ProjectStatus.ACTIVE).count()
-    
-    # Servicios activos por tipo
-    services_stats = db.query(
-        ProjectService.service_type,
-        func.count(ProjectService.id).label('count')
-    ).filter(ProjectService.is_active == True).group_by(ProjectService.service_type).all()
-    
-    # Proyectos por estado
-    status_stats = db.query(
-        Project.status,
-        func.count(Project.id).label('count')
-    ).group_by(Project.status).all()
-    
-    # Clientes recientes (últimos 5)
-    recent_clients = db.query(Client).order_by(Client.created_at.desc()).limit(5).all()
-    
-    # Proyectos recientes (últimos 5)
-    recent_projects = db.query(Project).options(
-        joinedload(Project.client)
-    ).order_by(Project.created_at.desc()).limit(5).all()
-    
-    return {
-        "totals": {
-            "clients": total_clients,
-            "projects": total_projects,
-            "active_projects": active_projects
-        },
-        "services_by_type": {stat.service_type.value: stat.count for stat in services_stats},
-        "projects_by_status": {stat.status.value: stat.count for stat in status_stats},
-        "recent_clients": [
-            {
-                "id": client.id,
-                "name": client.name,
-                "email": client.email,
-                "created_at": client.created_at
-            } for client in recent_clients
-        ],
-        "recent_projects": [
-            {
-                "id": project.id,
-                "name": project.name,
-                "client_name": project.client.name,
-                "status": project.status.value,
-                "created_at": project.created_at
-            } for project in recent_projects
-        ]
-    }
\ No newline at end of file
+async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
+    """Obtener estadísticas generales del dashboard (desde el resumen materializado)"""
+    result = await db.execute(select(DashboardSummary))
+    return dashboard.build_stats(result.scalars().all())
@@ -0,0 +1,209 @@
+"""Métricas por endpoint en formato Prometheus (`GET /metrics`).
+
+`MetricsMiddleware` mide cada request (latencia, estado) y, con los hooks
+`before_cursor_execute` / `after_cursor_execute` del engine async, cuántas
+consultas SQL hizo y cuánto tiempo pasó en la base. Todo se agrupa por la ruta
+declarada (`/clients/{client_id}`, no la URL), así la cardinalidad no crece
+con los ids.
+
+Si un request ejecuta la misma sentencia (mismo SQL, distintos parámetros)
+`N_PLUS_ONE_THRESHOLD` veces o más, se cuenta en `http_n_plus_one_total` y se
+registra un warning con la sentencia: casi siempre es una relación cargada
+por objeto en vez de con `selectinload`.
+
+Las métricas viven en memoria de cada proceso: con varios workers de uvicorn
+cada uno expone las suyas (Prometheus las suma por instancia).
+"""
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import event, text
+
+from database import async_engine
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+HEALTH_DB_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "2"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+
+_current: ContextVar = ContextVar("metrics_request", default=None)
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [conteo por bucket..., +Inf], suma
+        self.counts = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self.sums = defaultdict(float)
+
+    def observe(self, labels: tuple, value: float):
+        counts = self.counts[labels]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        counts[-1] += 1
+        self.sums[labels] += value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, counts in sorted(self.counts.items()):
+            base = _labels(label_names, labels)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {counts[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {self.sums[labels]}")
+            lines.append(f"{self.name}_count{{{base}}} {counts[-1]}")
+        return lines
+
+class CounterMetric:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values = defaultdict(float)
+
+    def inc(self, labels: tuple, amount: float = 1):
+        self.values[labels] += amount
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{{{_labels(label_names, labels)}}} {value:g}")
+        return lines
+
+def _labels(names, values) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+ROUTE_LABELS = ("method", "route")
+requests_total = CounterMetric("http_requests_total", "Requests por ruta y código de estado")
+request_duration = Histogram("http_request_duration_seconds", "Latencia de los requests", LATENCY_BUCKETS)
+request_queries = Histogram("http_request_queries", "Consultas SQL por request", QUERY_BUCKETS)
+db_seconds_total = CounterMetric("http_request_db_seconds_total", "Tiempo en la base por ruta")
+n_plus_one_total = CounterMetric("http_n_plus_one_total", "Requests con una sentencia repetida (posible N+1)")
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Latencia, consultas y tiempo de base de cada request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            _observe(scope, status_code, elapsed, stats)
+
+def _observe(scope, status_code: int, elapsed: float, stats: _RequestStats):
+    labels = (scope["method"], _route(scope))
+    requests_total.inc(labels + (str(status_code),))
+    request_duration.observe(labels, elapsed)
+    request_queries.observe(labels, stats.queries)
+    db_seconds_total.inc(labels, stats.db_seconds)
+
+    if stats.statements:
+        statement, count = stats.statements.most_common(1)[0]
+        if count >= N_PLUS_ONE_THRESHOLD:
+            n_plus_one_total.inc(labels)
+            logger.warning("Posible N+1 en %s %s: %d ejecuciones de %s",
+                           labels[0], labels[1], count, " ".join(statement.split())[:300])
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("metrics_started")
+    if stats is None or not started:
+        return
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - started.pop()
+    stats.statements[statement] += 1
+
+def pool_status() -> dict:
+    """Conexiones del pool async en uso frente a la capacidad (tamaño + overflow)"""
+    pool = async_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"pool": type(pool).__name__}
+    size, checked_out = pool.size(), pool.checkedout()
+    # QueuePool no expone max_overflow públicamente
+    capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+    return {
+        "size": size,
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    }
+
+async def ping_database() -> dict:
+    """Latencia de un SELECT 1 (incluye esperar una conexión del pool)"""
+    started = time.perf_counter()
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as exc:
+        return {"ok": False, "error": type(exc).__name__, "ping_ms": round((time.perf_counter() - started) * 1000, 2)}
+    return {"ok": True, "ping_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+async def database_health() -> dict:
+    try:
+        ping = await asyncio.wait_for(ping_database(), HEALTH_DB_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        # El pool no entregó una conexión a tiempo: saturado o base caída
+        ping = {"ok": False, "error": "timeout", "ping_ms": HEALTH_DB_TIMEOUT_SECONDS * 1000}
+    return {**ping, "pool": pool_status()}
+
+def render() -> str:
+    lines = []
+    lines += requests_total.render(ROUTE_LABELS + ("status",))
+    lines += request_duration.render(ROUTE_LABELS)
+    lines += request_queries.render(ROUTE_LABELS)
+    lines += db_seconds_total.render(ROUTE_LABELS)
+    lines += n_plus_one_total.render(ROUTE_LABELS)
+    pool = pool_status()
+    for key in ("size", "checked_out", "overflow", "capacity"):
+        if key in pool:
+            lines += [f"# TYPE db_pool_{key} gauge", f"db_pool_{key} {pool[key]}"]
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, DECIMAL, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, DateTime, ForeignKey, Text, JSON, DECIMAL, Enum, Index, Identity, DDL, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import query_expression, relationship
+from sqlalchemy.schema import PrimaryKeyConstraint
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -22,6 +24,30 @@ class ServiceType(str, enum.Enum):
     OMNICHANNEL = "omnichannel"
     COMMUNICATION_CAMPAIGNS = "communication_campaigns"
 
+# Extensión requerida por los índices de búsqueda (create_all en PostgreSQL)
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# Tablas de eventos particionadas por mes en PostgreSQL (ver partitions.py).
+# La PK incluye la columna de partición, como exige PostgreSQL; en SQLite la
+# PK queda solo en `id` para que siga siendo autoincremental (rowid).
+def partitioned_by(column: str) -> dict:
+    return {"postgresql_partition_by": f"RANGE ({column})"}
+
+@compiles(PrimaryKeyConstraint, "sqlite")
+def _sqlite_primary_key(constraint, compiler, **kw):
+    if constraint.table.kwargs.get("postgresql_partition_by"):
+        return "PRIMARY KEY (id)"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+def _default_partition(table_name: str):
+    # Recibe las filas fuera de los meses creados: la ingesta nunca falla
+    return DDL(
+        f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT"
+    ).execute_if(dialect="postgresql")
+
 # Admin Users (tu equipo)
 class User(Base):
     __tablename__ = "users"
@@ -48,9 +74,24 @@ class Client(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Cantidad de proyectos, solo cuando la consulta la pide (with_expression)
+    project_count = query_expression()
+    
     # Relationships
     projects = relationship("Project", back_populates="client", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Paginación por cursor: (created_at, id) y (name, id)
+        Index("ix_clients_created_at_id", "created_at", "id"),
+        Index("ix_clients_name_id", "name", "id"),
+        # Búsqueda (ILIKE y similitud) con pg_trgm
+        *(
+            Index(f"ix_clients_{column}_trgm", column, postgresql_using="gin",
+                  postgresql_ops={column: "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+            for column in ("name", "email", "legal_representative", "contact_person")
+        ),
+    )
+
 # Proyectos
 class Project(Base):
     __tablename__ = "projects"
@@ -73,6 +114,9 @@ class Project(Base):
     billing_type = Column(Enum(BillingType), default=BillingType.MONTHLY)
     billing_rate = Column(DECIMAL(10, 2))  # Valor base para cálculos
     
+    # Versión del estado de servicios (se incrementa en cada cambio, usada como ETag)
+    services_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -82,6 +126,16 @@ class Project(Base):
     client_users = relationship("ClientUser", back_populates="project", cascade="all, delete-orphan")
     billing_records = relationship("BillingRecord", back_populates="project", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Paginación por cursor: (created_at, id) y (name, id)
+        Index("ix_projects_created_at_id", "created_at", "id"),
+        Index("ix_projects_name_id", "name", "id"),
+        Index("ix_projects_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        # Proyectos de un cliente, filtrados por estado
+        Index("ix_projects_client_status", "client_id", "status"),
+    )
+
 # Servicios por proyecto
 class ProjectService(Base):
     __tablename__ = "project_services"
@@ -104,13 +158,20 @@ class ProjectService(Base):
     # Relationships
     project = relationship("Project", back_populates="services")
     usage_records = relationship("ServiceUsage", back_populates="service", cascade="all, delete-orphan")
+    daily_usage = relationship("UsageDailyRollup", cascade="all, delete-orphan")
+    monthly_usage = relationship("UsageMonthlyRollup", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Un servicio de cada tipo por proyecto (toggle, snapshots, activación)
+        Index("uq_project_services_project_type", "project_id", "service_type", unique=True),
+    )
 
 # Usuarios cliente (owners por proyecto)
 class ClientUser(Base):
     __tablename__ = "client_users"
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     email = Column(String, nullable=False)
     username = Column(String, nullable=False)
     full_name = Column(String)
@@ -124,21 +185,63 @@ class ClientUser(Base):
     # Relationships
     project = relationship("Project", back_populates="client_users")
 
+# Columnas del índice único de idempotencia de service_usage por dialecto
+USAGE_IDEMPOTENCY_COLUMNS = {
+    "postgresql": ("service_id", "idempotency_key", "usage_date"),
+    "sqlite": ("service_id", "idempotency_key"),
+}
+
 # Tracking de uso de servicios
 class ServiceUsage(Base):
     __tablename__ = "service_usage"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), Identity(), primary_key=True, index=True)
     service_id = Column(Integer, ForeignKey("project_services.id"), nullable=False)
-    usage_date = Column(DateTime(timezone=True), server_default=func.now())
+    usage_date = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     usage_type = Column(String)  # email_sent, sms_sent, form_submission, etc.
     quantity = Column(Integer, default=1)
     cost = Column(DECIMAL(10, 2))
     usage_metadata = Column(JSON)  # Información adicional del uso
+    idempotency_key = Column(String)  # Clave del productor para reintentos sin duplicar
     
     # Relationships
     service = relationship("ProjectService", back_populates="usage_records")
 
+    __table_args__ = (
+        # En PostgreSQL incluye la fecha: los índices únicos de una tabla
+        # particionada deben contener la columna de partición (los reintentos
+        # repiten usage_date, obligatoria junto a idempotency_key)
+        Index("uq_service_usage_idempotency", *USAGE_IDEMPOTENCY_COLUMNS["postgresql"],
+              unique=True).ddl_if(dialect="postgresql"),
+        Index("uq_service_usage_idempotency", *USAGE_IDEMPOTENCY_COLUMNS["sqlite"],
+              unique=True).ddl_if(dialect="sqlite"),
+        # Uso de un servicio por rango de fechas
+        Index("ix_service_usage_service_date", "service_id", "usage_date"),
+        partitioned_by("usage_date"),
+    )
+
+event.listen(ServiceUsage.__table__, "after_create", _default_partition("service_usage"))
+
+# Acumulados de uso (mantenidos incrementalmente en la ingesta)
+class UsageDailyRollup(Base):
+    __tablename__ = "usage_daily_rollups"
+
+    service_id = Column(Integer, ForeignKey("project_services.id"), primary_key=True)
+    usage_type = Column(String, primary_key=True)  # "" cuando el evento no trae tipo
+    day = Column(Date, primary_key=True)  # Día UTC
+    quantity = Column(BigInteger, nullable=False, default=0)
+    cost = Column(DECIMAL(14, 2), nullable=False, default=0)
+    event_count = Column(BigInteger, nullable=False, default=0)
+
+class UsageMonthlyRollup(Base):
+    __tablename__ = "usage_monthly_rollups"
+
+    service_id = Column(Integer, ForeignKey("project_services.id"), primary_key=True)
+    month = Column(Date, primary_key=True)  # Primer día del mes (UTC)
+    quantity = Column(BigInteger, nullable=False, default=0)
+    cost = Column(DECIMAL(14, 2), nullable=False, default=0)
+    event_count = Column(BigInteger, nullable=False, default=0)
+
 # Registros de facturación
 class BillingRecord(Base):
     __tablename__ = "billing_records"
@@ -166,19 +269,81 @@ class BillingRecord(Base):
     # Relationships
     project = relationship("Project", back_populates="billing_records")
 
+    __table_args__ = (
+        # Un registro por proyecto y período: permite re-ejecutar la facturación
+        Index("uq_billing_records_project_period", "project_id", "billing_period_start", unique=True),
+    )
+
+# Versión de la facturación de cada mes: la incrementa cada escritura de
+# billing_records y valida la cache de reportes entre procesos
+class BillingPeriodVersion(Base):
+    __tablename__ = "billing_period_versions"
+
+    month = Column(Date, primary_key=True)  # Primer día del mes (UTC)
+    version = Column(BigInteger, nullable=False, default=1)
+
+# Resumen materializado del dashboard (contadores y últimos registros)
+class DashboardSummary(Base):
+    __tablename__ = "dashboard_summary"
+
+    key = Column(String, primary_key=True)  # totals:clients, services_by_type:mdm, recent:projects...
+    value = Column(BigInteger)
+    payload = Column(JSON)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Outbox transaccional de eventos para microservicios (webhooks)
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)  # service.activated, service.deactivated
+    project_id = Column(Integer, index=True)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    deliveries = relationship("OutboxDelivery", back_populates="event", cascade="all, delete-orphan")
+
+class OutboxDelivery(Base):
+    __tablename__ = "outbox_deliveries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("outbox_events.id"), nullable=False, index=True)
+    destination = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, delivered, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text)
+    delivered_at = Column(DateTime(timezone=True))
+
+    # Relationships
+    event = relationship("OutboxEvent", back_populates="deliveries")
+
+    __table_args__ = (
+        Index("ix_outbox_deliveries_due", "status", "next_attempt_at"),
+    )
+
 # Auditoría de cambios críticos
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), Identity(), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     action = Column(String, nullable=False)  # service_activated, service_deactivated, etc.
     entity_type = Column(String, nullable=False)  # project_service, client, etc.
     entity_id = Column(Integer, nullable=False)
-    old_values = Column(JSON)
-    new_values = Column(JSON)
+    old_values = Column(JSON(none_as_null=True))
+    new_values = Column(JSON(none_as_null=True))
     ip_address = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     
     # Relationships
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+    __table_args__ = (
+        # Historial de una entidad
+        Index("ix_audit_logs_entity", "entity_type", "entity_id"),
+        partitioned_by("created_at"),
+    )
+
+event.listen(AuditLog.__table__, "after_create", _default_partition("audit_logs"))
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""Outbox transaccional y despachador de webhooks.
+
+Los cambios de servicios se registran en `outbox_events` dentro de la misma
+transacción que los produce, con una fila en `outbox_deliveries` por cada
+destino de `WEBHOOK_DESTINATIONS` (URLs separadas por coma). El despachador
+corre en segundo plano: toma las entregas pendientes, las agrupa por destino,
+las envía en paralelo (un POST por destino con `{"events": [...]}`) y
+reintenta con backoff exponencial. Los receptores deben deduplicar por `id`.
+
+Sin destinos configurados no se registra nada. El despachador también borra
+periódicamente los eventos entregados a todos sus destinos que superan
+`OUTBOX_RETENTION_DAYS`; los que tienen entregas fallidas se conservan.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import random
+import time
+
+import httpx
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from database import AsyncSessionLocal
+from models import OutboxDelivery, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URLS = [url.strip() for url in os.getenv("WEBHOOK_DESTINATIONS", "").split(",") if url.strip()]
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "3"))
+POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 300.0
+# Tiempo que una entrega queda reservada por un worker mientras se envía
+LEASE_SECONDS = WEBHOOK_TIMEOUT_SECONDS * 2
+# Días que se conservan los eventos ya entregados (0 = sin retención)
+RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+PRUNE_INTERVAL_SECONDS = 300
+PRUNE_BATCH_SIZE = 1000
+
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+_wakeup = asyncio.Event()
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+def enqueue(db, event_type: str, payload: dict, project_id=None):
+    """Agregar un evento al outbox en la transacción actual de `db`.
+
+    Sin destinos no hay entregas que hacer: no se registra y devuelve None.
+    """
+    if not WEBHOOK_URLS:
+        return None
+    now = _utcnow()
+    outbox_event = OutboxEvent(
+        event_type=event_type,
+        project_id=project_id,
+        payload=payload,
+        deliveries=[
+            OutboxDelivery(destination=url, status=PENDING, attempts=0, next_attempt_at=now)
+            for url in WEBHOOK_URLS
+        ],
+    )
+    db.add(outbox_event)
+    db.info["outbox_enqueued"] = True
+    return outbox_event
+
+def enqueue_service_change(db, project_id: int, changes):
+    """Registrar uno o varios cambios de servicio como un solo evento.
+
+    `changes` es una lista de (service_type, is_active).
+    """
+    changes = [(getattr(service_type, "value", service_type), bool(is_active)) for service_type, is_active in changes]
+    if len(changes) == 1:
+        event_type = "service.activated" if changes[0][1] else "service.deactivated"
+    else:
+        event_type = "services.changed"
+
+    return enqueue(db, event_type, {
+        "project_id": project_id,
+        "services": [{"type": service_type, "is_active": is_active} for service_type, is_active in changes],
+        "occurred_at": _utcnow().isoformat(),
+    }, project_id=project_id)
+
+def enqueue_bulk_service_change(db, changes):
+    """Registrar cambios de servicio de varios proyectos como un solo evento.
+
+    `changes` es una lista de (project_id, service_type, is_active).
+    """
+    by_project = defaultdict(list)
+    for project_id, service_type, is_active in changes:
+        by_project[project_id].append({
+            "type": getattr(service_type, "value", service_type),
+            "is_active": bool(is_active),
+        })
+
+    return enqueue(db, "services.bulk_changed", {
+        "projects": [
+            {"project_id": project_id, "services": services}
+            for project_id, services in sorted(by_project.items())
+        ],
+        "occurred_at": _utcnow().isoformat(),
+    })
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop("outbox_enqueued", False):
+        _wakeup.set()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_wakeup(session):
+    session.info.pop("outbox_enqueued", None)
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+async def _claim():
+    """Reservar entregas vencidas (SKIP LOCKED para varios workers)"""
+    async with AsyncSessionLocal() as db:
+        now = _utcnow()
+        rows = (await db.execute(
+            select(OutboxDelivery.id, OutboxDelivery.destination, OutboxDelivery.attempts,
+                   OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload, OutboxEvent.created_at)
+            .join(OutboxEvent, OutboxEvent.id == OutboxDelivery.event_id)
+            .where(OutboxDelivery.status == PENDING, OutboxDelivery.next_attempt_at <= now)
+            .order_by(OutboxDelivery.id)
+            .limit(BATCH_SIZE)
+            .with_for_update(skip_locked=True, of=OutboxDelivery)
+        )).all()
+        if rows:
+            await db.execute(
+                update(OutboxDelivery)
+                .where(OutboxDelivery.id.in_([row[0] for row in rows]))
+                .values(next_attempt_at=now + timedelta(seconds=LEASE_SECONDS))
+            )
+            await db.commit()
+        return rows
+
+async def _post(client: httpx.AsyncClient, destination: str, rows):
+    body = {"events": [
+        {"id": event_id, "type": event_type, "created_at": created_at.isoformat() if created_at else None,
+         "data": payload}
+        for _, _, _, event_id, event_type, payload, created_at in rows
+    ]}
+    try:
+        response = await client.post(destination, json=body)
+        response.raise_for_status()
+        return None
+    except httpx.HTTPError as exc:
+        return f"{type(exc).__name__}: {exc}"[:1000]
+
+async def dispatch_once(client: httpx.AsyncClient) -> int:
+    """Enviar un lote de entregas pendientes; devuelve cuántas se procesaron"""
+    rows = await _claim()
+    if not rows:
+        return 0
+
+    by_destination = defaultdict(list)
+    for row in rows:
+        by_destination[row[1]].append(row)
+
+    destinations = list(by_destination)
+    errors = await asyncio.gather(*(_post(client, destination, by_destination[destination]) for destination in destinations))
+
+    now = _utcnow()
+    delivered_ids = []
+    retries = defaultdict(list)  # (intentos, error) -> ids
+    for destination, error in zip(destinations, errors):
+        for delivery_id, _, attempts, *_ in by_destination[destination]:
+            if error is None:
+                delivered_ids.append(delivery_id)
+            else:
+                retries[(attempts + 1, error)].append(delivery_id)
+
+    async with AsyncSessionLocal() as db:
+        if delivered_ids:
+            await db.execute(
+                update(OutboxDelivery)
+                .where(OutboxDelivery.id.in_(delivered_ids))
+                .values(status=DELIVERED, attempts=OutboxDelivery.attempts + 1,
+                        delivered_at=now, last_error=None)
+            )
+        for (attempts, error), delivery_ids in retries.items():
+            await db.execute(
+                update(OutboxDelivery)
+                .where(OutboxDelivery.id.in_(delivery_ids))
+                .values(status=FAILED if attempts >= MAX_ATTEMPTS else PENDING, attempts=attempts,
+                        next_attempt_at=now + _backoff(attempts), last_error=error)
+            )
+        await db.commit()
+
+    for destination, error in zip(destinations, errors):
+        if error:
+            logger.warning("Webhook %s falló (%d eventos): %s", destination, len(by_destination[destination]), error)
+    return len(rows)
+
+async def prune() -> int:
+    """Borrar los eventos entregados a todos sus destinos fuera de la retención"""
+    if RETENTION_DAYS <= 0:
+        return 0
+    cutoff = _utcnow() - timedelta(days=RETENTION_DAYS)
+    # Eventos sin entregas (de cuando no había destinos) también se borran
+    undelivered = select(OutboxDelivery.id).where(
+        OutboxDelivery.event_id == OutboxEvent.id, OutboxDelivery.status != DELIVERED
+    ).exists()
+    deleted = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            event_ids = (await db.scalars(
+                select(OutboxEvent.id)
+                .where(OutboxEvent.created_at < cutoff, ~undelivered)
+                .order_by(OutboxEvent.id)
+                .limit(PRUNE_BATCH_SIZE)
+            )).all()
+            if not event_ids:
+                break
+            await db.execute(delete(OutboxDelivery).where(OutboxDelivery.event_id.in_(event_ids)))
+            await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
+            await db.commit()
+            deleted += len(event_ids)
+            if len(event_ids) < PRUNE_BATCH_SIZE:
+                break
+    return deleted
+
+async def dispatch_forever():
+    pruned_at = None
+    async with httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT_SECONDS) as client:
+        while True:
+            if pruned_at is None or time.monotonic() - pruned_at >= PRUNE_INTERVAL_SECONDS:
+                pruned_at = time.monotonic()
+                try:
+                    await prune()
+                except Exception:
+                    logger.exception("Error depurando el outbox")
+            _wakeup.clear()
+            try:
+                processed = await dispatch_once(client)
+            except Exception:
+                logger.exception("Error despachando el outbox")
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,103 @@
+"""Paginación por cursor (keyset) y totales estimados.
+
+En lugar de `OFFSET`, cada página continúa desde la última fila de la
+anterior: `WHERE (columna, id) > (valor, id)` sobre un índice compuesto, así
+que el costo no crece con la profundidad. El cursor es opaco para el cliente
+(base64 de la clave de orden y los valores de la última fila).
+
+El total estimado sale de las estadísticas del planner de PostgreSQL
+(`EXPLAIN`) en lugar de un `COUNT(*)`; en otras bases se usa el conteo exacto.
+"""
+from datetime import datetime
+from typing import Optional
+import base64
+import json
+
+from sqlalchemy import DateTime, String, func, literal, select, tuple_
+from sqlalchemy.types import TypeDecorator
+
+# Orden soportado -> descendente
+SORTS = {"created_at": True, "name": False}
+
+class InvalidCursor(ValueError):
+    pass
+
+class _CursorDateTime(TypeDecorator):
+    """Fecha del cursor enlazada con el formato que guarda el dialecto.
+
+    SQLite compara fechas como texto: `CURRENT_TIMESTAMP` guarda
+    "2025-01-01 10:00:43" y SQLAlchemy enlaza "2025-01-01 10:00:43.000000",
+    que ordena después y haría que la página siguiente repita la última.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(self.impl)
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None:
+            return value.strftime("%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S")
+        return value
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort, "v": [value, row_id]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value, row_id = data["v"]
+        if data["s"] != sort or not isinstance(row_id, int):
+            raise InvalidCursor(cursor)
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+        return value, row_id
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+
+def keyset_page(query, model, sort: str, cursor: Optional[str], limit: int):
+    """Ordenar por (sort, id), continuar desde `cursor` y pedir una fila extra"""
+    column = getattr(model, sort)
+    descending = SORTS[sort]
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort)
+        key = tuple_(column, model.id)
+        # Con el tipo de la columna: el valor se compara como lo guarda la base
+        value_type = _CursorDateTime(timezone=column.type.timezone) if sort == "created_at" else column.type
+        bound = tuple_(literal(value, value_type), literal(row_id, model.id.type))
+        query = query.where(key < bound if descending else key > bound)
+    if descending:
+        query = query.order_by(column.desc(), model.id.desc())
+    else:
+        query = query.order_by(column.asc(), model.id.asc())
+    return query.limit(limit + 1)
+
+def split_page(rows, sort: str, limit: int):
+    """Separar la fila extra y armar el cursor de la página siguiente"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, sort), last.id)
+
+async def count_rows(db, query, estimate: bool = False):
+    """Total de filas de `query`; devuelve (total, es_estimado)"""
+    if estimate:
+        connection = await db.connection()
+        if connection.dialect.name == "postgresql":
+            sql = query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+            plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"]), True
+    total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    return total, False
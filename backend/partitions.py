@@ -0,0 +1,172 @@
+"""Particiones mensuales de las tablas de eventos (PostgreSQL).
+
+`service_usage` (por `usage_date`) y `audit_logs` (por `created_at`) están
+particionadas por rango mensual: las consultas con rango de fechas (reconstruir
+acumulados, facturar un período) solo leen las particiones del período, y la
+retención separa meses completos en vez de borrar filas (sin DELETE masivo ni
+bloat). La partición `<tabla>_default` recibe filas fuera de los meses creados
+para que una escritura nunca falle; al crear ese mes se mueven a su partición.
+
+Mantenimiento (cron diario, idempotente):
+
+    python partitions.py                        # crear meses futuros y aplicar retención
+    python partitions.py --from 2024-01         # crear también meses históricos
+    python partitions.py --drop                 # borrar las particiones vencidas
+
+Las particiones vencidas quedan como tablas independientes
+(`service_usage_2024_01`) para archivarlas (`pg_dump -t`) antes de borrarlas.
+Los acumulados de uso no se ven afectados. En otras bases no hace nada.
+"""
+from datetime import date, datetime, timezone
+from typing import Optional
+import argparse
+import os
+import re
+
+from sqlalchemy import text
+
+from database import SessionLocal
+
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Meses de eventos crudos que se conservan (0 = sin retención)
+USAGE_RETENTION_MONTHS = int(os.getenv("USAGE_RETENTION_MONTHS", "24"))
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "0"))
+
+# tabla -> (columna de partición, meses de retención)
+PARTITIONED_TABLES = {
+    "service_usage": ("usage_date", USAGE_RETENTION_MONTHS),
+    "audit_logs": ("created_at", AUDIT_RETENTION_MONTHS),
+}
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+def _bound(month: date) -> str:
+    return f"{month:%Y-%m-%d} 00:00:00+00"
+
+def is_partitioned(db, table: str) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": table},
+    ).scalar()
+
+def attached_months(db, table: str) -> list:
+    """Meses con partición propia, según el nombre `<tabla>_YYYY_MM`"""
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": table}).scalars()
+    pattern = re.compile(rf"^{table}_(\d{{4}})_(\d{{2}})$")
+    return sorted(
+        date(int(match.group(1)), int(match.group(2)), 1)
+        for match in map(pattern.match, names) if match
+    )
+
+def retention_start(table: str, today: Optional[date] = None) -> Optional[date]:
+    """Primer mes que conserva eventos crudos (None sin retención)"""
+    retention = PARTITIONED_TABLES[table][1]
+    if retention <= 0:
+        return None
+    return add_months(month_start(today or datetime.now(timezone.utc).date()), -retention)
+
+def create_partition(db, table: str, month: date) -> bool:
+    """Crear la partición del mes; mueve las filas que ya estén en la DEFAULT"""
+    column = PARTITIONED_TABLES[table][0]
+    name = partition_name(table, month)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+
+    default = f"{table}_default"
+    bounds = {"start": _bound(month), "end": _bound(add_months(month, 1))}
+    in_range = f"{column} >= CAST(:start AS timestamptz) AND {column} < CAST(:end AS timestamptz)"
+    values = f"FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+
+    has_rows = db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"), bounds).scalar()
+    if not has_rows:
+        db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {values}"))
+        return True
+
+    # PostgreSQL no permite crear un rango que ya tiene filas en la DEFAULT:
+    # se separa la DEFAULT, se crea el mes, se mueven las filas y se vuelve a unir
+    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {values}"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {table} SELECT * FROM moved"
+    ), bounds)
+    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    return True
+
+def expire_partitions(db, table: str, before: date, drop: bool = False) -> list:
+    """Separar (o borrar) las particiones de meses anteriores a `before`"""
+    column = PARTITIONED_TABLES[table][0]
+    expired = [month for month in attached_months(db, table) if month < before]
+    for month in expired:
+        name = partition_name(table, month)
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+    # La DEFAULT debería estar casi vacía: sus filas vencidas sí se borran
+    db.execute(
+        text(f"DELETE FROM {table}_default WHERE {column} < CAST(:before AS timestamptz)"),
+        {"before": _bound(before)},
+    )
+    return [partition_name(table, month) for month in expired]
+
+def maintain(db, months_ahead: int = MONTHS_AHEAD, since: Optional[date] = None,
+             retention: bool = True, drop: bool = False) -> dict:
+    """Crear las particiones desde `since` (o el mes actual) hasta `months_ahead`
+    meses adelante y aplicar la retención. Una transacción por tabla."""
+    today = month_start(datetime.now(timezone.utc).date())
+    summary = {}
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(db, table):
+            continue
+        first = since or today
+        cutoff = retention_start(table, today) if retention else None
+        if cutoff:
+            first = max(first, cutoff)
+
+        created = []
+        month = first
+        while month <= add_months(today, months_ahead):
+            if create_partition(db, table, month):
+                created.append(partition_name(table, month))
+            month = add_months(month, 1)
+        expired = expire_partitions(db, table, cutoff, drop) if cutoff else []
+        db.commit()
+        summary[table] = {"created": created, "expired": expired}
+    return summary
+
+def _parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de particiones mensuales")
+    parser.add_argument("--ahead", type=int, default=MONTHS_AHEAD, help="Meses futuros a crear")
+    parser.add_argument("--from", dest="since", type=_parse_month, help="Crear desde este mes (YYYY-MM)")
+    parser.add_argument("--no-retention", action="store_true", help="No separar particiones vencidas")
+    parser.add_argument("--drop", action="store_true", help="Borrar las particiones vencidas en vez de separarlas")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = maintain(db, args.ahead, args.since, not args.no_retention, args.drop)
+        if not summary:
+            print("⚠️ No hay tablas particionadas (requiere PostgreSQL y la migración aplicada)")
+        for table, result in summary.items():
+            action = "borradas" if args.drop else "separadas"
+            print(f"✅ {table}: {len(result['created'])} particiones creadas, {len(result['expired'])} {action}")
+            for name in result["expired"]:
+                print(f"   📦 {name}")
+    finally:
+        db.close()
@@ -0,0 +1,94 @@
+"""Hashing de contraseñas fuera del event loop.
+
+bcrypt tarda cientos de milisegundos por intento; hacerlo dentro de un handler
+`async` congela todos los demás requests. Acá se ejecuta en un pool de threads
+acotado (bcrypt libera el GIL) con un límite de trabajos en espera: si se
+supera, se rechaza con `PasswordHashingBusy` en lugar de acumular latencia.
+
+`BCRYPT_ROUNDS` fija el costo. Los hashes con otro costo se regeneran de forma
+transparente en el siguiente login (`verify_and_update`).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import os
+import threading
+import time
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Trabajos que pueden esperar un worker libre antes de rechazar
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_lock = threading.Lock()
+_stats = {"pending": 0, "running": 0, "completed": 0, "rejected": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+class PasswordHashingBusy(Exception):
+    """El pool de hashing está saturado"""
+
+def pool_stats() -> dict:
+    """Profundidad de la cola y tiempos de espera del pool de hashing"""
+    with _lock:
+        completed = _stats["completed"]
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_queue": PASSWORD_HASH_MAX_QUEUE,
+            "running": _stats["running"],
+            "queued": _stats["pending"] - _stats["running"],
+            "completed": completed,
+            "rejected": _stats["rejected"],
+            "avg_wait_ms": round(_stats["wait_seconds"] / completed * 1000, 2) if completed else 0.0,
+            "max_wait_ms": round(_stats["max_wait_seconds"] * 1000, 2),
+        }
+
+async def _run(fn, *args):
+    with _lock:
+        if _stats["pending"] >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE:
+            _stats["rejected"] += 1
+            raise PasswordHashingBusy()
+        _stats["pending"] += 1
+    submitted_at = time.perf_counter()
+
+    def work():
+        waited = time.perf_counter() - submitted_at
+        with _lock:
+            _stats["running"] += 1
+            _stats["wait_seconds"] += waited
+            _stats["max_wait_seconds"] = max(_stats["max_wait_seconds"], waited)
+        try:
+            return fn(*args)
+        finally:
+            with _lock:
+                _stats["running"] -= 1
+                _stats["completed"] += 1
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, work)
+    finally:
+        with _lock:
+            _stats["pending"] -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+async def verify_and_update(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Verificar una contraseña; devuelve (válida, hash nuevo si hay que regenerarlo).
+
+    Sin hash (usuario inexistente) se hace una verificación ficticia para que
+    el tiempo de respuesta no revele si el usuario existe.
+    """
+    if not hashed_password:
+        await _run(pwd_context.dummy_verify)
+        return False, None
+    return await _run(pwd_context.verify_and_update, password, hashed_password)
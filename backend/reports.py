@@ -0,0 +1,238 @@
+"""Reportes de costos por período (BI-04) desde los registros de facturación.
+
+Cada `billing_record` se expande en líneas por servicio (`cost_breakdown`)
+más una línea sin servicio con sus ajustes manuales, y se agrupa en SQL por
+las dimensiones pedidas con `GROUP BY ROLLUP`: una sola consulta devuelve el
+detalle, los subtotales de cada nivel y el total general. SQLite no tiene
+ROLLUP; ahí se emula con `UNION ALL` de los mismos niveles.
+
+Los resultados se guardan en memoria junto con la versión de cada mes del
+rango (`billing_period_versions`), que incrementa cualquier escritura de
+facturación (también `billing.py` en otro proceso). Un request compara las
+versiones actuales (una consulta sobre pocas filas) y solo recalcula si
+cambiaron. Los rangos de meses cerrados no expiran; los que incluyen el mes en
+curso expiran a los `REPORT_CACHE_TTL_SECONDS`. La cache guarda solo ids e
+importes: los nombres de clientes y proyectos se leen en cada request.
+"""
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+import os
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+from database import dialect_insert
+from models import BillingPeriodVersion, BillingRecord, Client, Project
+
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "60"))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "500"))
+
+# Dimensión del API -> columna de las líneas
+DIMENSIONS = {"client": "client_id", "project": "project_id", "service": "service_type", "month": "month"}
+
+_DIALECT_SQL = {
+    "postgresql": {
+        "month": "CAST(date_trunc('month', br.billing_period_start AT TIME ZONE 'UTC') AS date)",
+        "lines": "CROSS JOIN LATERAL json_each(br.cost_breakdown) AS line",
+        "field": "CAST(line.value ->> '{name}' AS numeric)",
+    },
+    "sqlite": {
+        "month": "date(br.billing_period_start, 'start of month')",
+        "lines": "JOIN json_each(br.cost_breakdown) AS line",
+        "field": "json_extract(line.value, '$.{name}')",
+    },
+}
+
+_LINES_SQL = """
+    SELECT p.client_id, br.project_id, {month} AS month, line.key AS service_type,
+           {monthly} AS monthly_cost, {usage} AS usage_cost, {quantity} AS quantity, 0 AS adjustments
+    FROM billing_records br
+    JOIN projects p ON p.id = br.project_id
+    {lines}
+    WHERE {filters}
+"""
+
+_ADJUSTMENTS_SQL = """
+    SELECT p.client_id, br.project_id, {month} AS month, NULL AS service_type,
+           0 AS monthly_cost, 0 AS usage_cost, 0 AS quantity, br.manual_adjustments AS adjustments
+    FROM billing_records br
+    JOIN projects p ON p.id = br.project_id
+    WHERE {filters} AND br.manual_adjustments <> 0
+"""
+
+_TOTALS = """
+    COALESCE(SUM(monthly_cost), 0) AS monthly_cost,
+    COALESCE(SUM(usage_cost), 0) AS usage_cost,
+    COALESCE(SUM(adjustments), 0) AS adjustments,
+    COALESCE(SUM(quantity), 0) AS quantity
+"""
+
+report_cache = TTLCache(REPORT_CACHE_TTL_SECONDS, REPORT_CACHE_MAX_ENTRIES)
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def months_between(start: date, end: date):
+    month = month_start(start)
+    while month < end:
+        yield month
+        month = add_months(month, 1)
+
+def _lines_sql(dialect: str, service_filtered: bool, filters: str) -> str:
+    sql = _DIALECT_SQL[dialect]
+    lines = _LINES_SQL.format(
+        month=sql["month"],
+        monthly=sql["field"].format(name="monthly"),
+        usage=sql["field"].format(name="usage"),
+        quantity=sql["field"].format(name="quantity"),
+        lines=sql["lines"],
+        filters=filters + (" AND line.key = :service_type" if service_filtered else ""),
+    )
+    if service_filtered:
+        # Los ajustes manuales no pertenecen a un servicio
+        return lines
+    return lines + " UNION ALL " + _ADJUSTMENTS_SQL.format(month=sql["month"], filters=filters)
+
+def report_statement(dialect: str, group_by, client_id=None, project_id=None, service_type=None):
+    """Consulta con detalle y subtotales; `grouping` es la máscara de dimensiones agregadas
+    (bit más significativo = primera dimensión, como GROUPING() de SQL)"""
+    filters = ["br.billing_period_start >= :start", "br.billing_period_start < :end"]
+    if client_id:
+        filters.append("p.client_id = :client_id")
+    if project_id:
+        filters.append("br.project_id = :project_id")
+    lines = _lines_sql(dialect, service_type is not None, " AND ".join(filters))
+    columns = [DIMENSIONS[name] for name in group_by]
+
+    if dialect == "postgresql":
+        grouping = f"GROUPING({', '.join(columns)})" if columns else "0"
+        group_clause = f"GROUP BY ROLLUP ({', '.join(columns)})" if columns else ""
+        selected = ", ".join(columns + [f"{grouping} AS grouping", _TOTALS])
+        sql = f"WITH lines AS ({lines}) SELECT {selected} FROM lines {group_clause}"
+    else:
+        levels = []
+        for kept in range(len(columns), -1, -1):
+            mask = (1 << (len(columns) - kept)) - 1
+            selected = ", ".join(
+                columns[:kept] + [f"NULL AS {column}" for column in columns[kept:]]
+                + [f"{mask} AS grouping", _TOTALS]
+            )
+            group_clause = f"GROUP BY {', '.join(columns[:kept])}" if kept else ""
+            levels.append(f"SELECT {selected} FROM lines {group_clause}")
+        sql = f"WITH lines AS ({lines}) " + " UNION ALL ".join(levels)
+
+    params = {"client_id": client_id, "project_id": project_id,
+              "service_type": service_type.value if service_type else None}
+    return text(sql), {key: value for key, value in params.items() if value is not None}
+
+_CENTS = Decimal("0.01")
+
+def _decimal(value) -> Decimal:
+    # SQLite devuelve los números del JSON como float
+    value = value if isinstance(value, Decimal) else Decimal(str(value or 0))
+    return value.quantize(_CENTS)
+
+async def _versions(db, start: date, end: date):
+    rows = await db.execute(
+        select(BillingPeriodVersion.month, BillingPeriodVersion.version)
+        .where(BillingPeriodVersion.month >= start, BillingPeriodVersion.month < end)
+        .order_by(BillingPeriodVersion.month)
+    )
+    return tuple(rows.all())
+
+async def _names(db, model, ids):
+    if not ids:
+        return {}
+    return dict((await db.execute(select(model.id, model.name).where(model.id.in_(sorted(ids))))).all())
+
+def _sort_key(row, group_by):
+    # Detalle antes que su subtotal; valores nulos (ajustes sin servicio) al final
+    return tuple(
+        (name in row["rolled_up"], row[DIMENSIONS[name]] is None, row[DIMENSIONS[name]] or "")
+        for name in group_by
+    )
+
+async def cost_report(db, group_by, start: date, end: date, client_id=None, project_id=None, service_type=None):
+    """Reporte de [start, end) (meses completos) desde la cache si la facturación no cambió"""
+    key = (tuple(group_by), start, end, client_id, project_id, service_type)
+    # Versiones antes de calcular: si la facturación cambia en medio, el
+    # próximo request ve una versión nueva y recalcula
+    versions = await _versions(db, start, end)
+    cached = report_cache.get(key)
+    if cached is not None and cached[0] == versions:
+        return await _with_names(db, cached[1])
+
+    stmt, params = report_statement(db.get_bind().dialect.name, group_by, client_id, project_id, service_type)
+    params.update({
+        "start": datetime.combine(start, time.min, timezone.utc),
+        "end": datetime.combine(end, time.min, timezone.utc),
+    })
+    rows = []
+    for row in (await db.execute(stmt, params)).mappings():
+        rolled_up = [name for bit, name in enumerate(reversed(group_by)) if row["grouping"] & (1 << bit)]
+        monthly, usage, adjustments = (_decimal(row[name]) for name in ("monthly_cost", "usage_cost", "adjustments"))
+        rows.append({
+            "client_id": row.get("client_id"),
+            "project_id": row.get("project_id"),
+            "service_type": row.get("service_type"),
+            "month": date.fromisoformat(row["month"]) if isinstance(row.get("month"), str) else row.get("month"),
+            "monthly_cost": monthly,
+            "usage_cost": usage,
+            "adjustments": adjustments,
+            "total": monthly + usage + adjustments,
+            "quantity": int(row["quantity"]),
+            "rolled_up": list(reversed(rolled_up)),
+        })
+    rows.sort(key=lambda row: _sort_key(row, group_by))
+
+    report = {"group_by": list(group_by), "start": start, "end": end, "rows": rows}
+    current = month_start(datetime.now(timezone.utc).date())
+    # Meses cerrados: inmutables salvo refacturación, que cambia la versión
+    report_cache.put(key, (versions, report), ttl=None if end <= current else REPORT_CACHE_TTL_SECONDS)
+    return await _with_names(db, report)
+
+async def _with_names(db, report):
+    """Copia del reporte cacheado con los nombres actuales de clientes y proyectos"""
+    rows = report["rows"]
+    clients = await _names(db, Client, {row["client_id"] for row in rows if row["client_id"]})
+    projects = await _names(db, Project, {row["project_id"] for row in rows if row["project_id"]})
+    return {**report, "rows": [
+        {**row, "client_name": clients.get(row["client_id"]), "project_name": projects.get(row["project_id"])}
+        for row in rows
+    ]}
+
+def bump_versions(connection, months):
+    """Incrementar la versión de los meses facturados (también para SQL fuera del ORM)"""
+    months = sorted(set(months))
+    if not months:
+        return
+    stmt = dialect_insert(connection, BillingPeriodVersion).values(
+        [{"month": month, "version": 1} for month in months]
+    )
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["month"],
+        set_={"version": BillingPeriodVersion.version + 1},
+    ))
+
+def _period_month(value) -> date:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return month_start(value)
+
+@event.listens_for(Session, "after_flush")
+def _bump_billing_versions(session, flush_context):
+    months = set()
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, BillingRecord) and obj.billing_period_start is not None:
+            months.add(_period_month(obj.billing_period_start))
+            history = inspect(obj).attrs.billing_period_start.history
+            months.update(_period_month(value) for value in history.deleted if value is not None)
+    if months:
+        bump_versions(session.connection(), months)
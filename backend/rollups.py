@@ -0,0 +1,177 @@
+"""Acumulados de uso por servicio (diario por tipo de uso y mensual).
+
+La ingesta de `/usage/batch` llama a `apply_usage` en la misma transacción
+que inserta los eventos, así los acumulados nunca quedan desfasados. Para
+backfills o correcciones se reconstruyen desde `service_usage`:
+
+    python rollups.py --rebuild                      # todo el histórico
+    python rollups.py --rebuild --from 2025-01 --to 2025-06
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from typing import Iterable, Optional
+import argparse
+
+from sqlalchemy import Date, cast, delete, func, select, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, dialect_insert
+from models import ServiceUsage, UsageDailyRollup, UsageMonthlyRollup
+import partitions
+
+def utc_day(value: datetime) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+def _aggregate(rows: Iterable):
+    daily = defaultdict(lambda: [0, Decimal("0"), 0])
+    monthly = defaultdict(lambda: [0, Decimal("0"), 0])
+
+    for row in rows:
+        day = utc_day(row.usage_date)
+        quantity = row.quantity if row.quantity is not None else 1
+        cost = row.cost or Decimal("0")
+        for bucket in (
+            daily[(row.service_id, row.usage_type or "", day)],
+            monthly[(row.service_id, month_start(day))],
+        ):
+            bucket[0] += quantity
+            bucket[1] += cost
+            bucket[2] += 1
+
+    return daily, monthly
+
+def _upsert(db, model, keys, values):
+    stmt = dialect_insert(db, model).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            "quantity": model.quantity + stmt.excluded.quantity,
+            "cost": model.cost + stmt.excluded.cost,
+            "event_count": model.event_count + stmt.excluded.event_count,
+        },
+    )
+
+async def apply_usage(db, rows: Iterable):
+    """Sumar eventos recién insertados a los acumulados.
+
+    `rows` necesita `service_id`, `usage_type`, `usage_date`, `quantity` y
+    `cost` (p. ej. el RETURNING del INSERT). Las claves se ordenan para que
+    lotes concurrentes tomen los locks en el mismo orden.
+    """
+    daily, monthly = _aggregate(rows)
+
+    if daily:
+        values = [
+            {"service_id": service_id, "usage_type": usage_type, "day": day,
+             "quantity": quantity, "cost": cost, "event_count": events}
+            for (service_id, usage_type, day), (quantity, cost, events) in sorted(daily.items())
+        ]
+        await db.execute(_upsert(db, UsageDailyRollup, ["service_id", "usage_type", "day"], values))
+
+    if monthly:
+        values = [
+            {"service_id": service_id, "month": month,
+             "quantity": quantity, "cost": cost, "event_count": events}
+            for (service_id, month), (quantity, cost, events) in sorted(monthly.items())
+        ]
+        await db.execute(_upsert(db, UsageMonthlyRollup, ["service_id", "month"], values))
+
+def _day_expr(dialect: str):
+    if dialect == "sqlite":
+        return func.date(ServiceUsage.usage_date)
+    return cast(func.timezone("UTC", ServiceUsage.usage_date), Date)
+
+def _month_expr(dialect: str):
+    if dialect == "sqlite":
+        return func.date(UsageDailyRollup.day, "start of month")
+    return cast(func.date_trunc("month", UsageDailyRollup.day), Date)
+
+def rebuild(db: Session, start: Optional[date] = None, end: Optional[date] = None):
+    """Recalcular los acumulados de los meses [start, end) desde los eventos crudos"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Los meses fuera de la retención ya no tienen eventos crudos: se conservan
+        kept_from = partitions.retention_start("service_usage")
+        if kept_from and (start is None or start < kept_from):
+            start = kept_from
+        # Bloquear upserts concurrentes de la ingesta mientras se reescribe el rango
+        db.execute(text(
+            "LOCK TABLE usage_daily_rollups, usage_monthly_rollups IN SHARE ROW EXCLUSIVE MODE"
+        ))
+
+    day = _day_expr(dialect)
+    usage_type = func.coalesce(ServiceUsage.usage_type, "")
+    raw = select(
+        ServiceUsage.service_id,
+        usage_type,
+        day,
+        func.sum(func.coalesce(ServiceUsage.quantity, 1)),
+        func.coalesce(func.sum(ServiceUsage.cost), 0),
+        func.count(),
+    ).group_by(ServiceUsage.service_id, usage_type, day)
+
+    clear_daily = delete(UsageDailyRollup)
+    clear_monthly = delete(UsageMonthlyRollup)
+    if start:
+        raw = raw.where(ServiceUsage.usage_date >= datetime.combine(start, time.min, timezone.utc))
+        clear_daily = clear_daily.where(UsageDailyRollup.day >= start)
+        clear_monthly = clear_monthly.where(UsageMonthlyRollup.month >= start)
+    if end:
+        raw = raw.where(ServiceUsage.usage_date < datetime.combine(end, time.min, timezone.utc))
+        clear_daily = clear_daily.where(UsageDailyRollup.day < end)
+        clear_monthly = clear_monthly.where(UsageMonthlyRollup.month < end)
+
+    db.execute(clear_daily)
+    db.execute(UsageDailyRollup.__table__.insert().from_select(
+        ["service_id", "usage_type", "day", "quantity", "cost", "event_count"], raw
+    ))
+
+    # El mensual se deriva del diario ya reconstruido (mucho menos filas)
+    month = _month_expr(dialect)
+    monthly = select(
+        UsageDailyRollup.service_id,
+        month,
+        func.sum(UsageDailyRollup.quantity),
+        func.sum(UsageDailyRollup.cost),
+        func.sum(UsageDailyRollup.event_count),
+    ).group_by(UsageDailyRollup.service_id, month)
+    if start:
+        monthly = monthly.where(UsageDailyRollup.day >= start)
+    if end:
+        monthly = monthly.where(UsageDailyRollup.day < end)
+
+    db.execute(clear_monthly)
+    db.execute(UsageMonthlyRollup.__table__.insert().from_select(
+        ["service_id", "month", "quantity", "cost", "event_count"], monthly
+    ))
+    db.commit()
+
+def _parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de acumulados de uso")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruir desde service_usage")
+    parser.add_argument("--from", dest="start", type=_parse_month, help="Mes inicial (YYYY-MM)")
+    parser.add_argument("--to", dest="end", type=_parse_month, help="Mes final inclusive (YYYY-MM)")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+    else:
+        db = SessionLocal()
+        try:
+            end = _next_month(args.end) if args.end else None
+            rebuild(db, args.start, end)
+            print(f"✅ Acumulados reconstruidos ({args.start or 'inicio'} → {args.end or 'hoy'})")
+        finally:
+            db.close()
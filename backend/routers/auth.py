@@ -1,20 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from database import get_db
 from models import User
 from schemas import UserCreate, User as UserSchema, Token
-from auth import verify_password, get_password_hash, create_access_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth import create_access_token, get_current_user, user_claims, ACCESS_TOKEN_EXPIRE_MINUTES
+from passwords import PasswordHashingBusy, hash_password, verify_and_update
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+def _hashing_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Demasiados intentos simultáneos, reintentar en unos segundos",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=UserSchema)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(
+    result = await db.execute(select(User).where(
         (User.email == user.email) | (User.username == user.username)
-    ).first()
+    ))
+    db_user = result.scalars().first()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,31 +32,44 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await hash_password(user.password)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
     db_user = User(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.username == form_data.username))
+    user = result.scalars().first()
+    try:
+        valid, new_hash = await verify_and_update(form_data.password, user.hashed_password if user else None)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
+    if not user or not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Regenerar el hash si cambió el costo configurado (BCRYPT_ROUNDS)
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=user_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -1,28 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func
+from sqlalchemy.orm import joinedload, selectinload, with_expression
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from typing import Optional
 from database import get_db
 from models import Client, Project, User
 from schemas import (
     ClientCreate, ClientUpdate, Client as ClientSchema, 
-    ClientWithProjects, ClientListResponse
+    ClientWithProjects, ClientListResponse, Project as ProjectSchema
 )
 from auth import get_current_user
+from search import CLIENT_FIELDS, filter_query
+from serialization import orm_response
+import client_dashboard
+import fieldsets
 import math
+import pagination
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
 @router.post("/", response_model=ClientSchema)
 async def create_client(
     client: ClientCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Crear un nuevo cliente"""
     
     # Verificar que no existe un cliente con el mismo email
-    existing_client = db.query(Client).filter(Client.email == client.email).first()
+    existing_client = await db.scalar(select(Client).where(Client.email == client.email))
     if existing_client:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -31,62 +37,140 @@ async def create_client(
     
     db_client = Client(**client.dict())
     db.add(db_client)
-    db.commit()
-    db.refresh(db_client)
+    await db.commit()
+    await db.refresh(db_client)
     
     return db_client
 
+def _list_options(include: str, selected: dict, sort: Optional[str] = None):
+    """Opciones de carga del listado según `include` y `fields`"""
+    options = []
+    if "" in selected:
+        # La columna del orden hace falta para armar el cursor
+        options.append(fieldsets.load_columns(Client, selected[""] | {sort} if sort else selected[""]))
+    if include == "projects":
+        loader = selectinload(Client.projects)
+        if "projects" in selected:
+            loader = loader.options(fieldsets.load_columns(Project, selected["projects"] | {"client_id"}))
+        options.append(loader)
+    elif include == "project_count":
+        project_count = (
+            select(func.count(Project.id)).where(Project.client_id == Client.id)
+            .correlate(Client).scalar_subquery()
+        )
+        options.append(with_expression(Client.project_count, project_count))
+    return options
+
+def _list_fields(include: str, selected: dict) -> dict:
+    """Campos de la respuesta: los pedidos (o todos) más la relación incluida"""
+    client_fields = set(selected.get("", ClientSchema.model_fields))
+    if include != "none":
+        client_fields.add(include)
+    output = {"clients": client_fields}
+    if "projects" in selected:
+        output["clients.projects"] = selected["projects"]
+    return output
+
 @router.get("/", response_model=ClientListResponse)
 async def get_clients(
     page: int = Query(1, ge=1, description="Número de página"),
     per_page: int = Query(10, ge=1, le=100, description="Elementos por página"),
     search: Optional[str] = Query(None, description="Buscar por nombre o email"),
-    db: Session = Depends(get_db),
+    fuzzy: bool = Query(False, description="Búsqueda tolerante a errores de tipeo"),
+    paginate: str = Query("page", pattern="^(page|cursor)$", description="page (page/per_page) o cursor"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (implica paginate=cursor)"),
+    sort: str = Query("created_at", pattern="^(created_at|name)$", description="Orden en modo cursor"),
+    total: Optional[str] = Query(None, pattern="^(exact|estimate|none)$", description="Cálculo del total"),
+    include: str = Query("projects", pattern="^(projects|project_count|none)$",
+                         description="projects (lista completa), project_count o none"),
+    fields: Optional[str] = Query(None, description="Campos separados por coma; projects.<campo> para los proyectos"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtener lista paginada de clientes con búsqueda"""
+    """Obtener lista paginada de clientes con búsqueda.
+
+    `include` y `fields` deciden qué se consulta: sin relación, la cantidad de
+    proyectos (subconsulta correlacionada) o los proyectos, y solo las columnas
+    pedidas.
+    """
+    
+    try:
+        selected = fieldsets.parse_fields(fields, {"": ClientSchema, "projects": ProjectSchema})
+    except fieldsets.InvalidFields as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campo desconocido en fields: {exc}"
+        )
+    if "projects" in selected and include != "projects":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Los campos projects.* requieren include=projects"
+        )
+    
+    query = select(Client)
     
-    query = db.query(Client)
+    use_cursor = paginate == "cursor" or cursor is not None
     
-    # Aplicar filtro de búsqueda
+    # Aplicar filtro de búsqueda (índices trigram; ordena por relevancia en modo página)
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                Client.name.ilike(search_filter),
-                Client.email.ilike(search_filter),
-                Client.legal_representative.ilike(search_filter),
-                Client.contact_person.ilike(search_filter)
-            )
-        )
+        query = await filter_query(db, query, CLIENT_FIELDS, search, fuzzy, ranked=not use_cursor)
+    
+    # Por defecto: conteo exacto en modo página, sin total en modo cursor
+    total_mode = total or ("none" if use_cursor else "exact")
     
     # Contar total de registros
-    total = query.count()
-    total_pages = math.ceil(total / per_page)
+    total_count, is_estimate = None, False
+    if total_mode != "none":
+        total_count, is_estimate = await pagination.count_rows(db, query, estimate=total_mode == "estimate")
+    
+    # Los proyectos se cargan con un segundo SELECT ... IN para que el LIMIT
+    # se aplique directo sobre clients (joinedload obliga a envolver en subquery)
+    if use_cursor:
+        try:
+            query = pagination.keyset_page(query, Client, sort, cursor, per_page)
+        except pagination.InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido"
+            )
+        result = await db.execute(query.options(*_list_options(include, selected, sort)))
+        clients, next_cursor = pagination.split_page(result.scalars().all(), sort, per_page)
+        return orm_response(ClientListResponse, {
+            "clients": clients,
+            "total": total_count,
+            "total_is_estimate": is_estimate,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        }, _list_fields(include, selected))
     
     # Aplicar paginación y cargar proyectos
     offset = (page - 1) * per_page
-    clients = query.options(joinedload(Client.projects)).offset(offset).limit(per_page).all()
-    
-    return ClientListResponse(
-        clients=clients,
-        total=total,
-        page=page,
-        per_page=per_page,
-        total_pages=total_pages
+    result = await db.execute(
+        query.options(*_list_options(include, selected)).order_by(Client.id).offset(offset).limit(per_page)
     )
+    clients = result.scalars().all()
+    
+    return orm_response(ClientListResponse, {
+        "clients": clients,
+        "total": total_count,
+        "total_is_estimate": is_estimate,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": math.ceil(total_count / per_page) if total_count is not None else None,
+    }, _list_fields(include, selected))
 
 @router.get("/{client_id}", response_model=ClientWithProjects)
 async def get_client(
     client_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obtener cliente por ID con sus proyectos"""
     
-    client = db.query(Client).options(
-        joinedload(Client.projects)
-    ).filter(Client.id == client_id).first()
+    result = await db.execute(
+        select(Client).options(joinedload(Client.projects)).where(Client.id == client_id)
+    )
+    client = result.unique().scalars().first()
     
     if not client:
         raise HTTPException(
@@ -94,18 +178,18 @@ async def get_client(
             detail="Cliente no encontrado"
         )
     
-    return client
+    return orm_response(ClientWithProjects, client)
 
 @router.put("/{client_id}", response_model=ClientSchema)
 async def update_client(
     client_id: int,
     client_update: ClientUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Actualizar cliente existente"""
     
-    db_client = db.query(Client).filter(Client.id == client_id).first()
+    db_client = await db.get(Client, client_id)
     if not db_client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -114,10 +198,10 @@ async def update_client(
     
     # Verificar email único si se está actualizando
     if client_update.email and client_update.email != db_client.email:
-        existing_client = db.query(Client).filter(
+        existing_client = await db.scalar(select(Client).where(
             Client.email == client_update.email,
             Client.id != client_id
-        ).first()
+        ))
         if existing_client:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -129,20 +213,20 @@ async def update_client(
     for field, value in update_data.items():
         setattr(db_client, field, value)
     
-    db.commit()
-    db.refresh(db_client)
+    await db.commit()
+    await db.refresh(db_client)
     
     return db_client
 
 @router.delete("/{client_id}")
 async def delete_client(
     client_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Eliminar cliente (solo si no tiene proyectos activos)"""
     
-    db_client = db.query(Client).filter(Client.id == client_id).first()
+    db_client = await db.get(Client, client_id)
     if not db_client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -150,10 +234,12 @@ async def delete_client(
         )
     
     # Verificar que no tenga proyectos activos
-    active_projects = db.query(Project).filter(
-        Project.client_id == client_id,
-        Project.status.in_(["active", "suspended"])
-    ).count()
+    active_projects = await db.scalar(
+        select(func.count(Project.id)).where(
+            Project.client_id == client_id,
+            Project.status.in_(["active", "suspended"])
+        )
+    )
     
     if active_projects > 0:
         raise HTTPException(
@@ -161,53 +247,24 @@ async def delete_client(
             detail=f"No se puede eliminar el cliente. Tiene {active_projects} proyecto(s) activo(s)"
         )
     
-    db.delete(db_client)
-    db.commit()
+    await db.delete(db_client)
+    await db.commit()
     
     return {"message": "Cliente eliminado exitosamente"}
 
 @router.get("/{client_id}/dashboard")
 async def get_client_dashboard(
     client_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Dashboard del cliente con métricas principales"""
+    """Dashboard del cliente con métricas principales (una consulta, con cache)"""
     
-    client = db.query(Client).filter(Client.id == client_id).first()
-    if not client:
+    dashboard = await client_dashboard.get_dashboard(db, client_id)
+    if dashboard is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cliente no encontrado"
         )
     
-    # Obtener métricas
-    projects = db.query(Project).filter(Project.client_id == client_id).all()
-    
-    total_projects = len(projects)
-    active_projects = len([p for p in projects if p.status == "active"])
-    completed_projects = len([p for p in projects if p.status == "completed"])
-    
-    # Servicios activos por tipo
-    from sqlalchemy import text
-    services_query = text("""
-        SELECT ps.service_type, COUNT(*) as count
-        FROM project_services ps
-        JOIN projects p ON ps.project_id = p.id
-        WHERE p.client_id = :client_id AND ps.is_active = true
-        GROUP BY ps.service_type
-    """)
-    
-    services_result = db.execute(services_query, {"client_id": client_id})
-    active_services = {row[0]: row[1] for row in services_result}
-    
-    return {
-        "client": client,
-        "metrics": {
-            "total_projects": total_projects,
-            "active_projects": active_projects,
-            "completed_projects": completed_projects,
-            "active_services": active_services
-        },
-        "recent_projects": projects[:5]  # Últimos 5 proyectos
-    }
\ No newline at end of file
+    return dashboard
\ No newline at end of file
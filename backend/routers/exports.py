@@ -0,0 +1,217 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Optional
+from database import AsyncSessionLocal
+from models import BillingRecord, Project, ProjectService, ServiceType, ServiceUsage, User
+from auth import get_current_user
+import csv
+import io
+import json
+import logging
+import os
+import zlib
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+# Filas por lote del cursor del servidor (y por chunk de la respuesta)
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+USAGE_COLUMNS = (
+    ServiceUsage.id,
+    ServiceUsage.usage_date,
+    Project.client_id,
+    ProjectService.project_id,
+    ServiceUsage.service_id,
+    ProjectService.service_type,
+    ServiceUsage.usage_type,
+    ServiceUsage.quantity,
+    ServiceUsage.cost,
+    ServiceUsage.idempotency_key,
+    ServiceUsage.usage_metadata,
+)
+
+BILLING_COLUMNS = (
+    BillingRecord.id,
+    Project.client_id,
+    BillingRecord.project_id,
+    BillingRecord.billing_period_start,
+    BillingRecord.billing_period_end,
+    BillingRecord.monthly_costs,
+    BillingRecord.usage_costs,
+    BillingRecord.manual_adjustments,
+    BillingRecord.total_cost,
+    BillingRecord.adjustment_notes,
+    BillingRecord.cost_breakdown,
+)
+
+def _utc_start(value: date) -> datetime:
+    # Límites constantes: en PostgreSQL solo se leen las particiones del rango
+    return datetime.combine(value, time.min, timezone.utc)
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _amount(value) -> Decimal:
+    # SQLite devuelve los números del JSON como float
+    value = value if isinstance(value, Decimal) else Decimal(str(value or 0))
+    return value.quantize(Decimal("0.01"))
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return _plain(value)
+
+def _encode(rows, keys, fmt: str) -> bytes:
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(dict(zip(keys, row)), default=_plain, ensure_ascii=False))
+            buffer.write("\n")
+    return buffer.getvalue().encode("utf-8")
+
+async def _stream(query, fmt: str, transform=None):
+    """Leer `query` con un cursor del servidor y codificar un chunk por lote.
+
+    La sesión es propia: la de `get_db` se cierra antes de que termine de
+    enviarse la respuesta.
+    """
+    keys = [column.key for column in query.selected_columns]
+    if fmt == "csv":
+        yield _encode([keys], keys, fmt)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        try:
+            async for rows in result.partitions():
+                if transform:
+                    rows = [transform(row) for row in rows]
+                yield _encode(rows, keys, fmt)
+        except Exception:
+            # Los headers ya se enviaron: se corta la respuesta y queda en el log
+            logger.exception("Error exportando (%s)", fmt)
+            raise
+
+async def _gzip(chunks):
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def _export_response(request: Request, chunks, fmt: str, name: str) -> StreamingResponse:
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = _gzip(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+def _file_name(prefix: str, start: Optional[date], end: Optional[date]) -> str:
+    return "_".join([prefix] + [value.isoformat() for value in (start, end) if value])
+
+@router.get("/usage")
+async def export_usage(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv o ndjson"),
+    start: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    end: Optional[date] = Query(None, description="Fecha final (exclusiva)"),
+    client_id: Optional[int] = Query(None, description="Filtrar por cliente"),
+    project_id: Optional[int] = Query(None, description="Filtrar por proyecto"),
+    service_type: Optional[ServiceType] = Query(None, description="Filtrar por servicio"),
+    current_user: User = Depends(get_current_user)
+):
+    """Exportar eventos de uso crudos en streaming (memoria constante).
+
+    Con `Accept-Encoding: gzip` la respuesta se comprime sobre la marcha.
+    """
+
+    query = (
+        select(*USAGE_COLUMNS)
+        .join(ProjectService, ProjectService.id == ServiceUsage.service_id)
+        .join(Project, Project.id == ProjectService.project_id)
+    )
+    if client_id:
+        query = query.where(Project.client_id == client_id)
+    if project_id:
+        query = query.where(ProjectService.project_id == project_id)
+    if service_type:
+        query = query.where(ProjectService.service_type == service_type)
+    if start:
+        query = query.where(ServiceUsage.usage_date >= _utc_start(start))
+    if end:
+        query = query.where(ServiceUsage.usage_date < _utc_start(end))
+    query = query.order_by(ServiceUsage.usage_date, ServiceUsage.id)
+
+    return _export_response(request, _stream(query, format), format, _file_name("usage", start, end))
+
+@router.get("/billing")
+async def export_billing(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv o ndjson"),
+    start: Optional[date] = Query(None, description="Períodos que empiezan desde (inclusive)"),
+    end: Optional[date] = Query(None, description="Períodos que empiezan antes de (exclusiva)"),
+    client_id: Optional[int] = Query(None, description="Filtrar por cliente"),
+    project_id: Optional[int] = Query(None, description="Filtrar por proyecto"),
+    service_type: Optional[ServiceType] = Query(None, description="Filtrar por servicio"),
+    current_user: User = Depends(get_current_user)
+):
+    """Exportar registros de facturación en streaming.
+
+    Con `service_type` solo incluye los registros en los que ese servicio tuvo
+    cargos (aparece en `cost_breakdown`), y los importes pasan a ser los de ese
+    servicio: `monthly_costs` y `usage_costs` salen del detalle, `total_cost` es
+    su suma y `manual_adjustments` queda en 0 (los ajustes son del proyecto).
+    """
+
+    query = select(*BILLING_COLUMNS).join(Project, Project.id == BillingRecord.project_id)
+    if client_id:
+        query = query.where(Project.client_id == client_id)
+    if project_id:
+        query = query.where(BillingRecord.project_id == project_id)
+    if service_type:
+        # El detalle solo tiene los servicios con cargos en el período
+        query = query.where(BillingRecord.cost_breakdown[service_type.value].as_string().is_not(None))
+    if start:
+        query = query.where(BillingRecord.billing_period_start >= _utc_start(start))
+    if end:
+        query = query.where(BillingRecord.billing_period_start < _utc_start(end))
+    query = query.order_by(BillingRecord.billing_period_start, BillingRecord.id)
+
+    transform = None
+    if service_type:
+        def transform(row):
+            line = (row.cost_breakdown or {})[service_type.value]
+            monthly, usage = _amount(line.get("monthly")), _amount(line.get("usage"))
+            values = row._asdict()
+            values.update(
+                monthly_costs=monthly,
+                usage_costs=usage,
+                manual_adjustments=Decimal("0.00"),
+                total_cost=monthly + usage,
+                cost_breakdown={service_type.value: line},
+            )
+            return tuple(values.values())
+
+    return _export_response(request, _stream(query, format, transform), format, _file_name("billing", start, end))
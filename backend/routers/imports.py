@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from models import User
+from schemas import ImportResponse
+from auth import get_current_user
+import importer
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+@router.post("/onboarding", response_model=ImportResponse)
+async def import_onboarding(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Importar clientes, proyectos y dueños desde un CSV (body `text/csv`).
+
+    Se procesa en bloques con commit por bloque: si el archivo falla a mitad de
+    camino, lo ya importado queda y reimportar no lo duplica.
+    """
+
+    writer = importer.Importer()
+    try:
+        async for row, values in importer.aiter_records(request.stream()):
+            if writer.add(row, values):
+                await db.run_sync(writer.flush)
+                await db.commit()
+    except importer.InvalidFile as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
+    if writer.header is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo está vacío"
+        )
+
+    await db.run_sync(writer.flush)
+    await db.commit()
+    return writer.finish()
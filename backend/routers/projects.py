@@ -1,52 +1,89 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, func
 from typing import Optional
 from database import get_db
 from models import Project, Client, ProjectService, ServiceType, User
 from schemas import (
     ProjectCreate, ProjectUpdate, Project as ProjectSchema,
-    ProjectWithClient, ProjectWithServices, ProjectListResponse
+    ProjectWithClient, ProjectWithServices, ProjectListResponse, Client as ClientSchema,
+    ServiceBulkUpdate, ServiceBulkUpdateResponse
 )
 from auth import get_current_user
+from search import PROJECT_FIELDS, filter_query
+from serialization import orm_response
+import fieldsets
 import math
+import outbox
+import pagination
+import service_activation
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 @router.post("/", response_model=ProjectSchema)
 async def create_project(
     project: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Crear un nuevo proyecto"""
+    """Crear un nuevo proyecto con sus servicios (una sola transacción).
+
+    `services` fija la configuración inicial (estado, costos, config) de los
+    tipos indicados; el resto se crea desactivado.
+    """
     
     # Verificar que el cliente existe
-    client = db.query(Client).filter(Client.id == project.client_id).first()
+    client = await db.get(Client, project.client_id)
     if not client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cliente no encontrado"
         )
     
-    db_project = Project(**project.dict())
-    db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
-    
-    # Crear servicios por defecto (todos desactivados)
-    for service_type in ServiceType:
-        project_service = ProjectService(
-            project_id=db_project.id,
-            service_type=service_type,
-            is_active=False
+    initial = {service.service_type: service for service in project.services}
+    if len(initial) != len(project.services):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tipo de servicio repetido en services"
         )
-        db.add(project_service)
     
-    db.commit()
+    db_project = Project(**project.dict(exclude={"services"}))
+    db.add(db_project)
+    await db.flush()
+    
+    # Servicios por defecto en un solo INSERT multi-fila, en la misma transacción
+    await db.run_sync(service_activation.create_defaults, db_project.id, initial)
+    
+    await db.commit()
+    await db.refresh(db_project)
     
     return db_project
 
+def _list_options(include: str, selected: dict, sort: Optional[str] = None):
+    """Opciones de carga del listado según `include` y `fields`"""
+    options = []
+    if "" in selected:
+        # La columna del orden hace falta para armar el cursor
+        columns = selected[""] | {"client_id", sort} if sort else selected[""] | {"client_id"}
+        options.append(fieldsets.load_columns(Project, columns))
+    if include == "client":
+        loader = joinedload(Project.client)
+        if "client" in selected:
+            loader = loader.options(fieldsets.load_columns(Client, selected["client"]))
+        options.append(loader)
+    return options
+
+def _list_fields(include: str, selected: dict) -> dict:
+    """Campos de la respuesta: los pedidos (o todos) más la relación incluida"""
+    project_fields = set(selected.get("", ProjectSchema.model_fields))
+    if include == "client":
+        project_fields.add("client")
+    output = {"projects": project_fields}
+    if "client" in selected:
+        output["projects.client"] = selected["client"]
+    return output
+
 @router.get("/", response_model=ProjectListResponse)
 async def get_projects(
     page: int = Query(1, ge=1, description="Número de página"),
@@ -54,52 +91,107 @@ async def get_projects(
     client_id: Optional[int] = Query(None, description="Filtrar por cliente"),
     status: Optional[str] = Query(None, description="Filtrar por estado"),
     search: Optional[str] = Query(None, description="Buscar por nombre"),
-    db: Session = Depends(get_db),
+    fuzzy: bool = Query(False, description="Búsqueda tolerante a errores de tipeo"),
+    paginate: str = Query("page", pattern="^(page|cursor)$", description="page (page/per_page) o cursor"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (implica paginate=cursor)"),
+    sort: str = Query("created_at", pattern="^(created_at|name)$", description="Orden en modo cursor"),
+    total: Optional[str] = Query(None, pattern="^(exact|estimate|none)$", description="Cálculo del total"),
+    include: str = Query("client", pattern="^(client|none)$", description="client (datos del cliente) o none"),
+    fields: Optional[str] = Query(None, description="Campos separados por coma; client.<campo> para el cliente"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtener lista paginada de proyectos con filtros"""
+    """Obtener lista paginada de proyectos con filtros.
+
+    Con `include=none` no se hace el join con clientes; `fields` limita las
+    columnas leídas y devueltas.
+    """
+    
+    try:
+        selected = fieldsets.parse_fields(fields, {"": ProjectSchema, "client": ClientSchema})
+    except fieldsets.InvalidFields as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campo desconocido en fields: {exc}"
+        )
+    if "client" in selected and include != "client":
+        raise HTTPException(
+            status_code=400,
+            detail="Los campos client.* requieren include=client"
+        )
     
-    query = db.query(Project).options(joinedload(Project.client))
+    query = select(Project)
     
     # Aplicar filtros
     if client_id:
-        query = query.filter(Project.client_id == client_id)
+        query = query.where(Project.client_id == client_id)
     
     if status:
-        query = query.filter(Project.status == status)
+        query = query.where(Project.status == status)
     
+    use_cursor = paginate == "cursor" or cursor is not None
+    
+    # Búsqueda por nombre (índice trigram; ordena por relevancia en modo página)
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(Project.name.ilike(search_filter))
+        query = await filter_query(db, query, PROJECT_FIELDS, search, fuzzy, ranked=not use_cursor)
+    
+    # Por defecto: conteo exacto en modo página, sin total en modo cursor
+    total_mode = total or ("none" if use_cursor else "exact")
     
     # Contar total
-    total = query.count()
-    total_pages = math.ceil(total / per_page)
+    total_count, is_estimate = None, False
+    if total_mode != "none":
+        total_count, is_estimate = await pagination.count_rows(db, query, estimate=total_mode == "estimate")
+    
+    if use_cursor:
+        try:
+            query = pagination.keyset_page(query, Project, sort, cursor, per_page)
+        except pagination.InvalidCursor:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor inválido"
+            )
+        result = await db.execute(query.options(*_list_options(include, selected, sort)))
+        projects, next_cursor = pagination.split_page(result.scalars().all(), sort, per_page)
+        return orm_response(ProjectListResponse, {
+            "projects": projects,
+            "total": total_count,
+            "total_is_estimate": is_estimate,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        }, _list_fields(include, selected))
     
     # Aplicar paginación
     offset = (page - 1) * per_page
-    projects = query.offset(offset).limit(per_page).all()
-    
-    return ProjectListResponse(
-        projects=projects,
-        total=total,
-        page=page,
-        per_page=per_page,
-        total_pages=total_pages
+    result = await db.execute(
+        query.options(*_list_options(include, selected)).order_by(Project.id).offset(offset).limit(per_page)
     )
+    projects = result.scalars().all()
+    
+    return orm_response(ProjectListResponse, {
+        "projects": projects,
+        "total": total_count,
+        "total_is_estimate": is_estimate,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": math.ceil(total_count / per_page) if total_count is not None else None,
+    }, _list_fields(include, selected))
 
 @router.get("/{project_id}", response_model=ProjectWithServices)
 async def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obtener proyecto por ID con servicios"""
     
-    project = db.query(Project).options(
-        joinedload(Project.client),
-        joinedload(Project.services)
-    ).filter(Project.id == project_id).first()
+    result = await db.execute(
+        select(Project).options(
+            joinedload(Project.client),
+            joinedload(Project.services)
+        ).where(Project.id == project_id)
+    )
+    project = result.unique().scalars().first()
     
     if not project:
         raise HTTPException(
@@ -107,18 +199,18 @@ async def get_project(
             detail="Proyecto no encontrado"
         )
     
-    return project
+    return orm_response(ProjectWithServices, project)
 
 @router.put("/{project_id}", response_model=ProjectSchema)
 async def update_project(
     project_id: int,
     project_update: ProjectUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Actualizar proyecto existente"""
     
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    db_project = await db.get(Project, project_id)
     if not db_project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -130,49 +222,50 @@ async def update_project(
     for field, value in update_data.items():
         setattr(db_project, field, value)
     
-    db.commit()
-    db.refresh(db_project)
+    await db.commit()
+    await db.refresh(db_project)
     
     return db_project
 
 @router.delete("/{project_id}")
 async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Eliminar proyecto"""
     
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    db_project = await db.get(Project, project_id)
     if not db_project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Proyecto no encontrado"
         )
     
-    db.delete(db_project)
-    db.commit()
+    await db.delete(db_project)
+    await db.commit()
     
     return {"message": "Proyecto eliminado exitosamente"}
 
 @router.get("/{project_id}/services")
 async def get_project_services(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obtener servicios del proyecto con su estado"""
     
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Proyecto no encontrado"
         )
     
-    services = db.query(ProjectService).filter(
-        ProjectService.project_id == project_id
-    ).all()
+    result = await db.execute(
+        select(ProjectService).where(ProjectService.project_id == project_id)
+    )
+    services = result.scalars().all()
     
     # Organizar servicios por tipo
     services_dict = {}
@@ -192,26 +285,77 @@ async def get_project_services(
         "services": services_dict
     }
 
+@router.post("/services/bulk", response_model=ServiceBulkUpdateResponse)
+async def bulk_update_services(
+    payload: ServiceBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Fijar (no alternar) el estado de servicios en muchos proyectos, en una sola transacción"""
+    
+    if (payload.project_ids is None) == (payload.client_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indicar project_ids o client_id (solo uno)"
+        )
+    
+    if payload.client_id is not None:
+        if not await db.get(Client, payload.client_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cliente no encontrado"
+            )
+        project_ids = (await db.execute(
+            select(Project.id).where(Project.client_id == payload.client_id)
+        )).scalars().all()
+    else:
+        requested = set(payload.project_ids)
+        project_ids = (await db.execute(
+            select(Project.id).where(Project.id.in_(sorted(requested)))
+        )).scalars().all()
+        missing = sorted(requested - set(project_ids))
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Proyectos no encontrados: {', '.join(str(project_id) for project_id in missing[:20])}"
+            )
+    
+    rows = []
+    if project_ids:
+        rows = await db.run_sync(
+            service_activation.set_services, project_ids, set(payload.service_types), payload.is_active
+        )
+        await db.commit()
+    
+    return orm_response(ServiceBulkUpdateResponse, {
+        "updated": len(rows),
+        "projects": len({row.project_id for row in rows}),
+        "changes": [
+            {"project_id": row.project_id, "service_type": row.service_type, "is_active": payload.is_active}
+            for row in rows
+        ],
+    })
+
 @router.post("/{project_id}/services/{service_type}/toggle")
 async def toggle_service(
     project_id: int,
     service_type: ServiceType,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Activar/desactivar un servicio específico"""
     
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Proyecto no encontrado"
         )
     
-    service = db.query(ProjectService).filter(
+    service = await db.scalar(select(ProjectService).where(
         ProjectService.project_id == project_id,
         ProjectService.service_type == service_type
-    ).first()
+    ))
     
     if not service:
         raise HTTPException(
@@ -228,11 +372,11 @@ async def toggle_service(
     else:
         service.deactivated_at = func.now()
     
-    db.commit()
-    db.refresh(service)
+    # Notificar a los microservicios vía outbox (misma transacción que el cambio)
+    outbox.enqueue_service_change(db, project_id, [(service_type, service.is_active)])
     
-    # TODO: Aquí se podría enviar webhook a microservicios
-    # notify_service_change(project_id, service_type, service.is_active)
+    await db.commit()
+    await db.refresh(service)
     
     return {
         "message": f"Servicio {service_type.value} {'activado' if service.is_active else 'desactivado'} exitosamente",
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timezone
+from typing import Optional
+from database import get_db
+from models import ServiceType, User
+from schemas import CostReportResponse
+from auth import get_current_user
+import reports
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+_DIMENSION_PATTERN = "(client|project|service|month)"
+
+@router.get("/costs", response_model=CostReportResponse)
+async def get_cost_report(
+    group_by: str = Query(
+        "client,month",
+        pattern=f"^{_DIMENSION_PATTERN}(,{_DIMENSION_PATTERN})*$",
+        description="Dimensiones separadas por coma (client, project, service, month); el orden define los subtotales",
+    ),
+    start: Optional[date] = Query(None, description="Mes inicial (inclusive); por defecto 12 meses atrás"),
+    end: Optional[date] = Query(None, description="Mes final (exclusivo); por defecto incluye el mes en curso"),
+    client_id: Optional[int] = Query(None, description="Filtrar por cliente"),
+    project_id: Optional[int] = Query(None, description="Filtrar por proyecto"),
+    service_type: Optional[ServiceType] = Query(None, description="Filtrar por servicio"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Costos facturados agrupados por las dimensiones pedidas, con subtotales
+    por nivel (en el orden de `group_by`) y total general"""
+
+    dimensions = group_by.split(",")
+    if len(set(dimensions)) != len(dimensions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Dimensión repetida en group_by"
+        )
+
+    # Meses completos: un end a mitad de mes se redondea al mes siguiente
+    if end is None:
+        end = reports.add_months(reports.month_start(datetime.now(timezone.utc).date()), 1)
+    elif end.day > 1:
+        end = reports.add_months(reports.month_start(end), 1)
+    start = reports.month_start(start) if start else reports.add_months(end, -12)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El mes inicial debe ser anterior al final"
+        )
+
+    return await reports.cost_report(db, dimensions, start, end, client_id, project_id, service_type)
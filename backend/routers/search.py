@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from models import User
+from auth import get_current_user
+from search import search_all
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1, description="Texto a buscar"),
+    fuzzy: bool = Query(False, description="Tolerar errores de tipeo"),
+    limit: int = Query(10, ge=1, le=50, description="Resultados por tipo"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Buscar clientes y proyectos ordenados por relevancia (para el buscador del frontend)"""
+    return await search_all(db, q, fuzzy, limit)
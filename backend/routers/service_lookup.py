@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from auth import verify_token
+from snapshots import snapshot_cache, load_snapshot
+
+router = APIRouter(prefix="/services", tags=["service-lookup"])
+
+@router.get("/active/{project_id}")
+async def get_active_services(
+    project_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    username: str = Depends(verify_token)
+):
+    """Servicios activos de un proyecto para apps cliente y microservicios.
+
+    Pensado para polling frecuente: se sirve desde un snapshot en memoria y
+    responde 304 si `If-None-Match` coincide con la versión actual.
+    """
+
+    snapshot = snapshot_cache.get(project_id) or await load_snapshot(db, project_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Proyecto no encontrado"
+        )
+
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
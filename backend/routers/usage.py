@@ -0,0 +1,301 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from pydantic import ValidationError
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from database import get_db, dialect_insert
+from models import (
+    Project, ProjectService, ServiceType, ServiceUsage, User,
+    UsageDailyRollup, UsageMonthlyRollup, USAGE_IDEMPOTENCY_COLUMNS
+)
+from schemas import (
+    ServiceUsageCreate, UsageBatchResponse, UsageBatchError,
+    UsageSummaryRow, UsageSummaryResponse
+)
+from auth import get_current_user
+import rollups
+import json
+import os
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+# Filas por sentencia INSERT (asyncpg admite como máximo 32767 parámetros)
+INSERT_CHUNK_SIZE = 1000
+MAX_BATCH_EVENTS = int(os.getenv("USAGE_BATCH_MAX_EVENTS", "100000"))
+MAX_REPORTED_ERRORS = 100
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'evento'}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+async def _iter_ndjson(request: Request):
+    """Leer el body línea a línea sin cargarlo completo en memoria"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def _iter_json_array(request: Request):
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El body no es JSON válido"
+        )
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Se esperaba un arreglo JSON de eventos"
+        )
+    for item in payload:
+        yield item
+
+class _BatchWriter:
+    """Acumula eventos validados y los escribe con INSERT multi-fila"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # Mismas columnas que el índice único (y el ON CONFLICT) del dialecto
+        self.key_columns = USAGE_IDEMPOTENCY_COLUMNS[db.get_bind().dialect.name]
+        self.pending = []
+        self.seen_keys = set()
+        self.result = UsageBatchResponse(received=0, inserted=0, duplicates=0, rejected=0)
+
+    def reject(self, index: int, error: str):
+        self.result.rejected += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append(UsageBatchError(index=index, error=error))
+
+    async def add(self, index: int, event: ServiceUsageCreate):
+        if event.idempotency_key is not None:
+            key = tuple(getattr(event, column) for column in self.key_columns)
+            if key in self.seen_keys:
+                self.result.duplicates += 1
+                return
+            self.seen_keys.add(key)
+
+        self.pending.append((index, event))
+        if len(self.pending) >= INSERT_CHUNK_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        events, self.pending = self.pending, []
+
+        # Una sola consulta para validar todos los servicios del bloque
+        service_ids = {event.service_id for _, event in events}
+        services = dict((await self.db.execute(
+            select(ProjectService.id, ProjectService.cost_per_unit).where(
+                ProjectService.id.in_(service_ids)
+            )
+        )).all())
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        for index, event in events:
+            if event.service_id not in services:
+                self.reject(index, f"service_id {event.service_id} no existe")
+                continue
+
+            cost = event.cost
+            cost_per_unit = services[event.service_id]
+            if cost is None and cost_per_unit is not None:
+                cost = cost_per_unit * event.quantity
+
+            rows.append({
+                "service_id": event.service_id,
+                "usage_date": event.usage_date or now,
+                "usage_type": event.usage_type,
+                "quantity": event.quantity,
+                "cost": cost,
+                "usage_metadata": event.usage_metadata,
+                "idempotency_key": event.idempotency_key,
+            })
+
+        if not rows:
+            return
+
+        stmt = dialect_insert(self.db, ServiceUsage).values(rows).on_conflict_do_nothing(
+            index_elements=list(self.key_columns)
+        ).returning(
+            ServiceUsage.service_id,
+            ServiceUsage.usage_type,
+            ServiceUsage.usage_date,
+            ServiceUsage.quantity,
+            ServiceUsage.cost,
+        )
+        inserted_rows = (await self.db.execute(stmt)).all()
+        await rollups.apply_usage(self.db, inserted_rows)
+        inserted = len(inserted_rows)
+
+        self.result.inserted += inserted
+        self.result.duplicates += len(rows) - inserted
+
+@router.post("/batch", response_model=UsageBatchResponse)
+async def ingest_usage_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Registrar eventos de uso en lote (NDJSON o arreglo JSON).
+
+    Los eventos con `idempotency_key` repetida para el mismo servicio y la
+    misma `usage_date` se ignoran, por lo que los productores pueden reintentar
+    sin duplicar cobros. `usage_date` es obligatoria junto a `idempotency_key`.
+    """
+
+    content_type = request.headers.get("content-type", "")
+    is_ndjson = "ndjson" in content_type or "jsonl" in content_type
+    items = _iter_ndjson(request) if is_ndjson else _iter_json_array(request)
+
+    writer = _BatchWriter(db)
+    index = 0
+    async for item in items:
+        if index >= MAX_BATCH_EVENTS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El lote supera el máximo de {MAX_BATCH_EVENTS} eventos"
+            )
+
+        try:
+            if is_ndjson:
+                event = ServiceUsageCreate.model_validate_json(item)
+            else:
+                event = ServiceUsageCreate.model_validate(item)
+        except ValidationError as exc:
+            writer.reject(index, _validation_message(exc))
+        else:
+            await writer.add(index, event)
+        index += 1
+
+    await writer.flush()
+    await db.commit()
+
+    writer.result.received = index
+    writer.result.errors.sort(key=lambda error: error.index)
+    return writer.result
+
+def _next_month(value: date) -> date:
+    return (rollups.month_start(value) + timedelta(days=32)).replace(day=1)
+
+def _month_split(start: Optional[date], end: Optional[date]):
+    """Separar [start, end) en meses completos y tramos parciales en los bordes.
+
+    Devuelve ((desde, hasta) de los meses completos o None, [(desde, hasta), ...]
+    parciales); los extremos None son abiertos.
+    """
+    full_start = start if start is None or start.day == 1 else _next_month(start)
+    full_end = end if end is None else rollups.month_start(end)
+    partial = []
+    if start is not None and start.day != 1:
+        partial.append((start, min(full_start, end) if end else full_start))
+    # El tramo final es otro mes que el inicial (si no, ya lo cubre el de arriba)
+    if end is not None and end.day != 1 and (full_start is None or full_end >= full_start):
+        partial.append((full_end, end))
+    full = None if full_start and full_end and full_start >= full_end else (full_start, full_end)
+    return full, partial
+
+def _summary_query(rollup, period, group_columns, client_id, project_id, service_type, start, end):
+    query = select(
+        *group_columns,
+        func.sum(rollup.quantity).label("quantity"),
+        func.sum(rollup.cost).label("cost"),
+        func.sum(rollup.event_count).label("events"),
+    ).join(ProjectService, ProjectService.id == rollup.service_id)
+
+    if client_id:
+        query = query.join(Project, Project.id == ProjectService.project_id).where(
+            Project.client_id == client_id
+        )
+    if project_id:
+        query = query.where(ProjectService.project_id == project_id)
+    if service_type:
+        query = query.where(ProjectService.service_type == service_type)
+    if start:
+        query = query.where(period >= start)
+    if end:
+        query = query.where(period < end)
+    return query.group_by(*group_columns).order_by(*group_columns)
+
+@router.get("/summary", response_model=UsageSummaryResponse)
+async def get_usage_summary(
+    granularity: str = Query("month", pattern="^(day|month)$", description="day o month"),
+    start: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    end: Optional[date] = Query(None, description="Fecha final (exclusiva)"),
+    client_id: Optional[int] = Query(None, description="Filtrar por cliente"),
+    project_id: Optional[int] = Query(None, description="Filtrar por proyecto"),
+    service_type: Optional[ServiceType] = Query(None, description="Filtrar por servicio"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Uso y costo agregados leídos de los acumulados (no de los eventos crudos).
+
+    Cubre exactamente [start, end), que se devuelve en la respuesta. Con
+    `granularity=month`, `period` es el primer día del mes: los meses
+    completos salen de los acumulados mensuales y los días de los meses
+    parciales en los bordes, de los diarios.
+    """
+
+    filters = (client_id, project_id, service_type)
+    if granularity == "day":
+        group_columns = [UsageDailyRollup.day, ProjectService.project_id, ProjectService.service_type,
+                         UsageDailyRollup.usage_type]
+        result = await db.execute(_summary_query(
+            UsageDailyRollup, UsageDailyRollup.day, group_columns, *filters, start, end
+        ))
+        rows = [
+            UsageSummaryRow(period=row.day, project_id=row.project_id, service_type=row.service_type,
+                            usage_type=row.usage_type, quantity=row.quantity, cost=row.cost, events=row.events)
+            for row in result
+        ]
+        return UsageSummaryResponse(granularity=granularity, start=start, end=end, rows=rows)
+
+    full, partial = _month_split(start, end)
+    # (mes, proyecto, servicio) -> [cantidad, costo, eventos]
+    totals = {}
+    if full:
+        group_columns = [UsageMonthlyRollup.month, ProjectService.project_id, ProjectService.service_type]
+        result = await db.execute(_summary_query(
+            UsageMonthlyRollup, UsageMonthlyRollup.month, group_columns, *filters, *full
+        ))
+        for row in result:
+            totals[(row.month, row.project_id, row.service_type)] = [row.quantity, row.cost, row.events]
+    for partial_start, partial_end in partial:
+        group_columns = [UsageDailyRollup.day, ProjectService.project_id, ProjectService.service_type]
+        result = await db.execute(_summary_query(
+            UsageDailyRollup, UsageDailyRollup.day, group_columns, *filters, partial_start, partial_end
+        ))
+        for row in result:
+            key = (rollups.month_start(row.day), row.project_id, row.service_type)
+            current = totals.setdefault(key, [0, 0, 0])
+            current[0] += row.quantity
+            current[1] += row.cost
+            current[2] += row.events
+
+    return UsageSummaryResponse(
+        granularity=granularity,
+        start=start,
+        end=end,
+        rows=[
+            UsageSummaryRow(
+                period=month,
+                project_id=row_project_id,
+                service_type=row_service_type,
+                quantity=quantity,
+                cost=cost,
+                events=events,
+            )
+            for (month, row_project_id, row_service_type), (quantity, cost, events)
+            in sorted(totals.items())
+        ]
+    )
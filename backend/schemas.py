@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from datetime import date, datetime
 from typing import Optional, List
 from models import ProjectStatus, BillingType, ServiceType
 from decimal import Decimal
@@ -64,6 +64,10 @@ class Client(ClientBase):
 class ClientWithProjects(Client):
     projects: List["Project"] = []
 
+class ClientListItem(ClientWithProjects):
+    # Con include=project_count (en vez de los proyectos)
+    project_count: Optional[int] = None
+
 # Project schemas
 class ProjectBase(BaseModel):
     name: str
@@ -78,6 +82,8 @@ class ProjectBase(BaseModel):
 
 class ProjectCreate(ProjectBase):
     client_id: int
+    # Configuración inicial de servicios; los tipos no indicados se crean desactivados
+    services: List["ProjectServiceInitial"] = []
 
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
@@ -119,12 +125,32 @@ class ProjectServiceBase(BaseModel):
 class ProjectServiceCreate(ProjectServiceBase):
     project_id: int
 
+class ProjectServiceInitial(ProjectServiceBase):
+    is_active: bool = False
+
 class ProjectServiceUpdate(BaseModel):
     is_active: Optional[bool] = None
     cost_per_unit: Optional[Decimal] = None
     monthly_cost: Optional[Decimal] = None
     service_config: Optional[dict] = None
 
+class ServiceBulkUpdate(BaseModel):
+    # Proyectos explícitos o todos los del cliente (uno de los dos)
+    project_ids: Optional[List[int]] = Field(None, min_length=1, max_length=5000)
+    client_id: Optional[int] = None
+    service_types: List[ServiceType] = Field(..., min_length=1)
+    is_active: bool
+
+class ServiceBulkChange(BaseModel):
+    project_id: int
+    service_type: ServiceType
+    is_active: bool
+
+class ServiceBulkUpdateResponse(BaseModel):
+    updated: int
+    projects: int
+    changes: List[ServiceBulkChange]
+
 class ProjectService(ProjectServiceBase):
     id: int
     project_id: int
@@ -166,17 +192,100 @@ class ClientUser(ClientUserBase):
     class Config:
         from_attributes = True
 
+# Usage schemas
+class ServiceUsageCreate(BaseModel):
+    service_id: int
+    usage_type: str = Field(..., min_length=1, max_length=100)
+    quantity: int = Field(1, ge=1)
+    usage_date: Optional[datetime] = None
+    cost: Optional[Decimal] = None
+    usage_metadata: Optional[dict] = None
+    idempotency_key: Optional[str] = Field(None, max_length=255)
+
+    @model_validator(mode="after")
+    def _idempotency_requires_date(self):
+        # Sin fecha del productor cada reintento tomaría la hora de llegada
+        if self.idempotency_key is not None and self.usage_date is None:
+            raise ValueError("usage_date es obligatoria cuando se indica idempotency_key")
+        return self
+
+class UsageBatchError(BaseModel):
+    index: int
+    error: str
+
+class UsageBatchResponse(BaseModel):
+    received: int
+    inserted: int
+    duplicates: int
+    rejected: int
+    errors: List[UsageBatchError] = []
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResponse(BaseModel):
+    received: int
+    clients_created: int
+    projects_created: int
+    owners_created: int
+    duplicates: int
+    rejected: int
+    errors: List[ImportRowError] = []
+
+class UsageSummaryRow(BaseModel):
+    period: date
+    project_id: int
+    service_type: ServiceType
+    usage_type: Optional[str] = None
+    quantity: int
+    cost: Decimal
+    events: int
+
+class UsageSummaryResponse(BaseModel):
+    granularity: str
+    start: Optional[date] = None  # Rango cubierto [start, end); None = abierto
+    end: Optional[date] = None
+    rows: List[UsageSummaryRow]
+
+class CostReportRow(BaseModel):
+    client_id: Optional[int] = None
+    client_name: Optional[str] = None
+    project_id: Optional[int] = None
+    project_name: Optional[str] = None
+    service_type: Optional[ServiceType] = None
+    month: Optional[date] = None
+    monthly_cost: Decimal
+    usage_cost: Decimal
+    adjustments: Decimal
+    total: Decimal
+    quantity: int
+    # Dimensiones agregadas en esta fila (vacío = detalle; todas = total general)
+    rolled_up: List[str] = []
+
+class CostReportResponse(BaseModel):
+    group_by: List[str]
+    start: date
+    end: date
+    rows: List[CostReportRow]
+
 # Response schemas
 class ClientListResponse(BaseModel):
-    clients: List[ClientWithProjects]
-    total: int
-    page: int
+    clients: List[ClientListItem]
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    # Modo cursor: pasar como `cursor` para obtener la página siguiente
+    next_cursor: Optional[str] = None
 
 class ProjectListResponse(BaseModel):
     projects: List[ProjectWithClient]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int] = None
+    # Modo cursor: pasar como `cursor` para obtener la página siguiente
+    next_cursor: Optional[str] = None
\ No newline at end of file
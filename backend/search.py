@@ -0,0 +1,89 @@
+"""Búsqueda de clientes y proyectos sobre índices trigram (pg_trgm).
+
+En PostgreSQL las columnas buscables tienen índices GIN `gin_trgm_ops`, que
+sirven tanto para `ILIKE '%term%'` (modo substring) como para el operador de
+similitud `<%` (modo `fuzzy`, tolerante a errores de tipeo). El ranking usa
+`word_similarity`. En otras bases (SQLite en tests) se usa `LIKE` y un
+ranking simple por coincidencia exacta / prefijo / substring; el modo fuzzy
+se degrada a substring.
+"""
+import os
+
+from sqlalchemy import case, func, literal, or_, select, text
+
+from models import Client, Project
+
+# Umbral de pg_trgm.word_similarity_threshold para el modo fuzzy (0..1)
+FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.4"))
+
+CLIENT_FIELDS = (Client.name, Client.email, Client.legal_representative, Client.contact_person)
+PROJECT_FIELDS = (Project.name,)
+
+def is_postgres(db) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def match(fields, term: str, fuzzy: bool, postgres: bool):
+    """Condición WHERE para `term` sobre `fields`"""
+    if fuzzy and postgres:
+        return or_(*(literal(term).op("<%")(field) for field in fields))
+    pattern = _like_pattern(term)
+    return or_(*(field.ilike(pattern, escape="\\") for field in fields))
+
+def _simple_score(field, term: str):
+    term = term.lower()
+    pattern = _like_pattern(term)
+    return case(
+        (func.lower(field) == term, 3),
+        (func.lower(field).like(pattern[1:], escape="\\"), 2),
+        (func.lower(field).like(pattern, escape="\\"), 1),
+        else_=0,
+    )
+
+def relevance(fields, term: str, postgres: bool):
+    """Expresión de relevancia (mayor es mejor)"""
+    if postgres:
+        scores, combine = [func.word_similarity(term, field) for field in fields], func.greatest
+    else:
+        # max() con varios argumentos es escalar en SQLite
+        scores, combine = [_simple_score(field, term) for field in fields], func.max
+    return combine(*scores) if len(scores) > 1 else scores[0]
+
+async def prepare(db, fuzzy: bool):
+    """Fijar el umbral de similitud para la transacción actual"""
+    if fuzzy and is_postgres(db):
+        await db.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {"threshold": str(FUZZY_THRESHOLD)},
+        )
+
+async def filter_query(db, query, fields, term: str, fuzzy: bool = False, ranked: bool = False):
+    """Aplicar la búsqueda a `query`; con `ranked` ordena por relevancia"""
+    postgres = is_postgres(db)
+    await prepare(db, fuzzy)
+    query = query.where(match(fields, term, fuzzy, postgres))
+    if ranked:
+        query = query.order_by(relevance(fields, term, postgres).desc())
+    return query
+
+async def search_all(db, term: str, fuzzy: bool = False, limit: int = 10):
+    """Mejores coincidencias de clientes y proyectos con su puntaje"""
+    postgres = is_postgres(db)
+    await prepare(db, fuzzy)
+    results = {}
+    for key, model, fields, columns in (
+        ("clients", Client, CLIENT_FIELDS, (Client.id, Client.name, Client.email)),
+        ("projects", Project, PROJECT_FIELDS, (Project.id, Project.name, Project.client_id)),
+    ):
+        score = relevance(fields, term, postgres).label("score")
+        rows = await db.execute(
+            select(*columns, score)
+            .where(match(fields, term, fuzzy, postgres))
+            .order_by(score.desc(), model.id)
+            .limit(limit)
+        )
+        results[key] = [dict(row._mapping) for row in rows]
+    return results
@@ -1,11 +1,11 @@
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine, Base
+from database import SessionLocal, engine, Base, truncate_all
 from models import *
-from passlib.context import CryptContext
+from passwords import pwd_context
 from datetime import datetime, timedelta
 import json
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import rollups
+import dashboard
 
 def create_tables():
     """Create all database tables"""
@@ -17,16 +17,8 @@ def seed_data():
     db = SessionLocal()
     
     try:
-        # Clear existing data
-        db.query(AuditLog).delete()
-        db.query(ServiceUsage).delete()
-        db.query(BillingRecord).delete()
-        db.query(ProjectService).delete()
-        db.query(ClientUser).delete()
-        db.query(Project).delete()
-        db.query(Client).delete()
-        db.query(User).delete()
-        db.commit()
+        # Clear existing data (TRUNCATE en PostgreSQL)
+        truncate_all(db)
         
         # Create admin users
         admin_users = [
@@ -228,6 +220,10 @@ def seed_data():
         db.commit()
         print("✅ Usage records created")
         
+        # Recalcular acumulados de uso a partir de los eventos creados
+        rollups.rebuild(db)
+        print("✅ Usage rollups rebuilt")
+        
         # Create billing records
         for project in projects:
             billing_record = BillingRecord(
@@ -249,6 +245,10 @@ def seed_data():
         db.commit()
         print("✅ Billing records created")
         
+        # Los borrados masivos no pasan por el ORM: recalcular el resumen
+        dashboard.reconcile_sync(db)
+        print("✅ Dashboard summary reconciled")
+        
         print("\n🎉 Test data inserted successfully!")
         print(f"📊 Created:")
         print(f"   - {len(admin_users)} admin users")
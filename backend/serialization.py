@@ -0,0 +1,88 @@
+"""Serialización JSON rápida de las respuestas (orjson).
+
+`FastJSONResponse` es la clase de respuesta por defecto de la app: mismo JSON
+que la de Starlette, codificado con orjson.
+
+Los listados y el detalle de clientes y proyectos devuelven además
+`orm_response(schema, value)`: recorre los objetos ORM ya cargados con la forma
+del schema de respuesta (los campos y anidamientos de `ClientWithProjects`,
+etc., precalculados una vez) y los codifica directo a bytes, sin construir ni
+validar los modelos de Pydantic por cada fila. Los schemas siguen siendo el
+`response_model` (documentación de OpenAPI) y las entradas se siguen validando.
+Los valores salen tal cual de la base; el formato coincide con el de Pydantic
+(fechas ISO con `Z` en UTC, Decimal como string, enums por su valor). Con
+`fields` se omiten los campos no pedidos (listados con `fields`/`include`).
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Optional, Union, get_args, get_origin
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def _nested_model(annotation):
+    """(schema anidado o None, es lista) de la anotación de un campo"""
+    many = False
+    while True:
+        origin = get_origin(annotation)
+        if origin is Union:
+            annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+        elif origin is list:
+            annotation, many = get_args(annotation)[0], True
+        else:
+            break
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, many
+    return None, many
+
+@lru_cache(maxsize=256)
+def _plan(schema, fields: tuple = (), path: str = "") -> tuple:
+    """Campos a recorrer; `fields` restringe los de cada ubicación ("clients.projects")"""
+    if not schema.__pydantic_complete__:
+        # Resolver las referencias adelantadas ("Project") como al validar
+        schema.model_rebuild()
+    selected = dict(fields).get(path)
+    plan = []
+    for name, field in schema.model_fields.items():
+        if selected is not None and name not in selected:
+            continue
+        nested, many = _nested_model(field.annotation)
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        child = _plan(nested, fields, f"{path}.{name}" if path else name) if nested else None
+        plan.append((name, default, child, many))
+    return tuple(plan)
+
+def _dump(value, plan) -> dict:
+    data = {}
+    is_dict = isinstance(value, dict)
+    for name, default, nested, many in plan:
+        item = value.get(name, default) if is_dict else getattr(value, name, default)
+        if nested is not None and item is not None:
+            item = [_dump(element, nested) for element in item] if many else _dump(item, nested)
+        data[name] = item
+    return data
+
+def orm_response(schema, value, fields: Optional[dict] = None, status_code: int = 200) -> Response:
+    """Serializar `value` (objeto ORM o dict con objetos ORM) con la forma de `schema`.
+
+    `fields` limita los campos por ubicación: {"clients": {"id", "name"}}; los
+    atributos excluidos no se leen (pueden no estar cargados).
+    """
+    key = tuple(sorted((path, frozenset(names)) for path, names in (fields or {}).items()))
+    return Response(content=dumps(_dump(value, _plan(schema, key))), status_code=status_code,
+                    media_type="application/json")
@@ -0,0 +1,113 @@
+"""Alta y activación masiva de servicios, con un solo statement por operación.
+
+`create_defaults` crea los servicios de un proyecto nuevo (todos los tipos,
+con la configuración inicial pedida) con un INSERT multi-fila.
+
+`set_services` fija (no alterna) el estado de los tipos pedidos con un solo
+`UPDATE ... RETURNING` sobre `project_services`. Solo toca las filas cuyo
+estado cambia, así que repetir el pedido no produce cambios ni eventos.
+
+Como estas sentencias no pasan por el ORM, los listeners `after_flush` no las
+ven: acá se aplican a mano los deltas del dashboard, la versión de los
+snapshots, la invalidación de los dashboards por cliente y la auditoría. La
+activación masiva encola un único evento `services.bulk_changed` con todos los
+cambios.
+"""
+from collections import Counter
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from models import ProjectService, ServiceType
+import audit
+import client_dashboard
+import dashboard
+import outbox
+import snapshots
+
+def create_defaults(session: Session, project_id: int, initial: dict) -> list:
+    """Crear los servicios de un proyecto nuevo con un solo INSERT multi-fila.
+
+    `initial` es {ServiceType: ProjectServiceInitial}; los tipos no indicados
+    se crean desactivados. Devuelve los tipos activados.
+    """
+    rows = []
+    for service_type in ServiceType:
+        config = initial.get(service_type)
+        is_active = bool(config and config.is_active)
+        rows.append({
+            "project_id": project_id,
+            "service_type": service_type,
+            "is_active": is_active,
+            "cost_per_unit": config.cost_per_unit if config else None,
+            "monthly_cost": config.monthly_cost if config else None,
+            "service_config": config.service_config if config else None,
+            "activated_at": func.now() if is_active else None,
+        })
+    created = session.execute(
+        insert(ProjectService).values(rows).returning(ProjectService.id, ProjectService.service_type)
+    ).all()
+    service_ids = dict((service_type, service_id) for service_id, service_type in created)
+
+    active = [row["service_type"] for row in rows if row["is_active"]]
+    dashboard.apply_deltas(session.connection(), Counter(map(dashboard.service_key, active)))
+    audit.record(session, [
+        audit.entry("service_created", "project_service", service_ids[row["service_type"]], new_values={
+            "project_id": project_id,
+            "service_type": row["service_type"].value,
+            "is_active": row["is_active"],
+            **{key: str(row[key]) for key in ("cost_per_unit", "monthly_cost") if row[key] is not None},
+            **({"service_config": audit.REDACTED} if row["service_config"] is not None else {}),
+        })
+        for row in rows
+    ])
+    if active:
+        outbox.enqueue_service_change(session, project_id, [(service_type, True) for service_type in active])
+    return active
+
+def set_services(session: Session, project_ids, service_types, is_active: bool) -> list:
+    """Fijar `is_active` de `service_types` en `project_ids`; devuelve las filas cambiadas"""
+    if is_active:
+        values = {"is_active": True, "activated_at": func.now(), "deactivated_at": None}
+        # NULL cuenta como inactivo
+        changed = ProjectService.is_active.is_not(True)
+    else:
+        values = {"is_active": False, "deactivated_at": func.now()}
+        changed = ProjectService.is_active.is_(True)
+
+    rows = session.execute(
+        update(ProjectService)
+        .where(
+            ProjectService.project_id.in_(sorted(project_ids)),
+            ProjectService.service_type.in_(list(service_types)),
+            changed,
+        )
+        .values(**values)
+        .returning(ProjectService.id, ProjectService.project_id, ProjectService.service_type),
+        execution_options={"synchronize_session": False},
+    ).all()
+    if not rows:
+        return rows
+
+    connection = session.connection()
+    sign = 1 if is_active else -1
+    dashboard.apply_deltas(connection, Counter(
+        {dashboard.service_key(service_type): sign * count
+         for service_type, count in Counter(row.service_type for row in rows).items()}
+    ))
+
+    changed_projects = {row.project_id for row in rows}
+    snapshots.bump_versions(connection, changed_projects)
+    snapshots.mark_for_invalidation(session, changed_projects)
+    client_dashboard.mark_projects(session, changed_projects)
+
+    action = "service_activated" if is_active else "service_deactivated"
+    audit.record(session, [
+        audit.entry(action, "project_service", row.id, {"is_active": not is_active}, {"is_active": is_active})
+        for row in rows
+    ])
+
+    outbox.enqueue_bulk_service_change(
+        session, [(row.project_id, row.service_type, is_active) for row in rows]
+    )
+    return rows
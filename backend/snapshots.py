@@ -0,0 +1,106 @@
+"""Snapshots en memoria de los servicios activos por proyecto.
+
+Cada cambio de `ProjectService` incrementa `Project.services_version` en la
+misma transacción; al hacer commit se invalida el snapshot local del proyecto.
+Los demás workers convergen en `SERVICE_SNAPSHOT_TTL_SECONDS` como máximo, lo
+que mantiene la activación por debajo de los 5 segundos del PRD.
+"""
+from typing import NamedTuple, Optional
+import json
+import os
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+from models import Project, ProjectService
+
+SNAPSHOT_TTL_SECONDS = float(os.getenv("SERVICE_SNAPSHOT_TTL_SECONDS", "2"))
+SNAPSHOT_MAX_PROJECTS = int(os.getenv("SERVICE_SNAPSHOT_MAX_PROJECTS", "10000"))
+
+# Atributos cuyo cambio debe llegar a las apps cliente
+_TRACKED_ATTRIBUTES = ("is_active", "service_config")
+
+class ServiceSnapshot(NamedTuple):
+    project_id: int
+    version: int
+    etag: str
+    body: bytes
+
+snapshot_cache = TTLCache(SNAPSHOT_TTL_SECONDS, SNAPSHOT_MAX_PROJECTS)
+
+def make_etag(project_id: int, version: int) -> str:
+    return f'"{project_id}-{version}"'
+
+async def load_snapshot(db, project_id: int) -> Optional[ServiceSnapshot]:
+    """Leer proyecto y servicios en una sola consulta y guardar el snapshot"""
+    rows = (await db.execute(
+        select(
+            Project.services_version,
+            ProjectService.service_type,
+            ProjectService.is_active,
+            ProjectService.activated_at,
+        )
+        .outerjoin(ProjectService, ProjectService.project_id == Project.id)
+        .where(Project.id == project_id)
+    )).all()
+    if not rows:
+        return None
+
+    version = rows[0].services_version or 0
+    services = {
+        row.service_type.value: {
+            "is_active": bool(row.is_active),
+            "activated_at": row.activated_at.isoformat() if row.activated_at else None,
+        }
+        for row in rows if row.service_type is not None
+    }
+    body = json.dumps({
+        "project_id": project_id,
+        "version": version,
+        "active_services": sorted(name for name, service in services.items() if service["is_active"]),
+        "services": services,
+    }).encode()
+
+    snapshot = ServiceSnapshot(project_id, version, make_etag(project_id, version), body)
+    snapshot_cache.put(project_id, snapshot)
+    return snapshot
+
+def _service_changed(obj: ProjectService) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _TRACKED_ATTRIBUTES)
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions(session, flush_context):
+    project_ids = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, ProjectService) and obj.project_id is not None:
+            project_ids.add(obj.project_id)
+        elif isinstance(obj, Project) and obj.id is not None:
+            project_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, ProjectService) and _service_changed(obj):
+            project_ids.add(obj.project_id)
+
+    if project_ids:
+        bump_versions(session.connection(), project_ids)
+        mark_for_invalidation(session, project_ids)
+
+def bump_versions(connection, project_ids):
+    """Incrementar la versión de servicios (también para escrituras masivas fuera del ORM)"""
+    connection.execute(
+        update(Project)
+        .where(Project.id.in_(sorted(project_ids)))
+        .values(services_version=Project.services_version + 1)
+    )
+
+def mark_for_invalidation(session, project_ids):
+    session.info.setdefault("snapshot_invalidations", set()).update(project_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    snapshot_cache.invalidate(session.info.pop("snapshot_invalidations", ()))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("snapshot_invalidations", None)
@@ -0,0 +1,149 @@
+"""Verificar los importes de /exports/billing filtrado por servicio.
+
+Crea dos proyectos "@billing-export.example" con cargos fijos (uno con mdm y
+reporting, otro solo con reporting), los factura para enero de 2025 y exporta
+con `service_type`: cada fila debe traer solo los importes de ese servicio y
+solo los proyectos en los que el servicio tuvo cargos. Limpia al terminar.
+
+Uso (desde backend/, con DATABASE_URL apuntando a una base de pruebas):
+    python test_billing_export.py
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import asyncio
+import json
+import sys
+
+import httpx
+from sqlalchemy import delete, select, update
+
+from auth import get_current_user
+from database import AsyncSessionLocal, SessionLocal, async_engine
+from main import app
+from models import AuditLog, BillingRecord, Client, Project, ProjectService, ServiceType
+import billing
+import dashboard
+
+EMAIL_DOMAIN = "@billing-export.example"
+PERIOD = date(2025, 1, 1)
+ACTIVATED_AT = datetime(2024, 12, 1, tzinfo=timezone.utc)
+# proyecto -> {servicio: cargo mensual}
+PROJECTS = {
+    "Export A": {ServiceType.MDM: Decimal("100.00"), ServiceType.REPORTING: Decimal("40.00")},
+    "Export B": {ServiceType.REPORTING: Decimal("25.00")},
+}
+ADJUSTMENT = Decimal("7.00")
+
+async def cleanup():
+    async with AsyncSessionLocal() as db:
+        client_ids = select(Client.id).where(Client.email.like(f"%{EMAIL_DOMAIN}")).scalar_subquery()
+        project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+        service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids)).scalar_subquery()
+        await db.execute(delete(AuditLog).where(
+            ((AuditLog.entity_type == "project") & AuditLog.entity_id.in_(project_ids))
+            | ((AuditLog.entity_type == "project_service") & AuditLog.entity_id.in_(service_ids))
+            | ((AuditLog.entity_type == "client") & AuditLog.entity_id.in_(client_ids))
+        ))
+        await db.execute(delete(BillingRecord).where(BillingRecord.project_id.in_(project_ids)))
+        await db.execute(delete(ProjectService).where(ProjectService.id.in_(service_ids)))
+        await db.execute(delete(Project).where(Project.id.in_(project_ids)))
+        await db.execute(delete(Client).where(Client.id.in_(client_ids)))
+        await db.commit()
+    await dashboard.reconcile()
+
+async def create_projects():
+    """Crear los proyectos y devolver {nombre: id}"""
+    async with AsyncSessionLocal() as db:
+        client = Client(name="Billing export", email=f"owner{EMAIL_DOMAIN}")
+        db.add(client)
+        await db.flush()
+        projects = {}
+        for name, services in PROJECTS.items():
+            project = Project(client_id=client.id, name=name, start_date=ACTIVATED_AT)
+            db.add(project)
+            await db.flush()
+            # Como en la app: una fila por tipo, activas solo las que tienen cargo
+            db.add_all(
+                ProjectService(project_id=project.id, service_type=service_type,
+                               is_active=service_type in services, monthly_cost=services.get(service_type),
+                               activated_at=ACTIVATED_AT if service_type in services else None)
+                for service_type in ServiceType
+            )
+            projects[name] = project.id
+        await db.commit()
+        return client.id, projects
+
+def bill(project_ids):
+    db = SessionLocal()
+    try:
+        billing.run_partition(db, PERIOD, date(2025, 2, 1))
+        # Un ajuste manual es del proyecto, no de un servicio
+        db.execute(update(BillingRecord).where(BillingRecord.project_id == project_ids["Export A"])
+                   .values(manual_adjustments=ADJUSTMENT, total_cost=BillingRecord.total_cost + ADJUSTMENT))
+        db.commit()
+    finally:
+        db.close()
+
+async def export(client, client_id: int, service_type=None):
+    params = {"format": "ndjson", "client_id": client_id}
+    if service_type:
+        params["service_type"] = service_type.value
+    response = await client.get("/exports/billing", params=params)
+    assert response.status_code == 200, f"{response.status_code} {response.text}"
+    return {row["project_id"]: row for row in map(json.loads, response.text.splitlines())}
+
+def check(label: str, rows, expected) -> bool:
+    """`expected` es {project_id: (monthly_costs, manual_adjustments, total_cost)}"""
+    found = {
+        project_id: tuple(Decimal(row[name]) for name in ("monthly_costs", "manual_adjustments", "total_cost"))
+        for project_id, row in rows.items()
+    }
+    passed = found == expected
+    print(f"{'✅' if passed else '❌'} {label}: {found}")
+    return passed
+
+async def run_flow():
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        await cleanup()
+        client_id, project_ids = await create_projects()
+        bill(project_ids)
+        a, b = project_ids["Export A"], project_ids["Export B"]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://exports") as client:
+            checks = [
+                check("sin filtro", await export(client, client_id), {
+                    a: (Decimal("140.00"), ADJUSTMENT, Decimal("147.00")),
+                    b: (Decimal("25.00"), Decimal("0.00"), Decimal("25.00")),
+                }),
+                check("service_type=mdm", await export(client, client_id, ServiceType.MDM), {
+                    a: (Decimal("100.00"), Decimal("0.00"), Decimal("100.00")),
+                }),
+                check("service_type=reporting", await export(client, client_id, ServiceType.REPORTING), {
+                    a: (Decimal("40.00"), Decimal("0.00"), Decimal("40.00")),
+                    b: (Decimal("25.00"), Decimal("0.00"), Decimal("25.00")),
+                }),
+                check("service_type=elearning", await export(client, client_id, ServiceType.ELEARNING), {}),
+            ]
+            rows = await export(client, client_id, ServiceType.MDM)
+            breakdown_ok = all(list(row["cost_breakdown"]) == ["mdm"] for row in rows.values())
+            print(f"{'✅' if breakdown_ok else '❌'} cost_breakdown limitado al servicio")
+            return all(checks) and breakdown_ok
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        await cleanup()
+        await async_engine.dispose()
+
+def test_billing_export():
+    """Con service_type los importes exportados son los de ese servicio"""
+    print("🧪 Testing billing export by service...")
+    ok = asyncio.run(run_flow())
+    print("\n🎉 Importes por servicio correctos" if ok else "\n❌ Los importes no coinciden con el servicio")
+    assert ok
+
+if __name__ == "__main__":
+    try:
+        test_billing_export()
+    except AssertionError:
+        sys.exit(1)
@@ -0,0 +1,108 @@
+"""Recorrer los listados paginados por cursor de punta a punta.
+
+Crea clientes y proyectos "@pagination.example" en el mismo instante (empates en
+created_at), recorre todas las páginas de /clients/ y /projects/ con cada orden
+y verifica que ningún id se repita y que no falte ninguno. Limpia al terminar.
+
+Uso (desde backend/, con DATABASE_URL apuntando a una base de pruebas):
+    python test_pagination.py
+"""
+from datetime import datetime
+import asyncio
+import sys
+
+import httpx
+from sqlalchemy import delete, select
+
+from auth import get_current_user
+from database import AsyncSessionLocal, async_engine
+from main import app
+from models import AuditLog, Client, Project, ProjectService
+import dashboard
+
+EMAIL_DOMAIN = "@pagination.example"
+CLIENTS = 7
+PROJECTS = 7
+PER_PAGE = 2
+START_DATE = datetime(2025, 1, 1)
+
+async def cleanup():
+    async with AsyncSessionLocal() as db:
+        client_ids = select(Client.id).where(Client.email.like(f"%{EMAIL_DOMAIN}")).scalar_subquery()
+        project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+        service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids)).scalar_subquery()
+        await db.execute(delete(AuditLog).where(
+            ((AuditLog.entity_type == "project") & AuditLog.entity_id.in_(project_ids))
+            | ((AuditLog.entity_type == "project_service") & AuditLog.entity_id.in_(service_ids))
+            | ((AuditLog.entity_type == "client") & AuditLog.entity_id.in_(client_ids))
+        ))
+        await db.execute(delete(ProjectService).where(ProjectService.id.in_(service_ids)))
+        await db.execute(delete(Project).where(Project.id.in_(project_ids)))
+        await db.execute(delete(Client).where(Client.id.in_(client_ids)))
+        await db.commit()
+    await dashboard.reconcile()
+
+async def walk(client, url: str, key: str, filters: dict, expected: int):
+    """ids de todas las páginas de `url`, en orden (corta si pasan de `expected`)"""
+    ids, cursor = [], None
+    while True:
+        params = {**filters, "paginate": "cursor", "per_page": PER_PAGE, "total": "none"}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(url, params=params)
+        assert response.status_code == 200, f"{url}: {response.status_code} {response.text}"
+        data = response.json()
+        ids.extend(item["id"] for item in data[key])
+        cursor = data["next_cursor"]
+        if not cursor or len(ids) > expected:
+            return ids
+
+async def run_flow():
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        await cleanup()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://pagination") as client:
+            # Mismo instante para todas las filas: el orden depende del desempate por id
+            async with AsyncSessionLocal() as db:
+                clients = [Client(name=f"Pagination {i % 3}", email=f"client{i}{EMAIL_DOMAIN}") for i in range(CLIENTS)]
+                db.add_all(clients)
+                await db.flush()
+                db.add_all(Project(client_id=clients[0].id, name=f"Pagination {i % 3}", start_date=START_DATE)
+                           for i in range(PROJECTS))
+                await db.commit()
+                client_id = clients[0].id
+                expected_clients = set((await db.scalars(select(Client.id))).all())
+                expected_projects = set((await db.scalars(
+                    select(Project.id).where(Project.client_id == client_id)
+                )).all())
+
+            checks = [
+                ("/clients/", "clients", {}, expected_clients),
+                ("/projects/", "projects", {"client_id": client_id}, expected_projects),
+            ]
+            ok = True
+            for url, key, filters, expected in checks:
+                for sort in ("created_at", "name"):
+                    ids = await walk(client, url, key, {**filters, "sort": sort}, len(expected))
+                    passed = len(ids) == len(set(ids)) and set(ids) == expected
+                    print(f"{'✅' if passed else '❌'} {url} sort={sort}: {len(ids)} filas, {len(set(ids))} distintas")
+                    ok = ok and passed
+            return ok
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        await cleanup()
+        await async_engine.dispose()
+
+def test_pagination():
+    """Las páginas por cursor cubren todas las filas sin repetir ninguna"""
+    print("🧪 Testing cursor pagination...")
+    ok = asyncio.run(run_flow())
+    print("\n🎉 Paginación por cursor correcta" if ok else "\n❌ La paginación repite u omite filas")
+    assert ok
+
+if __name__ == "__main__":
+    try:
+        test_pagination()
+    except AssertionError:
+        sys.exit(1)
@@ -0,0 +1,239 @@
+"""Verificar que las consultas de los routers usan índices (PostgreSQL).
+
+Carga un conjunto de datos grande (clientes "@plans.example"), llama a los
+endpoints con la app en proceso, captura cada SELECT/UPDATE/DELETE que
+ejecutan y corre `EXPLAIN` sobre ellos con los mismos parámetros. Falla si
+algún plan hace `Seq Scan` sobre una tabla grande. Limpia al terminar.
+
+Los listados sin filtros con total exacto recorren la tabla por definición
+(usar `total=estimate`), por eso no están en la lista. También verifica que una
+consulta de un período de facturación solo lea la partición de ese mes.
+
+Uso (desde backend/, con DATABASE_URL apuntando a una base de pruebas):
+    python test_query_plans.py --clients 2000
+"""
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import re
+import sys
+
+import httpx
+from sqlalchemy import String, delete, event, func, insert, literal, literal_column, select, text, update
+
+from auth import get_current_user
+from database import SessionLocal, async_engine
+from main import app
+import partitions
+from models import (
+    AuditLog, Client, OutboxDelivery, OutboxEvent, Project, ProjectService, ProjectStatus, ServiceType, ServiceUsage
+)
+
+EMAIL_DOMAIN = "@plans.example"
+LARGE_TABLES = {"clients", "projects", "project_services", "service_usage", "audit_logs"}
+
+def seed(db, clients: int, projects_per_client: int, usage_per_service: int):
+    series = func.generate_series(1, clients).table_valued("value").alias("gs")
+    db.execute(insert(Client).from_select(
+        ["name", "email"],
+        select(literal("Plan client ") + series.c.value.cast(String),
+               literal("client") + series.c.value.cast(String) + literal(EMAIL_DOMAIN)),
+    ))
+    client_ids = select(Client.id).where(Client.email.like(f"%{EMAIL_DOMAIN}")).scalar_subquery()
+
+    per_client = func.generate_series(1, projects_per_client).table_valued("value").alias("pc")
+    db.execute(insert(Project).from_select(
+        ["client_id", "name", "status", "start_date"],
+        select(Client.id, literal("Plan project ") + per_client.c.value.cast(String),
+               literal(ProjectStatus.ACTIVE, Project.status.type), func.now())
+        .select_from(Client).join(per_client, literal(True))
+        .where(Client.email.like(f"%{EMAIL_DOMAIN}")),
+    ))
+    project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+    db.execute(update(Project).where(Project.id.in_(project_ids), Project.id % 4 == 0)
+               .values(status=ProjectStatus.COMPLETED))
+
+    for service_type in ServiceType:
+        db.execute(insert(ProjectService).from_select(
+            ["project_id", "service_type", "is_active"],
+            select(Project.id, literal(service_type, ProjectService.service_type.type), Project.id % 2 == 0)
+            .where(Project.id.in_(project_ids)),
+        ))
+    service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids)).scalar_subquery()
+
+    hours = func.generate_series(1, usage_per_service).table_valued("value").alias("h")
+    db.execute(insert(ServiceUsage).from_select(
+        ["service_id", "usage_date", "usage_type", "quantity"],
+        select(ProjectService.id, func.now() - literal_column("interval '1 hour'") * hours.c.value,
+               literal("email_sent"), literal(1))
+        .select_from(ProjectService).join(hours, literal(True))
+        .where(ProjectService.id.in_(service_ids)),
+    ))
+    db.execute(insert(AuditLog).from_select(
+        ["action", "entity_type", "entity_id"],
+        select(literal("seed"), literal("project"), Project.id).where(Project.id.in_(project_ids)),
+    ))
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+def cleanup(db):
+    client_ids = select(Client.id).where(Client.email.like(f"%{EMAIL_DOMAIN}")).scalar_subquery()
+    project_ids = select(Project.id).where(Project.client_id.in_(client_ids)).scalar_subquery()
+    service_ids = select(ProjectService.id).where(ProjectService.project_id.in_(project_ids)).scalar_subquery()
+    # También lo que generan los toggles de check_plans: auditoría y eventos del outbox
+    db.execute(delete(AuditLog).where(
+        ((AuditLog.entity_type == "project") & AuditLog.entity_id.in_(project_ids))
+        | ((AuditLog.entity_type == "project_service") & AuditLog.entity_id.in_(service_ids))
+    ))
+    event_ids = select(OutboxEvent.id).where(OutboxEvent.project_id.in_(project_ids)).scalar_subquery()
+    db.execute(delete(OutboxDelivery).where(OutboxDelivery.event_id.in_(event_ids)))
+    db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
+    db.execute(delete(ServiceUsage).where(ServiceUsage.service_id.in_(service_ids)))
+    db.execute(delete(ProjectService).where(ProjectService.id.in_(service_ids)))
+    db.execute(delete(Project).where(Project.id.in_(project_ids)))
+    db.execute(delete(Client).where(Client.id.in_(client_ids)))
+    db.commit()
+
+def _parent_table(relation: str) -> str:
+    # Particiones mensuales (service_usage_2025_01) y DEFAULT cuentan como su tabla
+    return re.sub(r"_(\d{4}_\d{2}|default)$", "", relation)
+
+def relations(plan):
+    """Relaciones leídas en un plan de EXPLAIN (FORMAT JSON)"""
+    found = [(plan["Node Type"], plan["Relation Name"])] if "Relation Name" in plan else []
+    for child in plan.get("Plans", []):
+        found.extend(relations(child))
+    return found
+
+def seq_scans(plan):
+    """Tablas grandes recorridas con Seq Scan"""
+    return [
+        _parent_table(relation) for node_type, relation in relations(plan)
+        if node_type == "Seq Scan" and _parent_table(relation) in LARGE_TABLES
+    ]
+
+async def check_pruning():
+    """Un período mensual debe leer solo la partición de ese mes"""
+    month = partitions.month_start(datetime.now(timezone.utc).date())
+    query = select(func.sum(ServiceUsage.quantity)).where(
+        ServiceUsage.usage_date >= datetime.combine(month, datetime.min.time(), timezone.utc),
+        ServiceUsage.usage_date < datetime.combine(partitions.add_months(month, 1), datetime.min.time(), timezone.utc),
+    )
+    async with async_engine.connect() as connection:
+        sql = query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+        plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    read = sorted({relation for _, relation in relations(plan[0]["Plan"])})
+    expected = [partitions.partition_name("service_usage", month)]
+    print(f"{'✅' if read == expected else '❌'} Período {month:%Y-%m} lee: {', '.join(read)}")
+    return read == expected
+
+async def check_plans(client_id: int, project_id: int, service_id: int):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters))
+
+    # Consultas de los routers (y las que usan los jobs sobre las mismas tablas)
+    requests_to_check = [
+        ("GET", f"/clients/{client_id}"),
+        ("GET", f"/clients/{client_id}/dashboard"),
+        ("GET", "/clients/?paginate=cursor&sort=name&per_page=20"),
+        ("GET", "/clients/?paginate=cursor&sort=created_at&per_page=20"),
+        ("GET", "/clients/?search=client1234&per_page=20"),
+        ("GET", f"/projects/?client_id={client_id}&status=active"),
+        ("GET", f"/projects/?client_id={client_id}&paginate=cursor"),
+        ("GET", f"/projects/{project_id}"),
+        ("GET", f"/projects/{project_id}/services"),
+        ("POST", f"/projects/{project_id}/services/mdm/toggle"),
+        ("POST", f"/projects/{project_id}/services/mdm/toggle"),
+        ("GET", f"/services/active/{project_id}"),
+        ("GET", f"/usage/summary?project_id={project_id}"),
+    ]
+    direct_queries = [
+        select(func.sum(ServiceUsage.quantity)).where(
+            ServiceUsage.service_id == service_id,
+            ServiceUsage.usage_date >= func.now() - literal_column("interval '1 day'"),
+        ),
+        select(AuditLog).where(AuditLog.entity_type == "project", AuditLog.entity_id == project_id),
+    ]
+
+    app.dependency_overrides[get_current_user] = lambda: None
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://plans") as client:
+            for method, url in requests_to_check:
+                response = await client.request(method, url)
+                assert response.status_code < 400, f"{method} {url}: {response.status_code} {response.text}"
+        async with async_engine.connect() as connection:
+            for query in direct_queries:
+                await connection.execute(query)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+        app.dependency_overrides.pop(get_current_user, None)
+
+    failures = []
+    async with async_engine.connect() as connection:
+        seen = set()
+        for statement, parameters in captured:
+            if (statement, repr(parameters)) in seen:
+                continue
+            seen.add((statement, repr(parameters)))
+            plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            tables = seq_scans(plan[0]["Plan"])
+            status_icon = "❌" if tables else "✅"
+            print(f"{status_icon} {' '.join(statement.split())[:110]}")
+            if tables:
+                failures.append((statement, tables))
+        await connection.rollback()
+    return failures
+
+async def run(clients: int, projects_per_client: int, usage_per_service: int):
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name != "postgresql":
+            print("⚠️ Requiere PostgreSQL (EXPLAIN con estadísticas reales); se omite")
+            return True
+        cleanup(db)
+        if partitions.is_partitioned(db, "service_usage"):
+            partitions.maintain(db, retention=False)
+        print(f"📦 Cargando {clients} clientes × {projects_per_client} proyectos...")
+        seed(db, clients, projects_per_client, usage_per_service)
+        client_id = db.scalar(select(Client.id).where(Client.email.like(f"%{EMAIL_DOMAIN}")).order_by(Client.id.desc()))
+        project_id = db.scalar(select(Project.id).where(Project.client_id == client_id).order_by(Project.id))
+        service_id = db.scalar(select(ProjectService.id).where(ProjectService.project_id == project_id))
+
+        failures = await check_plans(client_id, project_id, service_id)
+        for statement, tables in failures:
+            print(f"\n❌ Seq Scan sobre {', '.join(sorted(set(tables)))}:\n   {' '.join(statement.split())}")
+        pruned = not partitions.is_partitioned(db, "service_usage") or await check_pruning()
+        return not failures and pruned
+    finally:
+        cleanup(db)
+        db.close()
+        await async_engine.dispose()
+
+def test_query_plans(clients: int = 2000, projects_per_client: int = 10, usage_per_service: int = 5):
+    """Las consultas de los routers no deben recorrer tablas grandes completas"""
+    print("🧪 Testing query plans...")
+    ok = asyncio.run(run(clients, projects_per_client, usage_per_service))
+    print("\n🎉 Todas las consultas usan índices" if ok else "\n❌ Hay consultas sin índice")
+    assert ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--projects-per-client", type=int, default=10)
+    parser.add_argument("--usage-per-service", type=int, default=5)
+    args = parser.parse_args()
+    try:
+        test_query_plans(args.clients, args.projects_per_client, args.usage_per_service)
+    except AssertionError:
+        sys.exit(1)
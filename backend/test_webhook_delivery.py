@@ -0,0 +1,80 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+import outbox
+from database import async_engine
+from main import app
+
+ACTIVATION_TARGET_SECONDS = 5
+
+class StubReceiver(BaseHTTPRequestHandler):
+    """Receptor de webhooks local que guarda los eventos recibidos"""
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        for event in json.loads(body)["events"]:
+            StubReceiver.received.append((time.perf_counter(), event))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+async def run_flow():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubReceiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    outbox.WEBHOOK_URLS = [f"http://127.0.0.1:{server.server_port}/webhooks"]
+    dispatcher = asyncio.create_task(outbox.dispatch_forever())
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            print("\n1️⃣ Login...")
+            response = await client.post("/auth/login", data={"username": "admin", "password": "admin123"})
+            assert response.status_code == 200, response.text
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            response = await client.get("/projects/", headers=headers)
+            project_id = response.json()["projects"][0]["id"]
+
+            # Se hace toggle dos veces para dejar el servicio como estaba
+            for step in ("2️⃣", "3️⃣"):
+                print(f"\n{step} Toggle de mdm en proyecto {project_id}...")
+                started = time.perf_counter()
+                response = await client.post(f"/projects/{project_id}/services/mdm/toggle", headers=headers)
+                assert response.status_code == 200, response.text
+                is_active = response.json()["service"]["is_active"]
+
+                while True:
+                    matches = [
+                        received_at for received_at, event in StubReceiver.received
+                        if received_at >= started
+                        and event["data"]["project_id"] == project_id
+                        and event["data"]["services"] == [{"type": "mdm", "is_active": is_active}]
+                    ]
+                    if matches:
+                        break
+                    assert time.perf_counter() - started < ACTIVATION_TARGET_SECONDS, "Webhook no recibido a tiempo"
+                    await asyncio.sleep(0.01)
+
+                elapsed = matches[0] - started
+                print(f"✅ Webhook recibido en {elapsed * 1000:.0f}ms (is_active={is_active})")
+                assert elapsed < ACTIVATION_TARGET_SECONDS
+    finally:
+        dispatcher.cancel()
+        server.shutdown()
+        await async_engine.dispose()
+
+def test_webhook_delivery():
+    """Toggle de servicio -> outbox -> webhook recibido en menos de 5 segundos"""
+    print("🧪 Testing webhook delivery...")
+    asyncio.run(run_flow())
+
+if __name__ == "__main__":
+    test_webhook_delivery()